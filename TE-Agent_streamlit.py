@@ -9,6 +9,9 @@ import yaml
 import json
 from typing import Optional, List, Tuple
 from ct_agent_ui import render_ct_agent_ui
+from config.config_manager import ConfigManager
+from utils.verdict_engine import VerdictBoard
+from utils.log_index import LogIndex
 
 # ---------------- 页面设置 ----------------
 st.set_page_config(page_title="测试用例自动化执行", layout="wide")
@@ -694,6 +697,47 @@ elif active_tab == "test_session":
                         use_container_width=True
                     )
 
+        # 显示各步骤的实时判定结果（由执行进程的流式判定引擎写入看板文件）
+        live_verdicts = VerdictBoard.load(ConfigManager().get_live_verdict_file())
+        if live_verdicts:
+            with st.expander("🚦 步骤实时判定", expanded=current_session["status"] == "执行中"):
+                for case_id, step_verdicts in live_verdicts.items():
+                    st.markdown(f"**{case_id}**")
+                    st.table([
+                        {
+                            "步骤": step_idx,
+                            "结果": verdict["step_result"],
+                            "已命中": len(verdict["matched"]),
+                            "未命中": "; ".join(verdict["missing"]),
+                            "更新时间": verdict["updated_at"]
+                        }
+                        for step_idx, verdict in sorted(step_verdicts.items(), key=lambda item: int(item[0]))
+                    ])
+
+        # 在历史运行日志的全文索引中检索关键词
+        log_index_file = ConfigManager().get_log_index_file()
+        if os.path.exists(log_index_file):
+            with st.expander("🔍 历史日志检索", expanded=False):
+                search_col1, search_col2 = st.columns([3, 1])
+                with search_col1:
+                    search_text = st.text_input("关键词", key="log_search_text", placeholder="如：[  FAILED  ]")
+                with search_col2:
+                    search_case = st.text_input("用例编号（可选）", key="log_search_case")
+                if search_text:
+                    results = LogIndex.get(log_index_file).search(search_text, case_id=search_case or None, limit=200)
+                    st.caption(f"共检索到 {len(results)} 条（最多显示200条）")
+                    if results:
+                        st.table([
+                            {
+                                "运行编号": row["run_id"],
+                                "用例": row["case_id"],
+                                "步骤": row["step"],
+                                "行号": row["line_no"],
+                                "内容": row["content"]
+                            }
+                            for row in results
+                        ])
+
         # 显示日志
         if current_session["logs"]:
             st.divider()
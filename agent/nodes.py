@@ -12,6 +12,14 @@ import glob
 from utils.command_executor import CommandExecutor
 from utils.screenshot_handler import ScreenshotHandler
 from utils.word_report_filler import WordReportFiller
+from utils.report_writer import ReportWriter
+from utils.verdict_engine import StreamingVerdict, VerdictBoard
+from utils.expectation import screenshot_keywords
+from utils.log_baseline import LogBaseline
+from utils.log_index import LogIndex
+from utils.log_rotation import LogRotation
+from utils.remote_log_cache import RemoteLogCache
+from utils.execution_target import ExecutionTarget
 from agent.state import TestState
 from config.config_manager import ConfigManager  # 导入配置管理器
 import subprocess
@@ -29,11 +37,7 @@ def run_pre_commands(state: TestState) -> Dict:
         timeout = config_manager.get("execution.pre_command_timeout", 30)
         os.environ["DISPLAY"] = config_manager.get("env.DISPLAY", ":0")
         log_path = config_manager.get_log_path()
-        remote_os = config_manager.get_remote_os()
-        remote_ip = config_manager.get_remote_ip()
-        remote_user = config_manager.get_remote_user()
-        remote_passwd = config_manager.get_remote_passwd()
-        remote_hdc_port = config_manager.get_hdc_port()
+        target = state.target or ExecutionTarget.from_config(config_manager)  # 会话内解析一次的执行机描述
 
         state.add_log(f"开始预处理步骤 (用例: {case_config['case_name']})")
         
@@ -50,7 +54,7 @@ def run_pre_commands(state: TestState) -> Dict:
                     continue
                 state.add_log(f"执行预处理命令: {cmd} ")
                 timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                log_file_name=f"{remote_ip}_{case_id}_log_pre_{idx}_{timestamp}.log"
+                log_file_name=f"{target.remote_ip}_{case_id}_log_pre_{idx}_{timestamp}.log"
                 terminal_name=f"{case_id}_pre_{idx}"
                 # 适配新返回值 (success, stdout, stderr, returncode)
                 success, stdout, stderr, returncode = state.proc_manager.start_subprocess_pre_post(
@@ -62,11 +66,7 @@ def run_pre_commands(state: TestState) -> Dict:
                     log_file=log_file_name,
                     timeout=timeout,
                     sleep_time=3,
-                    remote_os=remote_os,
-                    remote_ip=remote_ip,
-                    remote_user=remote_user,
-                    remote_passwd=remote_passwd,
-                    remote_hdc_port=remote_hdc_port
+                    target=target
                 )
                 idx += 1
                 
@@ -114,17 +114,14 @@ def run_test_step(state: TestState) -> Dict:
         # 执行当前步骤
         step = steps[step_idx]
         state.add_log(f"开始执行步骤 {step_idx + 1}/{len(steps)}: {step['command']}")
+        step_started = time.monotonic()
         
         timeout = step.get("timeout", config_manager.get_default_timeout())
         sleep_time = step.get("sleep_time", config_manager.get_default_sleep_time())
         blocked_process = step['blocked_process']
-        remote_os = config_manager.get_remote_os()
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        remote_ip = config_manager.get_remote_ip()
-        remote_user = config_manager.get_remote_user()
-        remote_passwd = config_manager.get_remote_passwd()
-        remote_hdc_port = config_manager.get_hdc_port()
-        log_file_name=f"{remote_ip}_{case_id}_log_step_{step_idx + 1}_{timestamp}.log"
+        target = state.target or ExecutionTarget.from_config(config_manager)  # 会话内解析一次的执行机描述
+        log_file_name=f"{target.remote_ip}_{case_id}_log_step_{step_idx + 1}_{timestamp}.log"
         
         #if step_idx == 1:
         #    raise Exception(f"raise Exception，用于验证执行部分步骤后，某个步骤还未执行且未记录case_result就异常的场景")
@@ -140,11 +137,7 @@ def run_test_step(state: TestState) -> Dict:
             log_file=log_file_name,
             timeout=timeout,
             sleep_time=sleep_time,
-            remote_os=remote_os,
-            remote_ip=remote_ip,
-            remote_user=remote_user,
-            remote_passwd=remote_passwd,
-            remote_hdc_port=remote_hdc_port
+            target=target
         )
 
 
@@ -158,6 +151,32 @@ def run_test_step(state: TestState) -> Dict:
 
         log_file = state.proc_manager._get_subprocess_log_file(process.pid)
 
+        # 挂载流式判定器，步骤执行期间即跟随日志匹配预期结果；远程被测系统日志不在本地，仍在回填结果时检查
+        expected_type = step.get("expected_type", "terminal")
+        expected_log = step.get("expected_log", "")
+        watch_file = log_file
+        start_offset = 0
+        if expected_type == "logfile" and expected_log != "":
+            watch_file = expected_log if target.is_local else ""
+            # 被测系统日志只检查基线（全流程开始前记录）之后写入的内容
+            start_offset = LogBaseline.active(config_manager.get_log_baseline_file()).local_offset(expected_log)
+        if watch_file:
+            board = VerdictBoard.get(config_manager.get_live_verdict_file())
+            on_lines = None
+            if watch_file == log_file and config_manager.get_log_index_enabled():
+                # 跟随步骤终端日志时，读到的日志行同时写入全文索引
+                log_index = LogIndex.get(config_manager.get_log_index_file())
+                run_id = LogIndex.current_run_id()
+                on_lines = lambda verdict, lines: log_index.add_lines(run_id, case_id, verdict.step_idx, log_file, lines)
+            state.step_verdicts[step_idx] = StreamingVerdict(
+                step_idx=step_idx + 1,
+                log_file=watch_file,
+                expected_keywords=step["expected_output"],
+                start_offset=start_offset,
+                on_change=lambda verdict: board.publish(case_id, verdict),
+                on_lines=on_lines
+            ).start()
+
         state.add_log(f"测试步骤执行完成, 终端输出将保存到：{log_file}")
         state.add_log(f"测试步骤执行完成（subprocess.Popen子进程返回码: {returncode}，0:退出，None:未退出）") 
 
@@ -174,6 +193,7 @@ def run_test_step(state: TestState) -> Dict:
             "screenshot_path": "",
             "returncode": returncode,  # 记录返回码用于后续校验
             "process_id":process.pid,
+            "duration": round(time.monotonic() - step_started, 3),
             "step_result": ""
         })
 
@@ -220,11 +240,7 @@ def run_fill_result(state: TestState) -> Dict:
         case_id = case_config["case_id"]
         total_steps = len(steps)
         result_len = len(case_result["steps"])
-        remote_ip = config_manager.get_remote_ip()
-        remote_os = config_manager.get_remote_os()
-        remote_user = config_manager.get_remote_user()
-        remote_passwd = config_manager.get_remote_passwd()
-        remote_hdc_port = config_manager.get_hdc_port()
+        target = state.target or ExecutionTarget.from_config(config_manager)  # 会话内解析一次的执行机描述
         
         state.add_log(f"已执行完的测试步骤数量为：{step_num}, 待执行的总步骤数量为：{total_steps}")
 
@@ -241,8 +257,8 @@ def run_fill_result(state: TestState) -> Dict:
                 
                 if result_len < step_num: 
                     #state.add_log(f"获取第{step_idx+1}步的进程失败，可能是:1.执行该步骤时没拉起来xterm子进程就异常了; 2.执行完了但case_result.append前发生了异常，需回填该步骤的测试结果")
-                    log_files = glob.glob(f"logs/{remote_ip}_{case_id}_log_step_{step_idx + 1}_*.log")
-                    log_file_name = Path(log_files[0]).name if log_files else f"{remote_ip}_{case_id}_log_step_{step_idx + 1}_timestamp.log"
+                    log_files = glob.glob(f"logs/{target.remote_ip}_{case_id}_log_step_{step_idx + 1}_*.log")
+                    log_file_name = Path(log_files[0]).name if log_files else f"{target.remote_ip}_{case_id}_log_step_{step_idx + 1}_timestamp.log"
                     log_path = config_manager.get_log_path()
                     log_file = os.path.abspath(os.path.join(log_path, log_file_name))
                     case_result["steps"].append({
@@ -260,49 +276,110 @@ def run_fill_result(state: TestState) -> Dict:
                 else:
                     process, log_file = state.proc_manager.subprocesses[step_idx]
 
+                step_log_file = log_file
                 if expected_type == "logfile" and expected_log != "":
                     log_file = expected_log
                     #print(f"!!! 通过被测系统日志 {log_file}比对预期结果，而不是与被测程序的终端输出打印比对")
 
                 
-                actual_output = state.proc_manager.capture_output_file(log_file) # 放在if外面，在步骤执行完成但case_result.append前异常的情况，能正常读取到日志，回填正确结果
+                streaming_verdict = state.step_verdicts.get(step_idx)
+                log_baseline = LogBaseline.active(config_manager.get_log_baseline_file())
+                rotation_members = []
+                if expected_type == "logfile" and expected_log != "" and target.is_local:
+                    rotation_members = LogRotation.plan_local(log_file, log_baseline.record(log_file))
+                if LogRotation.is_rotated(log_file, rotation_members):
+                    # 基线之后被测系统日志发生了轮转，流式判定只跟随了当前日志，按轮转集合依次重新扫描
+                    if streaming_verdict is not None:
+                        streaming_verdict.stop()
+                    keyword_check = LogRotation.scan_local(rotation_members, step["expected_output"])
+                    actual_output = None
+                    has_output = keyword_check["bytes_seen"] > 0
+                    state.add_log(f"第{step_idx + 1}步待检查的被测系统日志已轮转，扫描文件: {keyword_check['scanned_files']}")
+                elif streaming_verdict is not None and streaming_verdict.log_file == log_file:
+                    # 步骤执行期间已增量匹配，直接取最终判定结果，无需重新读取日志
+                    keyword_check = streaming_verdict.finalize()
+                    actual_output = None
+                    has_output = keyword_check["bytes_seen"] > 0
+                elif expected_type == "logfile" and not target.is_local:
+                    # 远程被测系统日志不在本地，在下方由执行机侧过滤后取回
+                    keyword_check = None
+                    actual_output = ""
+                    has_output = False
+                else:
+                    actual_output = state.proc_manager.capture_output_file(log_file) # 放在if外面，在步骤执行完成但case_result.append前异常的情况，能正常读取到日志，回填正确结果
+                    keyword_check = CommandExecutor.check_keywords(actual_output, step["expected_output"])
+                    has_output = bool(actual_output)
+                if config_manager.get_log_index_enabled():
+                    # 未被流式跟随写入索引的步骤终端日志，在回填结果时一次性写入全文索引
+                    try:
+                        LogIndex.get(config_manager.get_log_index_file()).index_file(
+                            LogIndex.current_run_id(), case_id, step_idx + 1, step_log_file)
+                    except Exception as e:
+                        state.add_log(f"步骤{step_idx + 1}的终端日志写入全文索引失败: {str(e)}")
                 # 如下方法扩展了 capture_output_file ，支持cat远程执行机上被测系统日志重定向到本地后read, 但是日志文件大时可能会报ioctl(set): I/O error
                 #actual_output = state.proc_manager.capture_output_file_support_read_remote(output_file=log_file,remote_os=remote_os,
                 #        remote_ip=remote_ip, remote_user=remote_user, remote_passwd=remote_passwd, remote_hdc_port=remote_hdc_port)
                 #print(f"run_fill_result: after call capture_output_file_support_read_remote, actual_output:{actual_output}")
-                if actual_output and expected_type == "terminal":
+                if has_output and expected_type == "terminal":
                     # 测试步骤的实时日志非空时，即已拉起了xterm终端并执行了用例指令，需要记录测试步骤截图;远程场景执行用例时，终端输出也重定向到了本地
                     screenshot_paths = ScreenshotHandler.capture_step_screenshot_terminal(
-                        screenshot_name=f"{remote_ip}_{case_id}_screenshot_step_{step_idx + 1}",
+                        screenshot_name=f"{target.remote_ip}_{case_id}_screenshot_step_{step_idx + 1}",
                         screenshot_dir=config_manager.get_screenshot_dir(),
                         terminal_name=f"{case_id}_step_{step_idx + 1}",
                         terminal_line_num=40,
                         log_file=log_file,
-                        expected_keywords=step["expected_output"]
+                        expected_keywords=screenshot_keywords(step["expected_output"], keyword_check)
                     )
                     if not screenshot_paths:
                         state.add_error(f"第{step_idx + 1}步的被测程序执行时的xterm终端截图失败")
                     else:
                         state.add_log(f"已保存第{step_idx + 1}步的被测程序执行时的xterm终端截图: {screenshot_paths}")
-                elif expected_type == "logfile": # 远程执行用例时，利用截图时拉起终端cat远程日志，将cat结果重定向到本地，来获取 actual_output , 所以logfile场景不判断 actual_output
-                    cat_output_file = f"logs/{remote_ip}_{case_id}_step_{step_idx + 1}_cat_expected_logfile.log"
-                    # 远程场景执行用例时，被测系统日志不在本地，要拉起xterm终端cat远程日志并|grep关键词后重定向到本地
+                elif expected_type == "logfile": # 远程执行用例时，被测系统日志在执行机侧按预期结果过滤后只取回命中的日志块，来获取 actual_output , 所以logfile场景不判断 actual_output
+                    use_remote_cache = not target.is_local and case_config.get("_batch") == 2 and config_manager.get_remote_log_cache_enabled()
+                    if target.is_local:
+                        screenshot_target = (target, log_file, log_baseline.local_offset(log_file))
+                    elif not use_remote_cache:
+                        # 与判定取回日志相同的inode和大小检查：日志在基线之后被轮转、重建或截断时从头截图
+                        screenshot_target = (target, log_file, log_baseline.remote_offset(log_file, **target.remote_kwargs()))
+                    if use_remote_cache:
+                        # 全流程用例检查的是同一次全流程运行的日志：会话内每个日志只取回一次，关键词检查和截图都使用本地副本
+                        cached, cached_file, cache_error = RemoteLogCache.local_copy(
+                            expected_log=log_file,
+                            **target.remote_kwargs(),
+                            baseline_record=log_baseline.record(log_file),
+                            cache_dir=os.path.join(config_manager.get_log_path(), "remote_cache")
+                        )
+                        if cached:
+                            keyword_check = LogRotation.scan_local([{"path": cached_file, "compressed": False, "skip": 0}], step["expected_output"])
+                            screenshot_target = (target.as_local(), cached_file, 0)
+                        else:
+                            state.add_error(f"第{step_idx + 1}步待检查的被测系统日志获取失败: {cache_error}")
+                            keyword_check = CommandExecutor.check_keywords("", step["expected_output"])
+                            screenshot_target = (target, log_file, log_baseline.remote_offset(log_file, **target.remote_kwargs()))
+                    elif not target.is_local:
+                        # 本地执行用例时，用本地被测系统日志对比结果;远程执行时，用执行机侧 grep -F 过滤出的日志块比对
+                        cat_output_file = f"logs/{target.remote_ip}_{case_id}_step_{step_idx + 1}_cat_expected_logfile.log"
+                        fetched, fetch_error = CommandExecutor.fetch_expected_logfile(
+                            expected_log=log_file,
+                            expected_output=step["expected_output"],
+                            **target.remote_kwargs(),
+                            output_file=cat_output_file,
+                            baseline_record=log_baseline.record(log_file)
+                        )
+                        if not fetched:
+                            state.add_error(f"第{step_idx + 1}步待检查的被测系统日志获取失败: {fetch_error}")
+                        actual_output = state.proc_manager.capture_output_file(cat_output_file) 
+                        keyword_check = CommandExecutor.check_keywords(actual_output, step["expected_output"])
+                    # 拉起xterm终端在被测系统日志中grep关键词，对命中内容截图
                     success, screenshot_paths = ScreenshotHandler.capture_step_screenshot_logfile(
-                        screenshot_name=f"{remote_ip}_{case_id}_screenshot_step_{step_idx + 1}",
+                        screenshot_name=f"{target.remote_ip}_{case_id}_screenshot_step_{step_idx + 1}",
                         screenshot_dir=config_manager.get_screenshot_dir(),
                         terminal_name=f"{case_id}_step_{step_idx + 1}",
-                        remote_os=remote_os,
-                        remote_ip=remote_ip,
-                        remote_user=remote_user,
-                        remote_passwd=remote_passwd,
-                        remote_hdc_port=remote_hdc_port,
-                        log_file=log_file,
-                        cat_output_file=cat_output_file,
-                        expected_keywords=step["expected_output"]
+                        target=screenshot_target[0],
+                        log_file=screenshot_target[1],
+                        expected_keywords=screenshot_keywords(step["expected_output"], keyword_check),
+                        start_offset=screenshot_target[2]
                     )
-                    if remote_ip != "127.0.0.1":
-                        # 本地执行用例时，用本地被测系统日志对比结果;远程执行时，用cat远程日志并|grep关键词的结果比对;对比时，要排除有cat、grep关键词的行
-                        actual_output = state.proc_manager.capture_output_file(cat_output_file) 
                     if not success:
                         state.add_error(f"第{step_idx + 1}步待检查的被测系统日志截图失败")
                     else:
@@ -312,7 +389,6 @@ def run_fill_result(state: TestState) -> Dict:
                     screenshot_paths = []
 
                 # 结合返回码和关键词匹配判断结果（符合文档评估标准）
-                keyword_check = CommandExecutor.check_keywords(actual_output, step["expected_output"])# 关键词检查（按用例要求比对终端输出）
                 step_result = "通过" if (keyword_check["all_matched"]) else "不通过"
                 state.add_log(f"步骤 {step_idx + 1} 结果: {step_result} (关键词匹配结果: {keyword_check['all_matched']})")
 
@@ -353,15 +429,24 @@ def run_fill_result(state: TestState) -> Dict:
             state.add_error(f"{overall_result}")
 
         # 填充Word文档（按文档表格结构记录结果）
+        report_case_result = {
+            "case_id": case_config["case_id"],
+            "case_name": case_config["case_name"],
+            "execution_steps": state.case_result["steps"],
+            "overall_result": overall_result
+        }
+        report_writer = ReportWriter.active()
+        if report_writer is not None:
+            # 交给后台线程回填，不等待文档写入；回填失败的用例在 pytest 结果摘要中列出
+            report_writer.submit(config_manager.get_result_word_file(), step_num, report_case_result)
+            state.add_log(f"测试结果已提交后台回填至: {config_manager.get_result_word_file()}")
+            return {
+                "case_result": state.case_result
+            }
         result = WordReportFiller.fill_case_results(
             word_file=config_manager.get_result_word_file(),
             step_num=step_num,
-            case_result={
-                "case_id": case_config["case_id"],
-                "case_name": case_config["case_name"],
-                "execution_steps": state.case_result["steps"],
-                "overall_result": overall_result
-            }
+            case_result=report_case_result
         )
         if result:
             state.add_log(f"测试结果已回填至: {config_manager.get_result_word_file()}")
@@ -385,11 +470,7 @@ def run_post_process(state: TestState) -> Dict:
         case_id = case_config["case_id"]
         state.add_log(f"开始后置处理 (用例: {case_config['case_name']})")
         log_path = config_manager.get_log_path()
-        remote_os = config_manager.get_remote_os()
-        remote_ip = config_manager.get_remote_ip()
-        remote_user = config_manager.get_remote_user()
-        remote_passwd = config_manager.get_remote_passwd()
-        remote_hdc_port = config_manager.get_hdc_port()
+        target = state.target or ExecutionTarget.from_config(config_manager)  # 会话内解析一次的执行机描述
 
         # 执行后置命令，验证返回码
         post_commands = case_config.get("post_commands", [])
@@ -402,7 +483,7 @@ def run_post_process(state: TestState) -> Dict:
                     continue
                 state.add_log(f"执行后置命令: {cmd}")
                 timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                log_file_name=f"{remote_ip}_{case_id}_log_post_{idx}_{timestamp}.log"
+                log_file_name=f"{target.remote_ip}_{case_id}_log_post_{idx}_{timestamp}.log"
                 terminal_name=f"{case_id}_post_{idx}"
                 success, stdout, stderr, returncode = state.proc_manager.start_subprocess_pre_post(
                     exec_cmd=cmd,
@@ -413,11 +494,7 @@ def run_post_process(state: TestState) -> Dict:
                     log_file=log_file_name,
                     timeout=timeout,
                     sleep_time=3,
-                    remote_os=remote_os,
-                    remote_ip=remote_ip,
-                    remote_user=remote_user,
-                    remote_passwd=remote_passwd,
-                    remote_hdc_port=remote_hdc_port
+                    target=target
                 )
                 idx += 1
                 
@@ -426,6 +503,10 @@ def run_post_process(state: TestState) -> Dict:
                     state.add_error(f"后置命令执行失败（返回码: {returncode}）\n错误输出: {stderr}")
                 else:
                     state.add_log(f"后置命令执行成功（返回码: {returncode}）")
+        # 停止仍在跟随日志的流式判定器
+        for streaming_verdict in state.step_verdicts.values():
+            streaming_verdict.stop()
+
         # 终止所有子进程和终端窗口
         state.proc_manager.stop_all_subprocesses()
         state.add_log(f"所有子进程已终止")
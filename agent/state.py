@@ -5,6 +5,7 @@
 from typing import List, Dict, Optional, Any
 from dataclasses import dataclass, field
 from utils.subprocess_manager import SubprocessManager
+from utils.execution_target import ExecutionTarget
 
 @dataclass
 class TestState:
@@ -15,9 +16,15 @@ class TestState:
     # 用例执行结果（默认空字典，包含初始结构）
     case_result: Optional[Dict[str, Any]] = field(default_factory=lambda: {"steps": [], "overall_result": "未执行"})
 
+    # 执行机描述（会话内只从配置解析一次，不可变），各节点直接使用，不再重复读取配置
+    target: Optional[ExecutionTarget] = None
+
     # 用于管理子进程的共享实例
     proc_manager: SubprocessManager = field(default_factory=SubprocessManager)
     
+    # 各步骤的流式判定器（键为步骤索引，从0开始），步骤执行期间实时匹配预期结果
+    step_verdicts: Dict[int, Any] = field(default_factory=dict)
+
     # 进程PID列表（默认空列表）
     processes: List[int] = field(default_factory=list)
 
@@ -5,6 +5,8 @@
 
 from langgraph.graph import StateGraph, END
 from agent.state import TestState
+from config.config_manager import ConfigManager
+from utils.execution_target import ExecutionTarget
 from agent.nodes import (
     run_pre_commands,
     run_test_step,
@@ -12,13 +14,15 @@ from agent.nodes import (
     run_fill_result,
     run_post_process
 )
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
 @dataclass
 class TestExecuteAgent:
     """测试执行代理类，封装LangGraph工作流及状态管理"""
-    
+
+    target: Optional[ExecutionTarget] = None  # 会话内解析一次的执行机描述，未指定时从配置解析
+
     def __post_init__(self):
         """初始化代理，构建工作流"""
         self.workflow = self._build_workflow()
@@ -54,7 +58,8 @@ class TestExecuteAgent:
         """
         # 初始化状态（封装状态构建逻辑）
         initial_state = TestState(
-            case_config=test_case
+            case_config=test_case,
+            target=self.target or ExecutionTarget.from_config(ConfigManager())
         )
 
         # 添加初始日志
@@ -0,0 +1,247 @@
+"""
+Word报告回填性能基准
+以 merged_document.docx 的第一个用例表格为样板，生成含大量用例表格（默认1000个）的合成测试细则文档，
+表格结构与原模板一致（“标识”、各步骤“□通过□不通过其它____”、“测试用例执行结果”等），
+然后按不同的截图数量、截图尺寸和回填方式回填结果，统计每个用例的回填耗时、总耗时和内存峰值。
+
+用法（在项目根目录执行）：
+    python -m benchmarks.bench_report_fill --cases 1000 --fill 50 --screenshots 0,1,3 --image-sizes 320x240,1280x800
+    python -m benchmarks.bench_report_fill --cases 200 --fill 5 --modes per-case,session
+
+回填方式：
+    per-case   每个用例调用 WordReportFiller.fill_case_results，不启用会话（每次加载、保存整个文档；大文档下很慢，默认不运行）
+    session    会话内回填到内存中的文档，按检查点用 python-docx 完整保存
+    zip_patch  会话内回填，按检查点只重写正文并追加新截图（utils.docx_zip_patcher）
+    fragments  每个用例写独立分片，会话结束时一次性合并（utils.word_report_fragments）
+"""
+import argparse
+import copy
+import os
+import random
+import resource
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from typing import Dict, List, Any, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from docx.oxml.ns import qn
+from utils.word_report_filler import WordReportFiller, WordReportSession
+
+TEMPLATE_FILE = "merged_document.docx"
+TEMPLATE_CASE_ID = "XXX_TEST_001"
+TEMPLATE_CASE_NAME = "XXX_测试_001"
+STEP_PLACEHOLDER = "□通过"
+
+
+def make_png(path: str, width: int, height: int, seed: int = 0):
+    """纯Python生成PNG截图：深色背景上随机分布的浅色“文字”像素，压缩率与终端截图接近"""
+    rng = random.Random(seed)
+    background, foreground = b"\x1e\x1e\x1e", b"\xd4\xd4\xd4"
+    raw = bytearray()
+    for _ in range(height):
+        row = bytearray(background * width)
+        for _ in range(width // 12):
+            x = rng.randrange(width)
+            run = min(rng.randint(1, 6), width - x)
+            row[x * 3:(x + run) * 3] = foreground * run
+        raw += b"\x00" + row
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(bytes(raw), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def _replace_text(element, old: str, new: str):
+    """按段落替换文本（Word常把一段文字拆在多个 w:t 中，如 "XXX_TEST" + "_001"）"""
+    for para in element.iter(qn("w:p")):
+        texts = list(para.iter(qn("w:t")))
+        joined = "".join(t.text or "" for t in texts)
+        if old in joined:
+            texts[0].text = joined.replace(old, new)
+            for t in texts[1:]:
+                t.text = ""
+
+
+def build_template(output_file: str, cases: int, steps: int, template_file: str = TEMPLATE_FILE) -> List[str]:
+    """
+    生成合成测试细则文档
+    :param steps: 每个用例表格的步骤行数（复制样板表格的第一个步骤行）
+    :return: 生成的用例标识列表
+    """
+    doc = Document(template_file)
+    body = doc.element.body
+    prototype = copy.deepcopy(doc.tables[0]._tbl)
+    previous = doc.tables[0]._tbl.getprevious()
+    heading = copy.deepcopy(previous) if previous is not None and previous.tag == qn("w:p") else None
+
+    # 调整样板表格的步骤行数
+    rows = prototype.findall(qn("w:tr"))
+    step_rows = [tr for tr in rows if any(STEP_PLACEHOLDER in (t.text or "") for t in tr.iter(qn("w:t")))]
+    for tr in step_rows[1:]:
+        prototype.remove(tr)
+    anchor = step_rows[0]
+    for step_no in range(2, steps + 1):
+        new_tr = copy.deepcopy(step_rows[0])
+        first_text = next(new_tr.iter(qn("w:t")))
+        first_text.text = str(step_no)
+        anchor.addnext(new_tr)
+        anchor = new_tr
+    if steps < 1:
+        prototype.remove(step_rows[0])
+
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+    sect_pr = body.find(qn("w:sectPr"))
+    case_ids = []
+    for idx in range(1, cases + 1):
+        case_id = f"BENCH_TEST_{idx:05d}"
+        table = copy.deepcopy(prototype)
+        _replace_text(table, TEMPLATE_CASE_ID, case_id)
+        _replace_text(table, TEMPLATE_CASE_NAME, f"合成用例_{idx:05d}")
+        if heading is not None:
+            sect_pr.addprevious(copy.deepcopy(heading))
+        sect_pr.addprevious(table)
+        case_ids.append(case_id)
+    doc.save(output_file)
+    return case_ids
+
+
+def _case_result(case_id: str, steps: int, screenshots: List[str]) -> Dict[str, Any]:
+    return {
+        "case_id": case_id,
+        "case_name": case_id,
+        "execution_steps": [
+            {"step_result": "通过" if step % 3 else "不通过", "screenshot_path": list(screenshots)}
+            for step in range(1, steps + 1)
+        ],
+        "overall_result": "通过",
+    }
+
+
+def run_once(mode: str, template: str, work_dir: str, case_ids: List[str], steps: int, screenshots: List[str],
+    checkpoint_cases: int, trace_memory: bool) -> Dict[str, Any]:
+    """按一种回填方式回填 case_ids 中的用例，返回耗时和内存统计"""
+    word_file = os.path.join(work_dir, f"report_{mode}.docx")
+    fragment_dir = os.path.join(work_dir, f"fragments_{mode}")
+    shutil.copy(template, word_file)
+    shutil.rmtree(fragment_dir, ignore_errors=True)
+    if trace_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    if mode != "per-case":
+        WordReportSession.start(
+            word_file, checkpoint_cases=checkpoint_cases, checkpoint_seconds=float("inf"),
+            mode="fragments" if mode == "fragments" else "memory", fragment_dir=fragment_dir,
+            save_mode="zip_patch" if mode == "zip_patch" else "python-docx"
+        )
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for case_id in case_ids:
+        t0 = time.perf_counter()
+        WordReportFiller.fill_case_results(word_file, steps, _case_result(case_id, steps, screenshots))
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    WordReportSession.close_active()
+    close_seconds = time.perf_counter() - t0
+    total_seconds = time.perf_counter() - started
+
+    peak_bytes = 0
+    if trace_memory:
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "load": load_seconds,
+        "latencies": latencies,
+        "close": close_seconds,
+        "total": total_seconds,
+        "peak_bytes": peak_bytes,
+        "output_bytes": os.path.getsize(word_file),
+    }
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _parse_size(text: str) -> Tuple[int, int]:
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Word报告回填性能基准")
+    parser.add_argument("--cases", type=int, default=1000, help="合成文档中的用例表格数（默认1000）")
+    parser.add_argument("--steps", type=int, default=2, help="每个用例的步骤数（默认2）")
+    parser.add_argument("--fill", type=int, default=50, help="每轮回填的用例数，均匀分布在整个文档中（默认50，0表示全部）")
+    parser.add_argument("--screenshots", default="0,1,3", help="每个步骤的截图数量，逗号分隔（默认 0,1,3）")
+    parser.add_argument("--image-sizes", default="320x240,1280x800", help="截图尺寸，逗号分隔（默认 320x240,1280x800）")
+    parser.add_argument("--modes", default="session,zip_patch,fragments",
+                        help="回填方式，逗号分隔：per-case,session,zip_patch,fragments（默认不含 per-case）")
+    parser.add_argument("--checkpoint-cases", type=int, default=10, help="会话方式下每回填多少个用例保存一次（默认10）")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="不统计Python内存峰值（tracemalloc 会使耗时变长）")
+    parser.add_argument("--work-dir", default="", help="合成文档和回填结果的目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--template", default=TEMPLATE_FILE, help=f"样板测试细则文档（默认 {TEMPLATE_FILE}）")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="te_agent_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        template = os.path.join(work_dir, "bench_template.docx")
+        t0 = time.perf_counter()
+        case_ids = build_template(template, args.cases, args.steps, args.template)
+        print(f"已生成合成测试细则文档: {template}（{args.cases} 个用例表格，"
+              f"{os.path.getsize(template) / 1024:.0f} KB，耗时 {time.perf_counter() - t0:.2f}s）")
+        fill_count = args.fill if 0 < args.fill < len(case_ids) else len(case_ids)
+        stride = len(case_ids) / fill_count
+        fill_ids = [case_ids[int(i * stride)] for i in range(fill_count)]
+
+        images = {}
+        for size in args.image_sizes.split(","):
+            width, height = _parse_size(size)
+            path = os.path.join(work_dir, f"screenshot_{width}x{height}.png")
+            make_png(path, width, height)
+            images[f"{width}x{height}"] = path
+
+        header = (f"{'方式':<10} {'截图数':>6} {'尺寸':>10} {'加载s':>7} {'均值ms':>8} {'p50ms':>8} {'p95ms':>8} "
+                  f"{'最大ms':>8} {'收尾s':>7} {'总计s':>8} {'Py峰值MB':>9} {'结果MB':>7}")
+        print(f"\n每轮回填 {fill_count} 个用例，每个用例 {args.steps} 个步骤")
+        print(header)
+        print("-" * len(header.encode("gbk", errors="ignore")))
+        for count in [int(c) for c in args.screenshots.split(",")]:
+            for size, image in (images.items() if count else [("-", "")]):
+                for mode in args.modes.split(","):
+                    result = run_once(mode, template, work_dir, fill_ids, args.steps, [image] * count,
+                                      args.checkpoint_cases, not args.no_tracemalloc)
+                    latencies = result["latencies"]
+                    print(f"{mode:<10} {count:>6} {size:>10} {result['load']:>7.2f} "
+                          f"{statistics.mean(latencies) * 1000:>8.1f} {_percentile(latencies, 50) * 1000:>8.1f} "
+                          f"{_percentile(latencies, 95) * 1000:>8.1f} {max(latencies) * 1000:>8.1f} "
+                          f"{result['close']:>7.2f} {result['total']:>8.2f} "
+                          f"{result['peak_bytes'] / 1024 / 1024:>9.1f} {result['output_bytes'] / 1024 / 1024:>7.1f}")
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"\n进程最大常驻内存: {max_rss / 1024:.0f} MB")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
+import os
+import threading
 import yaml
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 
 class ConfigManager:
-    """全局配置管理器，负责加载和管理config.yaml中的配置"""
+    """全局配置管理器，负责加载和管理config.yaml中的配置
+
+    同一配置文件在进程内只解析一次：解析结果连同展开后的点分隔键按 (路径, mtime, 大小) 缓存在类上，
+    之后每次构造 ConfigManager 只做一次 stat，文件被修改（如Web端保存配置）后才重新解析。
+    缓存的配置字典由各实例共享，只读使用。
+    """
+
+    _cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any], Dict[str, Any]]] = {}
+    _cache_lock = threading.Lock()
     
     def __init__(self, config_path: str = "config/config.yaml"):
         """初始化配置管理器
@@ -16,7 +26,7 @@ class ConfigManager:
         self.config: Dict[str, Any] = self._load_config()
 
     def _load_config(self) -> Dict[str, Any]:
-        """加载并解析YAML配置文件
+        """加载并解析YAML配置文件（文件未修改时直接使用缓存）
         
         Returns:
             解析后的配置字典
@@ -25,14 +35,41 @@ class ConfigManager:
             FileNotFoundError: 配置文件不存在
             yaml.YAMLError: YAML格式错误
         """
-        if not self.config_path.exists():
+        try:
+            st = os.stat(self.config_path)
+        except OSError:
             raise FileNotFoundError(f"配置文件不存在: {self.config_path}")
+        key, version = os.path.abspath(self.config_path), (st.st_mtime_ns, st.st_size)
+
+        with ConfigManager._cache_lock:
+            cached = ConfigManager._cache.get(key)
+        if cached is not None and cached[0] == version:
+            self._flat = cached[2]
+            return cached[1]
             
         try:
             with open(self.config_path, "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or {}
+                config = yaml.safe_load(f) or {}
         except yaml.YAMLError as e:
             raise ValueError(f"配置文件格式错误: {str(e)}")
+        self._flat = self._flatten(config)
+        with ConfigManager._cache_lock:
+            ConfigManager._cache[key] = (version, config, self._flat)
+        return config
+
+    @staticmethod
+    def _flatten(config: Dict[str, Any]) -> Dict[str, Any]:
+        """将嵌套配置展开为 点分隔键 -> 值（中间层级的键同样保留，值为对应的子字典）"""
+        flat: Dict[str, Any] = {}
+        pending = [("", config)]
+        while pending:
+            prefix, node = pending.pop()
+            for k, v in node.items():
+                dotted = f"{prefix}{k}"
+                flat[dotted] = v
+                if isinstance(v, dict):
+                    pending.append((f"{dotted}.", v))
+        return flat
 
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置值（支持点分隔符嵌套查询）
@@ -47,15 +84,7 @@ class ConfigManager:
         Returns:
             配置值或默认值
         """
-        keys = key.split(".")
-        value = self.config
-        
-        try:
-            for k in keys:
-                value = value[k]
-            return value
-        except (KeyError, TypeError):
-            return default
+        return self._flat.get(key, default)
 
     def get_original_word_file(self) -> str:
         """获取原始测试用例Word文档路径"""
@@ -65,6 +94,34 @@ class ConfigManager:
         """获取填充结果后的Word文档路径"""
         return self.get("word_documents.result_output_file", "reports/test_report.docx")
 
+    def get_report_checkpoint_cases(self) -> int:
+        """获取Word报告每回填多少个用例保存一次"""
+        return self.get("word_documents.checkpoint_cases", 10)
+
+    def get_report_checkpoint_seconds(self) -> int:
+        """获取Word报告距上次保存多少秒后保存一次"""
+        return self.get("word_documents.checkpoint_seconds", 60)
+
+    def get_report_mode(self) -> str:
+        """获取Word报告回填方式：memory（内存中回填，按检查点保存）/ fragments（每个用例写独立分片，会话结束时合并）"""
+        return self.get("word_documents.report_mode", "memory")
+
+    def get_report_fragment_dir(self) -> str:
+        """获取Word报告分片目录"""
+        return self.get("word_documents.fragment_dir", "reports/fragments")
+
+    def get_report_save_mode(self) -> str:
+        """获取Word报告保存方式：python-docx（完整保存）/ zip_patch（只重写正文及新增截图，其余zip条目原样复制）"""
+        return self.get("word_documents.save_mode", "python-docx")
+
+    def get_report_background_writer(self) -> bool:
+        """获取是否由后台线程回填Word报告"""
+        return self.get("word_documents.background_writer", False)
+
+    def get_report_writer_queue_size(self) -> int:
+        """获取后台回填队列的容量（队列满时 fill_result 节点等待）"""
+        return self.get("word_documents.writer_queue_size", 16)
+
     def get_default_timeout(self) -> int:
         """获取默认步骤超时时间（秒）"""
         return self.get("execution.default_timeout", 60)
@@ -73,6 +130,18 @@ class ConfigManager:
         """获取步骤执行等待时间（秒）"""
         return self.get("execution.sleep_time", 1)
 
+    def get_case_order(self) -> str:
+        """获取用例执行顺序策略（longest_first / random / path）"""
+        return self.get("execution.case_order", "longest_first")
+
+    def get_case_order_seed(self) -> Optional[int]:
+        """获取用例排序的随机种子，未配置时返回None"""
+        return self.get("execution.case_order_seed", None)
+
+    def get_remote_log_cache_enabled(self) -> bool:
+        """全流程用例是否复用会话内的远程被测系统日志缓存"""
+        return bool(self.get("execution.remote_log_cache", True))
+
     def get_remote_os(self) -> str:
         """获取远程执行命令的开发板os类型"""
         return self.get("execute_machine.remote_os", "ubuntu")
@@ -101,10 +170,70 @@ class ConfigManager:
         """获取日志保存目录"""
         return self.get("logging.log_path", "logs")
 
+    def get_live_verdict_file(self) -> str:
+        """获取实时判定看板文件路径"""
+        return self.get("logging.live_verdict_file", "logs/live_verdicts.json")
+
+    def get_log_baseline_file(self) -> str:
+        """获取被测系统日志基线文件路径"""
+        return self.get("logging.log_baseline_file", "logs/log_baseline.json")
+
+    def get_archive_enabled(self) -> bool:
+        """是否在会话开始清理日志前归档上一轮的日志"""
+        return bool(self.get("archive.enabled", False))
+
+    def get_archive_dir(self) -> str:
+        """获取日志归档保存目录"""
+        return self.get("archive.archive_dir", "history/log_archive")
+
+    def get_archive_block_size(self) -> int:
+        """获取日志归档的压缩块大小（字节）"""
+        return self.get("archive.block_size", 262144)
+
+    def get_log_index_enabled(self) -> bool:
+        """是否将步骤日志写入全文索引"""
+        return bool(self.get("history.log_index_enabled", True))
+
+    def get_log_index_file(self) -> str:
+        """获取日志全文索引数据库路径"""
+        return self.get("history.log_index_file", "history/log_index.db")
+
+    def get_case_index_enabled(self) -> bool:
+        """是否使用持久化的用例索引选取用例"""
+        return bool(self.get("history.case_index_enabled", True))
+
+    def get_case_index_file(self) -> str:
+        """获取用例索引数据库路径"""
+        return self.get("history.case_index_file", "history/case_index.db")
+
+    def get_case_history_file(self) -> str:
+        """获取用例执行耗时历史数据库路径"""
+        return self.get("history.case_history_file", "history/case_history.db")
+
+    def get_case_manifest_file(self) -> str:
+        """获取本次运行的用例清单文件路径"""
+        return self.get("history.case_manifest_file", "history/case_manifest.jsonl")
+
     def get_report_file(self) -> str:
         """获取测试报告保存目录"""
         return self.get("reports.report_file", "reports/test_report.html")
 
+    def get_junit_file(self) -> str:
+        """获取执行过程中实时更新的 JUnit XML 结果文件路径"""
+        return self.get("reports.junit_file", "reports/junit.xml")
+
+    def get_summary_html_file(self) -> str:
+        """获取执行过程中实时更新的HTML执行摘要路径"""
+        return self.get("reports.summary_html", "reports/summary.html")
+
+    def get_summary_checkpoint_cases(self) -> int:
+        """获取每记录多少个用例重写一次 JUnit XML 和HTML摘要"""
+        return self.get("reports.summary_checkpoint_cases", 20)
+
+    def get_summary_checkpoint_seconds(self) -> int:
+        """获取距上次重写 JUnit XML 和HTML摘要超过多少秒时重写一次"""
+        return self.get("reports.summary_checkpoint_seconds", 30)
+
     def get_allure_results_path(self) -> str:
         """生成allure-results测试报告保存目录"""
         return self.get("reports.allure_results", "reports/allure_results")
@@ -6,6 +6,12 @@ import pytest
 import time
 from test_case_manager.test_case_manager import TestCaseManager
 from config.config_manager import ConfigManager  # 导入ConfigManager
+from utils.log_archive import LogArchive
+from utils.word_report_filler import WordReportSession
+from utils.report_writer import ReportWriter
+from utils.run_summary import RunSummary
+from utils.execution_target import ExecutionTarget
+from test_case_manager.case_scheduler import CaseScheduler, SHARD_ENV
 
 def clean_directory(dir_path: Path):
     """
@@ -102,14 +108,21 @@ def pytest_collection_modifyitems(items):
     items[:] = batch1_items + batch2_items
 
 
+# pytest钩子，在结果摘要中列出后台回填Word报告失败的用例
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if ReportWriter.errors:
+        terminalreporter.section("Word报告回填失败", red=True)
+        for case_id, error in ReportWriter.errors:
+            terminalreporter.write_line(f"{case_id}: {error}", red=True)
+
+
 @pytest.fixture(scope="session", autouse=True)
 def init_test_session(request):
-    """初始化测试会话"""
+    """初始化测试会话，返回会话内只解析一次的执行机描述（ExecutionTarget）"""
     try:
         config_manager = ConfigManager()
         case_manager = TestCaseManager()
-        remote_ip = config_manager.get_remote_ip()
-        remote_os = config_manager.get_remote_os()
+        target = ExecutionTarget.from_config(config_manager)
         env_DISPLAY = config_manager.get_env_DISPLAY()
 
         # 创建报告目录和截图目录、创建日志目录
@@ -127,6 +140,18 @@ def init_test_session(request):
         clean_directory(screenshot_dir)
 
         log_dir = Path(config_manager.get_log_path())
+        if config_manager.get_archive_enabled():
+            # 清理前将上一轮的步骤日志打包归档
+            try:
+                archive_file = LogArchive.pack_directory(
+                    log_dir=str(log_dir),
+                    archive_dir=config_manager.get_archive_dir(),
+                    block_size=config_manager.get_archive_block_size()
+                )
+                if archive_file:
+                    print(f"上一轮日志已归档至: {archive_file}")
+            except Exception as e:
+                print(f"归档上一轮日志失败: {str(e)}")
         clean_directory(log_dir)
         
         screenshot_dir.mkdir(parents=True, exist_ok=True)
@@ -139,20 +164,48 @@ def init_test_session(request):
                 original_word_file=config_manager.get_original_word_file(),
                 new_word_file=config_manager.get_result_word_file()
             )
+        shard = os.getenv(SHARD_ENV, "")
+        report_mode = config_manager.get_report_mode()
+        if shard and report_mode != "fragments":
+            # 分片执行时各用例结果写为独立分片，所有分片的分片目录可合并到同一份结果文档
+            print(f"分片 {shard} 执行，Word报告改为分片模式，分片目录: {config_manager.get_report_fragment_dir()}")
+            report_mode = "fragments"
+        # 结果文档在会话内只加载一次，各用例结果回填到内存中，按检查点保存
+        WordReportSession.start(
+            word_file=config_manager.get_result_word_file(),
+            checkpoint_cases=config_manager.get_report_checkpoint_cases(),
+            checkpoint_seconds=config_manager.get_report_checkpoint_seconds(),
+            mode=report_mode,
+            fragment_dir=config_manager.get_report_fragment_dir(),
+            save_mode=config_manager.get_report_save_mode()
+        )
+        if config_manager.get_report_background_writer():
+            # 用例结果由后台线程按顺序回填，fill_result 节点不等待文档写入
+            ReportWriter.start(queue_size=config_manager.get_report_writer_queue_size())
 
         report_path = os.getenv("REPORT_PATH", "")
         print(f"测试报告将生成至: {os.path.abspath(report_path)}")
-
-        if remote_ip != "127.0.0.1" and remote_os == "HarmonyOS": 
+        # 执行过程中按检查点更新的 JUnit XML 和 HTML 摘要（只链接日志和截图，不内嵌），会话结束时写入全部结果
+        RunSummary.start(
+            junit_file=CaseScheduler.shard_file(config_manager.get_junit_file(), shard),
+            html_file=CaseScheduler.shard_file(config_manager.get_summary_html_file(), shard),
+            checkpoint_cases=config_manager.get_summary_checkpoint_cases(),
+            checkpoint_seconds=config_manager.get_summary_checkpoint_seconds()
+        )
+
+        if target.backend == "hdc":
             #print("开始检查远程鸿蒙系统 hdc 连接")
-            hdc_port = config_manager.get_hdc_port()
-            hdc_status = check_hdc_connection(remote_ip, hdc_port)
+            hdc_status = check_hdc_connection(target.remote_ip, target.remote_hdc_port)
             if not hdc_status:
                 #print("远程鸿蒙系统 hdc 连接失败")
                 raise RuntimeError(f"远程鸿蒙系统 hdc 连接失败")
             else:
                 print("远程鸿蒙系统 hdc 连接成功")
-        yield # 执行用例
+        yield target # 执行用例
+
+        RunSummary.close_active()
+        ReportWriter.close_active()  # 等待后台回填完队列中的全部结果
+        WordReportSession.close_active()  # 保存最后一个检查点之后的回填结果
 
         # pytest-html 插件在 pytest 会话完全结束后才会写入最终的报告文件，即使在yield 之后验证报告生成（用例执行完成后），但 pytest 可能仍在后台处理报告写入
     except Exception as e:
@@ -10,11 +10,23 @@ import traceback
 from pathlib import Path
 from agent.test_execute_agent import TestExecuteAgent
 from test_case_manager.test_case_manager import TestCaseManager
+from test_case_manager.case_index import CaseIndex
+from test_case_manager.case_scheduler import CaseScheduler, ORDER_STRATEGIES, SHARD_ENV
+from test_case_manager.case_manifest import CaseManifest, MANIFEST_ENV, LEGACY_BATCH_ENV
+from test_case_manager.case_pack import CasePack
 from config.config_manager import ConfigManager  # 导入配置管理器
 from utils.command_executor import CommandExecutor
+from utils.log_baseline import LogBaseline
+from utils.log_index import LogIndex, RUN_ID_ENV
+from utils.run_summary import RunSummary
+from utils.case_history import CaseHistory
+from utils.execution_target import ExecutionTarget
+import json
 import os
+import random
 import subprocess
 import time
+from datetime import datetime
 import allure
 from allure_commons.types import AttachmentType
 
@@ -24,48 +36,65 @@ SHELL_SCRIPT_EXECUTED = False  # 批次间的全流程脚本是否已执行
 # 在文件顶部添加 pytest 标记，排除非测试类，避免收集警告
 pytestmark = [pytest.mark.filterwarnings("ignore::pytest.PytestCollectionWarning")]
 
-def get_test_cases_by_module(module_path: str = None, case_type: str = "unit_test") -> list:
-    """根据模块路径过滤用例"""
+def select_cases(module_path: str = None, case_type: str = "unit_test", reindex: bool = False) -> list:
+    """根据模块路径过滤用例，返回用例元数据列表（path、case_id、case_name、module、step_count 等，按路径排序）"""
     config_manager = ConfigManager()
-    remote_os = config_manager.get_remote_os()
-    remote_ip = config_manager.get_remote_ip()
-    if case_type == "full_process_test":
-        if remote_ip != "127.0.0.1" and remote_os == "HarmonyOS":
-            case_manager = TestCaseManager("test_cases_ohos/full_process_test")
-        else:
-            case_manager = TestCaseManager("test_cases/full_process_test")
+    if ExecutionTarget.from_config(config_manager).backend == "hdc":
+        case_dir = f"test_cases_ohos/{case_type}"
     else:
-        if remote_ip != "127.0.0.1" and remote_os == "HarmonyOS":
-            case_manager = TestCaseManager("test_cases_ohos/unit_test")
-        else:
-            case_manager = TestCaseManager("test_cases/unit_test")
-    all_cases = case_manager.get_all_test_case_paths()
-    
-    if not module_path:
-        return all_cases
-    
-    target_module = Path(module_path).resolve()
-    if not target_module.exists():
+        case_dir = f"test_cases/{case_type}"
+
+    target_module = Path(module_path).resolve() if module_path else None
+    # 打包用例库中的单个用例（"用例库#用例标识"）检查用例库文件是否存在
+    if target_module is not None and not Path(CasePack.split_path(target_module)[0]).exists():
         raise FileNotFoundError(f"模块路径不存在: {target_module}")
-    
-    filtered_cases = []
-    for case in all_cases:
-        case_abs = Path(case).resolve()
-        if target_module in case_abs.parents or case_abs.parent == target_module or case_abs == target_module:
-            filtered_cases.append(case)
 
-    print(f"模块 {module_path} 下共找到 {len(filtered_cases)} 个{case_type}用例")
+    if config_manager.get_case_index_enabled():
+        # 从用例索引中按路径选取（索引按目录 mtime 增量更新），不再遍历全部用例逐个比较路径
+        TestCaseManager(case_dir)  # 确保用例目录存在
+        case_index = CaseIndex.get(config_manager.get_case_index_file())
+        if reindex:
+            case_index.sync(case_dir, full=True)
+        filtered_cases = case_index.select(case_dir, path_filter=str(target_module) if target_module else None)
+    else:
+        case_manager = TestCaseManager(case_dir)
+        filtered_cases = []
+        for case in sorted(case_manager.get_all_test_case_paths()):
+            case_abs = Path(case).resolve()
+            case_file = Path(CasePack.split_path(case_abs)[0])
+            if target_module is None or target_module in case_abs.parents or case_abs == target_module or case_file == target_module:
+                filtered_cases.append(_case_metadata(case_manager, case))
+
+    if module_path:
+        print(f"模块 {module_path} 下共找到 {len(filtered_cases)} 个{case_type}用例")
     return filtered_cases
 
-def clear_full_process_logfile(filtered_cases):
+def _case_metadata(case_manager: TestCaseManager, case_path: str) -> dict:
+    """未启用用例索引时，加载用例文件获取排序所需的元数据；加载失败的用例按文件名作为用例标识，执行时再报出错误"""
+    try:
+        test_case = case_manager.load_test_case(Path(case_path))
+    except Exception as e:
+        return {"path": case_path, "case_id": CasePack.split_path(case_path)[1] or Path(case_path).stem, "case_name": "", "module": "", "step_count": 0, "error": str(e)}
+    return {
+        "path": case_path,
+        "case_id": test_case["case_id"],
+        "case_name": test_case["case_name"],
+        "module": test_case.get("module", "未知特性模块"),
+        "step_count": len(test_case["execution_steps"]),
+        "error": None,
+    }
+
+def order_cases(cases: list, strategy: str, seed: int) -> list:
+    """按排序策略和历史耗时排列用例，返回排列后的用例元数据列表"""
+    config_manager = ConfigManager()
+    durations = CaseHistory.get(config_manager.get_case_history_file()).durations(case["case_id"] for case in cases)
+    return CaseScheduler.order(cases, strategy, seed, durations)
+
+def snapshot_full_process_logfile(filtered_cases, target: ExecutionTarget):
     case_manager = TestCaseManager()
     config_manager = ConfigManager()
-    remote_os = config_manager.get_remote_os()
-    remote_ip = config_manager.get_remote_ip()
-    remote_user = config_manager.get_remote_user()
-    remote_passwd = config_manager.get_remote_passwd()
-    remote_hdc_port = config_manager.get_hdc_port()
 
+    log_paths = []
     for case_path in filtered_cases:
         case_path_obj = Path(case_path)
         test_case = case_manager.load_test_case(case_path_obj)
@@ -74,46 +103,40 @@ def clear_full_process_logfile(filtered_cases):
         for step in steps:
             expected_type = step.get("expected_type", "terminal")
             expected_log = step.get("expected_log", "")
-                
             if expected_type == "logfile" and expected_log != "":
-                #print(f"！！！开始清理被测系统日志:{expected_log}")
-                success, stdout, stderr, returncode = CommandExecutor.clear_expected_logfile(
-                    expected_log=expected_log,
-                    remote_os=remote_os,
-                    remote_ip=remote_ip,
-                    remote_user=remote_user,
-                    remote_passwd=remote_passwd,
-                    remote_hdc_port=remote_hdc_port,
-                    output_file = f"logs/{remote_ip}_full_process_clear_logfile.log"
-                )
-                if not success or returncode != 0:
-                    raise RuntimeError(
-                        f"执行全流程用例前，清理日志文件失败（返回码: {returncode}）\n错误输出: {stderr}"
-                    )
-
-def run_full_process_script(shell_script):
-    case_manager = TestCaseManager()
-    config_manager = ConfigManager()
-    remote_os = config_manager.get_remote_os()
-    remote_ip = config_manager.get_remote_ip()
-    remote_user = config_manager.get_remote_user()
-    remote_passwd = config_manager.get_remote_passwd()
-    remote_hdc_port = config_manager.get_hdc_port()
+                log_paths.append(expected_log)
 
+    try:
+        # 所有待检查日志通过一次批量stat记录大小和inode，不再移动被测系统日志
+        LogBaseline.capture(
+            log_paths=log_paths,
+            baseline_file=config_manager.get_log_baseline_file(),
+            **target.remote_kwargs()
+        )
+    except RuntimeError as e:
+        raise RuntimeError(f"执行全流程用例前，记录日志基线失败\n{str(e)}")
+
+def run_full_process_script(shell_script, target: ExecutionTarget):
     success, stdout, stderr, returncode = CommandExecutor.run_script(
         shell_script=shell_script,
-        remote_os=remote_os,
-        remote_ip=remote_ip,
-        remote_user=remote_user,
-        remote_passwd=remote_passwd,
-        remote_hdc_port=remote_hdc_port,
-        output_file = f"logs/{remote_ip}_run_full_process_script.log"
+        **target.remote_kwargs(),
+        output_file = f"logs/{target.remote_ip}_run_full_process_script.log"
     )
     if not success or returncode != 0:
         raise RuntimeError(
             f"执行全流程启动或停止脚本失败，（返回码: {returncode}）\n错误输出: {stderr}"
         )
 
+def record_case_duration(test_case: dict, overall_result: str, duration: float):
+    """记录用例本次执行耗时，供之后的运行按历史耗时排序用例"""
+    try:
+        config_manager = ConfigManager()
+        CaseHistory.get(config_manager.get_case_history_file()).record(
+            test_case["case_id"], LogIndex.current_run_id(), duration, overall_result
+        )
+    except Exception as e:
+        print(f"记录用例 {test_case.get('case_id')} 的执行耗时失败: {str(e)}")
+
 @allure.epic("自动化测试用例执行")
 def test_run_case(case_path, init_test_session, batch):
     """pytest批量执行测试用例"""
@@ -126,24 +149,27 @@ def test_run_case(case_path, init_test_session, batch):
     
     # 执行完第一批次的单元测试用例后，执行全流程脚本
     if batch == 2 and not SHELL_SCRIPT_EXECUTED and shell_script:
-        batch2_cases = os.getenv("BATCH2_TEST_CASES", "").split(";")
-        filtered_cases = [case for case in batch2_cases if case]
-        clear_full_process_logfile(filtered_cases) # 在执行全流程脚本前，将所有用例需要检查的日志都清理掉，确保全流程用例检查的日志都是跑全流程生成的
+        filtered_cases = CaseManifest.batch_paths(2)
+        snapshot_full_process_logfile(filtered_cases, init_test_session) # 在执行全流程脚本前，记录所有用例需要检查的日志的当前偏移，确保全流程用例只检查跑全流程新生成的日志
 
         print(f"\n===== 开始执行全流程shell脚本：{shell_script} =====")
         try:
-            run_full_process_script(shell_script)
+            run_full_process_script(shell_script, init_test_session)
             time.sleep(5)  # 延迟20秒，确保全流程脚本执行完成
         except Exception as e:
             print(f"执行全流程脚本异常：{str(e)}")
             pytest.fail("全流程脚本执行失败，终止后续用例")
         SHELL_SCRIPT_EXECUTED = True
 
+    case_started = time.monotonic()
+    test_case, summary_recorded = {"case_id": CasePack.split_path(case_path)[1] or Path(case_path).stem, "_source_path": str(case_path), "_batch": batch}, False
+    history_recorded = False
     try:
         case_path_obj = Path(case_path)
         case_manager = TestCaseManager()
         test_case = case_manager.load_test_case(case_path_obj)
         test_case["_source_path"] = str(case_path_obj)
+        test_case["_batch"] = batch  # 全流程用例（batch2）共用一次全流程运行产生的日志，可复用会话内的远程日志缓存
 
         
         case_name = test_case.get("case_name", "未命名用例")
@@ -166,9 +192,16 @@ def test_run_case(case_path, init_test_session, batch):
             )
 
         with allure.step("执行测试代理"):
-            agent = TestExecuteAgent()
+            agent = TestExecuteAgent(target=init_test_session)  # init_test_session 为会话内解析一次的执行机描述
             final_state = agent.run(test_case)
 
+        run_summary = RunSummary.active()
+        if run_summary is not None: # 每个用例结束即更新 JUnit XML 和 HTML 摘要
+            run_summary.record_case(test_case, final_state['case_result'], final_state['errors'], time.monotonic() - case_started)
+            summary_recorded = True
+        record_case_duration(test_case, final_state['case_result'].get("overall_result", "未知"), time.monotonic() - case_started)
+        history_recorded = True
+
         with allure.step("验证测试结果"):
             # 断言用例结果
             error_details = "\n".join(final_state['errors']) if final_state['errors'] else "无错误"
@@ -192,6 +225,12 @@ def test_run_case(case_path, init_test_session, batch):
     except Exception as e:
         #print(f"用例执行异常：{str(e)}\n{traceback.format_exc()}")
         exception_info = f"{str(e)}\n{traceback.format_exc()}"
+        run_summary = RunSummary.active()
+        if run_summary is not None and not summary_recorded:
+            run_summary.record_case(test_case, {"steps": [], "overall_result": "不通过。用例执行异常"}, [exception_info],
+                                    time.monotonic() - case_started)
+        if not history_recorded:
+            record_case_duration(test_case, "不通过。用例执行异常", time.monotonic() - case_started)
         pytest.fail(f"用例执行过程中发生异常: {str(e)}\n{traceback.format_exc()}")
 
 
@@ -200,11 +239,9 @@ def pytest_generate_tests(metafunc):
     """在pytest收集用例阶段动态生成参数化用例"""
     print(f"进入钩子函数：pytest_generate_tests")
     if "case_path" in metafunc.fixturenames and "batch" in metafunc.fixturenames and metafunc.function.__name__ == "test_run_case":
-        batch1_cases = os.getenv("BATCH1_TEST_CASES", "").split(";")
-        batch1_cases = [case for case in batch1_cases if case]
-        
-        batch2_cases = os.getenv("BATCH2_TEST_CASES", "").split(";")
-        batch2_cases = [case for case in batch2_cases if case]
+        # 用例列表从 main.py 写入的用例清单中读取（TE_AGENT_MANIFEST）
+        batch1_cases = CaseManifest.batch_paths(1)
+        batch2_cases = CaseManifest.batch_paths(2)
         
         # 合并用例并添加批次标记
         all_cases_with_batch = []
@@ -221,7 +258,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="测试用例执行工具")
     parser.add_argument(
         "-t", "--testcase", 
-        help="指定单个测试用例文件路径（如：test_cases/test_case_1.json）",
+        help="指定单个测试用例文件路径（如：test_cases/test_case_1.json），或打包用例库中的单个用例（如：test_cases/unit_test/module_1/cases.tcpack#XXX_TEST_002）",
         type=str
     )
     parser.add_argument(
@@ -244,29 +281,159 @@ if __name__ == "__main__":
         default="reports/allure_results"
     )
 
+    parser.add_argument(
+        "-s", "--search",
+        help="在历史运行日志的全文索引中检索关键词（如：python main.py --search \"[  FAILED  ]\"），检索完成后退出，不执行用例",
+        type=str,
+        default=None
+    )
+    parser.add_argument(
+        "--search-case",
+        help="配合 --search 使用，只检索指定用例编号的日志",
+        type=str,
+        default=None
+    )
+
+    parser.add_argument(
+        "--order",
+        help="用例执行顺序：longest_first（按历史耗时长用例优先）/ random（随机打乱，用于排查依赖执行顺序的问题）/ path（按路径）；默认取配置 execution.case_order",
+        choices=ORDER_STRATEGIES,
+        default=None
+    )
+    parser.add_argument(
+        "--seed",
+        help="用例排序的随机种子（决定 random 顺序和耗时相同用例的顺序），指定相同种子可复现上一次的执行顺序",
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        "--shard",
+        help="分片执行 i/n（如 2/4）：将选取的用例均衡分为 n 份，本机只执行第 i 份；全流程用例整体分在同一分片。"
+             "分片只取决于 --shard-plan / --durations 指定的共享文件，都未指定时按用例个数均衡，不读取本机耗时历史",
+        type=str,
+        default=None
+    )
+    parser.add_argument(
+        "--shard-plan",
+        help="分片方案文件：配合 --shard 使用时读取该方案（各执行机使用同一份，方案与本机选取的用例不一致时报错退出）；"
+             "配合 --make-shard-plan 使用时写入该方案",
+        type=str,
+        default=None
+    )
+    parser.add_argument(
+        "--make-shard-plan",
+        help="生成 n 个分片的分片方案写入 --shard-plan 指定的文件后退出，不执行用例（如 --make-shard-plan 4 --shard-plan shard_plan.json）",
+        type=int,
+        default=None
+    )
+    parser.add_argument(
+        "--durations",
+        help="各执行机共享的用例耗时文件（JSON：用例标识 -> 秒），分片时按其均衡耗时",
+        type=str,
+        default=None
+    )
+    parser.add_argument(
+        "--export-durations",
+        help="将本机耗时历史中各用例的估算耗时导出为 --durations 使用的文件后退出，不执行用例",
+        type=str,
+        default=None
+    )
+    parser.add_argument(
+        "--shard-checksum",
+        help="期望的分片方案校验码，与本机得到的分片方案不一致时报错退出",
+        type=str,
+        default=None
+    )
+    parser.add_argument(
+        "--reindex",
+        help="选取用例前全量检查用例索引中的每个用例文件（默认只按目录修改时间增量更新）",
+        action="store_true"
+    )
+
     args = parser.parse_args()
 
-    filtered_cases = []
-    if args.testcase:
-        filtered_cases = get_test_cases_by_module(args.testcase, "unit_test") # 获取单个用例
-    else:
-        filtered_cases = get_test_cases_by_module(args.module, "unit_test") # 获取模块过滤后的用例列表
+    if args.search:
+        search_config = ConfigManager()
+        results = LogIndex.get(search_config.get_log_index_file()).search(args.search, case_id=args.search_case, limit=200)
+        for row in results:
+            print(f"[{row['run_id']}] {row['case_id']} 步骤{row['step']} 第{row['line_no']}行: {row['content']}")
+        print(f"共检索到 {len(results)} 条（最多显示200条）")
+        raise SystemExit(0)
 
-    filtered_cases2 = []
-    if args.testcase:
-        filtered_cases2 = get_test_cases_by_module(args.testcase, "full_process_test")
-    else:
-        filtered_cases2 = get_test_cases_by_module(args.module, "full_process_test")
+    config_manager = ConfigManager()
+    if args.export_durations:
+        durations = CaseHistory.get(config_manager.get_case_history_file()).durations()
+        os.makedirs(os.path.dirname(os.path.abspath(args.export_durations)), exist_ok=True)
+        with open(args.export_durations, "w", encoding="utf-8") as f:
+            json.dump({case_id: round(duration, 3) for case_id, duration in sorted(durations.items())}, f, ensure_ascii=False, indent=2)
+        print(f"已导出 {len(durations)} 个用例的估算耗时到 {args.export_durations}")
+        raise SystemExit(0)
+
+    order_strategy = args.order or config_manager.get_case_order()
+    order_seed = args.seed if args.seed is not None else config_manager.get_case_order_seed()
+    if order_seed is None:
+        order_seed = random.randrange(2 ** 31)
+    print(f"用例排序策略: {order_strategy}，随机种子: {order_seed}（可用 --order {order_strategy} --seed {order_seed} 复现本次顺序）")
+
+    case_filter = args.testcase or args.module # 单个用例或模块目录，均未指定时选取全部用例
+    selected_cases = select_cases(case_filter, "unit_test", args.reindex)
+    selected_cases2 = select_cases(case_filter, "full_process_test", args.reindex)
+
+    os.environ.pop(SHARD_ENV, None)
+    if args.shard or args.make_shard_plan:
+        # 分片方案只取决于各执行机共享的输入（方案文件、耗时文件、用例相对路径），不读取本机耗时历史
+        try:
+            if args.make_shard_plan:
+                if not args.shard_plan or args.shard:
+                    raise ValueError("--make-shard-plan 需要配合 --shard-plan 指定输出文件，且不能与 --shard 同时使用")
+                shard_index, shard_count = None, args.make_shard_plan
+                if shard_count < 1:
+                    raise ValueError(f"分片数错误: {shard_count}，应不小于1")
+            else:
+                shard_index, shard_count = CaseScheduler.parse_shard(args.shard)
+            if args.shard and args.shard_plan:
+                shards = CaseScheduler.load_plan(args.shard_plan, selected_cases, selected_cases2, shard_count)
+                print(f"使用分片方案文件: {args.shard_plan}")
+            else:
+                durations = CaseScheduler.load_durations(args.durations) if args.durations else {}
+                shards = CaseScheduler.plan_shards(selected_cases, selected_cases2, shard_count, durations)
+                print(f"分片依据: {f'共享耗时文件 {args.durations}' if args.durations else '用例个数（未指定 --durations / --shard-plan）'}")
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        checksum = CaseScheduler.plan_checksum(shards)
+        for idx, shard in enumerate(shards, 1):
+            print(f"{'* ' if idx == shard_index else '  '}分片 {idx}/{shard_count}: 单元测试用例 {len(shard['batch1'])} 个，"
+                  f"全流程测试用例 {len(shard['batch2'])} 个，估算耗时 {shard['estimate']:.0f}s")
+        print(f"分片方案校验码: {checksum}")
+        if args.shard_checksum and args.shard_checksum != checksum:
+            parser.error(f"分片方案校验码 {checksum} 与期望的 {args.shard_checksum} 不一致，各执行机的分片方案不同，停止执行")
+        if args.make_shard_plan:
+            CaseScheduler.write_plan(args.shard_plan, shards)
+            print(f"分片方案已写入: {args.shard_plan}（各执行机使用 --shard i/{shard_count} --shard-plan {args.shard_plan} 执行）")
+            raise SystemExit(0)
+        selected_cases, selected_cases2 = shards[shard_index - 1]["batch1"], shards[shard_index - 1]["batch2"]
+        os.environ[SHARD_ENV] = f"{shard_index}/{shard_count}"
+    elif args.shard_plan or args.durations or args.shard_checksum:
+        parser.error("--shard-plan / --durations / --shard-checksum 需要配合 --shard 或 --make-shard-plan 使用")
+
+    filtered_cases = order_cases(selected_cases, order_strategy, order_seed)
+    filtered_cases2 = order_cases(selected_cases2, order_strategy, order_seed)
 
     print(f"单元测试用例,共{len(filtered_cases)}个; 全流程测试用例，共{len(filtered_cases2)}个")
 
-    config_manager = ConfigManager()
     full_process_start = config_manager.get_full_process_start_script()
     full_process_stop = config_manager.get_full_process_stop_script()
 
-    # 环境变量传递用例和全流程脚本路径
-    os.environ["BATCH1_TEST_CASES"] = ";".join(filtered_cases)
-    os.environ["BATCH2_TEST_CASES"] = ";".join(filtered_cases2)
+    # 环境变量传递本次运行编号（用于日志全文索引）、用例清单和全流程脚本路径；用例列表写入清单文件，不放入环境变量
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    os.environ[RUN_ID_ENV] = run_id
+    manifest_file = config_manager.get_case_manifest_file()
+    CaseManifest.write(manifest_file, {1: filtered_cases, 2: filtered_cases2},
+        run_id=run_id, order=order_strategy, seed=order_seed, shard=os.getenv(SHARD_ENV) or None)
+    os.environ[MANIFEST_ENV] = os.path.abspath(manifest_file)
+    for legacy_env in LEGACY_BATCH_ENV.values():
+        os.environ.pop(legacy_env, None)
+    print(f"用例清单已写入: {manifest_file}")
     os.environ["SHELL_SCRIPT_PATH"] = full_process_start
     #os.environ["STOP_SCRIPT_PATH"] = full_process_stop
 
@@ -3,5 +3,7 @@ GD-Agent 配置管理包
 """
 
 from .test_case_manager import TestCaseManager
+from .case_index import CaseIndex
+from .case_pack import CasePack
 
-__all__ = ["TestCaseManager"] 
\ No newline at end of file
+__all__ = ["TestCaseManager", "CaseIndex", "CasePack"] 
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+用例索引
+用例目录下每个JSON用例文件（以及打包用例库 .tcpack 中每个用例）的 用例标识、名称、特性模块、路径、步骤数、适用的执行机系统、内容哈希 持久化在
+SQLite 索引（history/case_index.db）中。每次选取用例前按目录 mtime 增量更新：只 stat 已知目录，
+mtime 变化的目录（增删改名文件或子目录）才重新列出并解析其中变化的用例文件，目录未变化时不访问其中的用例文件。
+之后按模块、单个用例或过滤条件选取用例只是一次索引查询，用例数量达到数万时也在毫秒级完成。
+
+注意：原地覆盖写入文件（不经过改名）不会改变目录 mtime，这类修改只影响选取用例时的元数据；
+执行时用例仍由 TestCaseManager 按文件 mtime 重新加载。需要时可用 sync(full=True) 或 python main.py --reindex 全量检查。
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from test_case_manager.case_pack import CasePack, PACK_SUFFIX, PACK_SEP
+
+OHOS_CASE_DIR = "test_cases_ohos"
+
+
+class CaseIndex:
+    """用例目录的持久化索引，进程内按索引文件共享一个实例"""
+
+    _instances: Dict[str, "CaseIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        # 目录和用例只按路径登记一次，不区分是从哪个用例根目录同步的：
+        # 先后以 test_cases 和 test_cases/unit_test 为根目录选取用例时共用同一份记录，按路径前缀区间查询
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cases ("
+            "path TEXT PRIMARY KEY, dir TEXT, real_path TEXT, case_id TEXT, case_name TEXT, module TEXT, "
+            "step_count INTEGER, remote_os TEXT, content_hash TEXT, mtime_ns INTEGER, size INTEGER, error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_dir ON cases (dir)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_real_path ON cases (real_path)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_module ON cases (module)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cases_case_id ON cases (case_id)")
+        self._conn.commit()
+
+    @staticmethod
+    def _under(root: str) -> Tuple[str, List[str]]:
+        """root 本身及其下全部路径的查询条件：路径以 "root/" 开头，"/" 的下一个字符是 "0"，区间查询可以使用主键索引"""
+        prefix = root.rstrip(os.sep) + os.sep
+        return "(path = ? OR (path > ? AND path < ?))", [root, prefix, root.rstrip(os.sep) + chr(ord(os.sep) + 1)]
+
+    @classmethod
+    def get(cls, db_file: str) -> "CaseIndex":
+        """获取进程内共享的索引实例"""
+        with cls._instances_lock:
+            if db_file not in cls._instances:
+                cls._instances[db_file] = cls(db_file)
+            return cls._instances[db_file]
+
+    @staticmethod
+    def os_family(remote_os: str) -> str:
+        """用例适用的执行机系统：鸿蒙执行机的用例为 HarmonyOS，其余（本地/Linux执行机）为空字符串"""
+        return "HarmonyOS" if remote_os == "HarmonyOS" else ""
+
+    def sync(self, root: str, full: bool = False) -> Dict[str, int]:
+        """
+        按目录 mtime 增量更新 root 下的用例索引
+        :param full: 为 True 时重新列出所有目录并检查每个用例文件的 mtime 和大小
+        :return: 本次更新的统计（扫描目录数、更新用例数、删除用例数）
+        """
+        root = os.path.abspath(root)
+        stats = {"dirs": 0, "updated": 0, "removed": 0}
+        with self._lock:
+            clause, params = self._under(root)
+            known = dict(self._conn.execute(f"SELECT path, mtime_ns FROM dirs WHERE {clause}", params))
+            pending = [] if root in known else [root]
+            for dir_path, mtime_ns in known.items():
+                try:
+                    st = os.stat(dir_path)
+                except OSError:
+                    stats["removed"] += self._remove_dir(dir_path)
+                    continue
+                if full or st.st_mtime_ns != mtime_ns:
+                    pending.append(dir_path)
+
+            seen = set(known)
+            while pending:
+                dir_path = pending.pop()
+                stats["dirs"] += 1
+                for sub_dir in self._scan_dir(dir_path, stats):
+                    if sub_dir not in seen:
+                        seen.add(sub_dir)
+                        pending.append(sub_dir)
+            self._conn.commit()
+        return stats
+
+    def _remove_dir(self, dir_path: str) -> int:
+        removed = self._conn.execute("DELETE FROM cases WHERE dir = ?", (dir_path,)).rowcount
+        self._conn.execute("DELETE FROM dirs WHERE path = ?", (dir_path,))
+        return removed
+
+    def _scan_dir(self, dir_path: str, stats: Dict[str, int]) -> List[str]:
+        """重新列出一个目录：更新其中变化的用例文件，删除已不存在的用例，返回子目录列表"""
+        try:
+            # 先记录目录 mtime 再列出内容：列出期间目录发生变化时，下次更新会再次扫描
+            dir_mtime = os.stat(dir_path).st_mtime_ns
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            stats["removed"] += self._remove_dir(dir_path)
+            return []
+
+        indexed = {
+            path: (mtime_ns, size) for path, mtime_ns, size in
+            self._conn.execute("SELECT path, mtime_ns, size FROM cases WHERE dir = ?", (dir_path,))
+        }
+        # 打包用例库中的用例共用用例库文件的 mtime 和大小，按用例库文件整体判断是否变化
+        pack_versions = {CasePack.split_path(path)[0]: version for path, version in indexed.items() if CasePack.is_pack_path(path)}
+        sub_dirs, present = [], set()
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_dirs.append(entry.path)
+            elif entry.name.lower().endswith(".json") and entry.is_file():
+                present.add(entry.path)
+                st = entry.stat()
+                if indexed.get(entry.path) != (st.st_mtime_ns, st.st_size):
+                    self._index_file(dir_path, entry.path, st)
+                    stats["updated"] += 1
+            elif entry.name.endswith(PACK_SUFFIX) and entry.is_file():
+                st = entry.stat()
+                if pack_versions.get(entry.path) != (st.st_mtime_ns, st.st_size):
+                    pack_paths = self._index_pack(dir_path, entry.path, st)
+                    stats["updated"] += len(pack_paths)
+                else:
+                    pack_paths = [path for path in indexed if CasePack.split_path(path)[0] == entry.path]
+                present.update(pack_paths)
+        for path in set(indexed) - present:
+            self._conn.execute("DELETE FROM cases WHERE path = ?", (path,))
+            stats["removed"] += 1
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", (dir_path, dir_mtime)
+        )
+        return sub_dirs
+
+    def _index_file(self, dir_path: str, path: str, st: os.stat_result):
+        """解析用例文件的元数据；格式错误的文件同样入索引（记录错误信息），执行时由 TestCaseManager 报出具体错误"""
+        with open(path, "rb") as f:
+            content = f.read()
+        case_id = os.path.splitext(os.path.basename(path))[0]
+        case_name, module, step_count, error = "", "", 0, None
+        try:
+            test_case = json.loads(content)
+            if not isinstance(test_case, dict):
+                raise ValueError("顶层必须为JSON对象")
+            case_id = str(test_case.get("case_id", case_id))
+            case_name = str(test_case.get("case_name", ""))
+            module = str(test_case.get("module", "未知特性模块"))
+            steps = test_case.get("execution_steps")
+            step_count = len(steps) if isinstance(steps, list) else 0
+        except ValueError as e:
+            error = str(e)
+        remote_os = "HarmonyOS" if OHOS_CASE_DIR in path.split(os.sep) else ""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cases (path, dir, real_path, case_id, case_name, module, step_count, "
+            "remote_os, content_hash, mtime_ns, size, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, dir_path, os.path.realpath(path), case_id, case_name, module, step_count, remote_os,
+             hashlib.sha1(content).hexdigest(), st.st_mtime_ns, st.st_size, error)
+        )
+
+    def _index_pack(self, dir_path: str, pack_file: str, st: os.stat_result) -> List[str]:
+        """登记打包用例库中的全部用例（元数据直接取自用例库索引，不读取用例内容），返回用例路径列表"""
+        try:
+            pack_index = CasePack.read_index(pack_file)
+        except (OSError, ValueError) as e:
+            print(f"读取打包用例库 {pack_file} 失败，跳过: {str(e)}")
+            return []
+        remote_os = "HarmonyOS" if OHOS_CASE_DIR in pack_file.split(os.sep) else ""
+        real_file = os.path.realpath(pack_file)
+        paths = []
+        for case_id, entry in pack_index.items():
+            path = CasePack.case_path(pack_file, case_id)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cases (path, dir, real_path, case_id, case_name, module, step_count, "
+                "remote_os, content_hash, mtime_ns, size, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, dir_path, CasePack.case_path(real_file, case_id), case_id, entry["case_name"], entry["module"],
+                 entry["step_count"], remote_os, entry["sha1"], st.st_mtime_ns, st.st_size, None)
+            )
+            paths.append(path)
+        return paths
+
+    def select(self, root: str, path_filter: Optional[str] = None, module: Optional[str] = None,
+        case_ids: Optional[List[str]] = None, remote_os: Optional[str] = None, sync: bool = True) -> List[Dict[str, Any]]:
+        """
+        按条件选取 root 下的用例
+        :param path_filter: 模块目录、单个用例文件、打包用例库或打包库中的单个用例（"用例库#用例标识"），选取匹配的全部用例
+        :param module: 用例的 module 字段
+        :param case_ids: 用例标识列表
+        :param remote_os: 执行机系统类型，只选取适用于该系统的用例
+        :param sync: 查询前先按目录 mtime 增量更新索引
+        :return: 用例元数据列表（按路径排序）
+        """
+        root = os.path.abspath(root)
+        if sync:
+            self.sync(root)
+        root_clause, params = self._under(root)
+        clauses = [root_clause]
+        if path_filter:
+            pack_file, pack_case_id = CasePack.split_path(path_filter)
+            target = os.path.realpath(pack_file) if pack_case_id is None else CasePack.case_path(os.path.realpath(pack_file), pack_case_id)
+            # 目录下的全部文件：real_path 以 "目录/" 开头，"/" 的下一个字符是 "0"，区间查询可以使用索引；
+            # 打包用例库中的全部用例：real_path 以 "用例库#" 开头
+            clauses.append("(real_path = ? OR (real_path > ? AND real_path < ?) OR (real_path > ? AND real_path < ?))")
+            params.extend([target, target.rstrip(os.sep) + os.sep, target.rstrip(os.sep) + chr(ord(os.sep) + 1),
+                           target + PACK_SEP, target + chr(ord(PACK_SEP) + 1)])
+        if module is not None:
+            clauses.append("module = ?")
+            params.append(module)
+        if case_ids is not None:
+            clauses.append(f"case_id IN ({', '.join('?' * len(case_ids))})")
+            params.extend(case_ids)
+        if remote_os is not None:
+            clauses.append("remote_os = ?")
+            params.append(self.os_family(remote_os))
+        columns = ("path", "case_id", "case_name", "module", "step_count", "remote_os", "content_hash", "error")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM cases WHERE {' AND '.join(clauses)} ORDER BY path", params
+            ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def paths(self, root: str, **filters) -> List[str]:
+        """按条件选取用例，只返回用例文件路径"""
+        return [row["path"] for row in self.select(root, **filters)]
@@ -0,0 +1,74 @@
+"""
+用例清单
+main.py 选取、分片、排序后的用例写入清单文件（JSON Lines：第一行为运行信息，之后每行一个用例，
+含路径、批次和执行顺序；用例内容由 pytest 执行时经 TestCaseManager 缓存加载，清单中不重复保存用例元数据），只通过环境变量 TE_AGENT_MANIFEST 传递清单路径；
+pytest 收集用例、全流程用例记录日志基线时按需逐行读取清单。用例很多、路径很长时也不会超出环境变量的长度限制，
+也不会把整个用例列表复制到每个子进程的环境中。
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+
+MANIFEST_ENV = "TE_AGENT_MANIFEST"
+MANIFEST_VERSION = 1
+# 未使用清单时（如直接执行 pytest main.py）兼容原有的环境变量用例列表
+LEGACY_BATCH_ENV = {1: "BATCH1_TEST_CASES", 2: "BATCH2_TEST_CASES"}
+
+
+class CaseManifest:
+    """用例清单的写入和读取"""
+
+    @staticmethod
+    def write(manifest_file: str, batches: Dict[int, List[Dict[str, Any]]], **run_info) -> int:
+        """
+        写入用例清单（先写临时文件再原子替换）
+        :param batches: 批次 -> 按执行顺序排列的用例元数据列表（只写入其中的 path）
+        :param run_info: 写入首行的运行信息（如 run_id、order、seed、shard）
+        :return: 写入的用例数
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(manifest_file)), exist_ok=True)
+        tmp_file = f"{manifest_file}.tmp"
+        count = 0
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            header = {"version": MANIFEST_VERSION, "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **run_info}
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for batch, cases in sorted(batches.items()):
+                for order, case in enumerate(cases, 1):
+                    f.write(json.dumps({"path": case["path"], "batch": batch, "order": order}, ensure_ascii=False) + "\n")
+                    count += 1
+        os.replace(tmp_file, manifest_file)
+        return count
+
+    @staticmethod
+    def header(manifest_file: str) -> Dict[str, Any]:
+        """读取清单首行的运行信息"""
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+        if header.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"不支持的用例清单版本: {header.get('version')}（{manifest_file}）")
+        return header
+
+    @staticmethod
+    def iter_cases(manifest_file: str, batch: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """逐行读取清单中的用例（按批次、执行顺序），batch 不为 None 时只返回该批次的用例"""
+        CaseManifest.header(manifest_file)
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            f.readline()
+            for line in f:
+                if not line.strip():
+                    continue
+                case = json.loads(line)
+                if batch is None or case["batch"] == batch:
+                    yield case
+
+    @staticmethod
+    def batch_paths(batch: int) -> List[str]:
+        """
+        当前运行某一批次的用例路径（按执行顺序）
+        优先读取环境变量 TE_AGENT_MANIFEST 指定的清单，未设置时读取原有的 BATCH1/BATCH2_TEST_CASES 环境变量
+        """
+        manifest_file = os.getenv(MANIFEST_ENV, "")
+        if manifest_file:
+            return [case["path"] for case in CaseManifest.iter_cases(manifest_file, batch)]
+        return [case for case in os.getenv(LEGACY_BATCH_ENV[batch], "").split(";") if case]
@@ -0,0 +1,170 @@
+"""
+打包用例库（.tcpack）
+用例数量很大时，一个目录（特性模块）下的全部JSON用例可以打包为一个 .tcpack 文件：
+    文件头 b"TCPACK1\\n" | 各用例JSON的原始字节依次排列 | 索引（JSON：用例标识 -> 偏移、长度、名称、模块、步骤数、原相对路径、内容哈希） | 文件尾（索引偏移、索引长度、b"TCPACKIX"）
+打开用例库只读取文件尾和索引，按用例标识定位偏移后只读取该用例的字节，不需要逐个打开、解析上万个小文件。
+每个目录的用例库写在该目录内（test_cases/unit_test/module_1/cases.tcpack），按目录选取用例（-m）时子目录和用例库一并选中。
+打包库中的用例以 "用例库路径#用例标识" 表示（如 test_cases/unit_test/module_1/cases.tcpack#XXX_TEST_002），
+TestCaseManager、用例索引和 main.py 的 -t/-m 参数对两种格式透明处理。
+
+用例仍以JSON目录树的形式维护（便于 git diff 审阅），执行机上用 case_pack_cli 按需转换（保留原始字节，往返转换内容不变）：
+    python -m test_case_manager.case_pack_cli import test_cases/unit_test packs/unit_test   # JSON目录树 -> 打包库（每个目录一个 .tcpack）
+    python -m test_case_manager.case_pack_cli export packs/unit_test test_cases/unit_test   # 打包库 -> JSON目录树
+    python -m test_case_manager.case_pack_cli list packs/unit_test/module_1/cases.tcpack
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+PACK_SUFFIX = ".tcpack"
+PACK_SEP = "#"
+PACK_MAGIC = b"TCPACK1\n"
+INDEX_MAGIC = b"TCPACKIX"
+FOOTER = struct.Struct("<QQ8s")
+PACK_FILE_NAME = f"cases{PACK_SUFFIX}"  # 每个目录的JSON用例打包后的文件名（写在该目录内）
+
+
+class CasePack:
+    """打包用例库的读写和与JSON目录树的相互转换"""
+
+    _index_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Dict[str, Any]]]] = {}
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def is_pack_path(path: str) -> bool:
+        """是否为打包库中的用例（"xxx.tcpack#用例标识"）"""
+        return f"{PACK_SUFFIX}{PACK_SEP}" in str(path)
+
+    @staticmethod
+    def split_path(path: str) -> Tuple[str, Optional[str]]:
+        """拆分用例路径为 (文件路径, 用例标识)；JSON用例的用例标识为 None"""
+        path = str(path)
+        if not CasePack.is_pack_path(path):
+            return path, None
+        pack_file, _, case_id = path.rpartition(PACK_SEP)
+        return pack_file, case_id
+
+    @staticmethod
+    def case_path(pack_file: str, case_id: str) -> str:
+        return f"{pack_file}{PACK_SEP}{case_id}"
+
+    @staticmethod
+    def write(pack_file: str, cases: List[Tuple[str, bytes]]) -> int:
+        """
+        写入打包库（先写临时文件再原子替换）
+        :param cases: (原相对路径, 用例JSON原始字节) 列表
+        :return: 写入的用例数
+        """
+        index: Dict[str, Dict[str, Any]] = {}
+        tmp_file = f"{pack_file}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(pack_file)), exist_ok=True)
+        with open(tmp_file, "wb") as f:
+            f.write(PACK_MAGIC)
+            for source, content in cases:
+                test_case = json.loads(content)
+                case_id = test_case.get("case_id") if isinstance(test_case, dict) else None
+                if not isinstance(case_id, str) or not case_id:
+                    raise ValueError(f"用例 {source} 缺少 case_id，无法打包")
+                if PACK_SEP in case_id:
+                    raise ValueError(f"用例 {source} 的 case_id 不能包含 '{PACK_SEP}'")
+                if case_id in index:
+                    raise ValueError(f"用例标识重复: {case_id}（{index[case_id]['source']} 和 {source}）")
+                steps = test_case.get("execution_steps")
+                index[case_id] = {
+                    "offset": f.tell(),
+                    "length": len(content),
+                    "case_name": test_case.get("case_name", ""),
+                    "module": test_case.get("module", "未知特性模块"),
+                    "step_count": len(steps) if isinstance(steps, list) else 0,
+                    "source": source.replace(os.sep, "/"),
+                    "sha1": hashlib.sha1(content).hexdigest(),
+                }
+                f.write(content)
+            index_offset = f.tell()
+            index_bytes = json.dumps(index, ensure_ascii=False).encode("utf-8")
+            f.write(index_bytes)
+            f.write(FOOTER.pack(index_offset, len(index_bytes), INDEX_MAGIC))
+        os.replace(tmp_file, pack_file)
+        return len(index)
+
+    @staticmethod
+    def read_index(pack_file: str) -> Dict[str, Dict[str, Any]]:
+        """读取打包库的索引（只读取文件尾和索引部分），按 (路径, mtime, 大小) 缓存"""
+        st = os.stat(pack_file)
+        key, version = os.path.abspath(pack_file), (st.st_mtime_ns, st.st_size)
+        with CasePack._cache_lock:
+            cached = CasePack._index_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with open(pack_file, "rb") as f:
+            if f.read(len(PACK_MAGIC)) != PACK_MAGIC or st.st_size < len(PACK_MAGIC) + FOOTER.size:
+                raise ValueError(f"不是有效的打包用例库: {pack_file}")
+            f.seek(st.st_size - FOOTER.size)
+            index_offset, index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != INDEX_MAGIC or index_offset + index_length + FOOTER.size != st.st_size:
+                raise ValueError(f"打包用例库索引损坏: {pack_file}")
+            f.seek(index_offset)
+            index = json.loads(f.read(index_length))
+        with CasePack._cache_lock:
+            CasePack._index_cache[key] = (version, index)
+        return index
+
+    @staticmethod
+    def read_case(pack_file: str, case_id: str) -> bytes:
+        """按用例标识读取用例JSON的原始字节"""
+        entry = CasePack.read_index(pack_file).get(case_id)
+        if entry is None:
+            raise FileNotFoundError(f"打包用例库 {pack_file} 中不存在用例: {case_id}")
+        with open(pack_file, "rb") as f:
+            f.seek(entry["offset"])
+            content = f.read(entry["length"])
+        if len(content) != entry["length"]:
+            raise ValueError(f"打包用例库 {pack_file} 中用例 {case_id} 的内容被截断")
+        return content
+
+    @staticmethod
+    def case_paths(pack_file: str) -> List[str]:
+        """打包库中全部用例的路径（"用例库路径#用例标识"）"""
+        return [CasePack.case_path(pack_file, case_id) for case_id in CasePack.read_index(pack_file)]
+
+    @staticmethod
+    def import_tree(tree_dir: str, pack_dir: str) -> Dict[str, int]:
+        """
+        JSON目录树 -> 打包库：每个含JSON用例的目录打包为 pack_dir 下对应相对目录内的 cases.tcpack
+        （test_cases/unit_test/module_1/*.json -> pack_dir/module_1/cases.tcpack，根目录下的用例 -> pack_dir/cases.tcpack），
+        用例库与子目录的用例库都在该目录下，按目录选取用例时一并选中；
+        pack_dir 中已有的其他 .tcpack 文件会被删除
+        :return: 打包库路径 -> 用例数
+        """
+        tree = Path(tree_dir)
+        groups: Dict[Path, List[Path]] = {}
+        for json_file in sorted(tree.rglob("*.json")):
+            groups.setdefault(json_file.parent, []).append(json_file)
+        written = {}
+        for directory, files in sorted(groups.items()):
+            rel_dir = directory.relative_to(tree)
+            pack_file = Path(pack_dir) / rel_dir / PACK_FILE_NAME
+            cases = [(str(json_file.relative_to(tree)), json_file.read_bytes()) for json_file in files]
+            written[str(pack_file)] = CasePack.write(str(pack_file), cases)
+        # 删除 pack_dir 中本次没有生成的旧用例库（对应目录已删除或不再含用例），与JSON目录树保持一致
+        for stale_file in Path(pack_dir).rglob(f"*{PACK_SUFFIX}"):
+            if str(stale_file) not in written:
+                stale_file.unlink()
+        return written
+
+    @staticmethod
+    def export_tree(pack_dir: str, tree_dir: str) -> int:
+        """打包库 -> JSON目录树：按打包时记录的原相对路径写回各用例的原始字节，返回写出的用例数"""
+        count = 0
+        for pack_file in sorted(Path(pack_dir).rglob(f"*{PACK_SUFFIX}")):
+            for case_id, entry in CasePack.read_index(str(pack_file)).items():
+                target = Path(tree_dir) / entry["source"]
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(CasePack.read_case(str(pack_file), case_id))
+                count += 1
+        return count
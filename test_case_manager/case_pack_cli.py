@@ -0,0 +1,38 @@
+"""
+打包用例库命令行：JSON用例目录树与打包用例库（.tcpack）的相互转换，见 test_case_manager.case_pack
+    python -m test_case_manager.case_pack_cli import test_cases/unit_test packs/unit_test
+    python -m test_case_manager.case_pack_cli export packs/unit_test test_cases/unit_test
+    python -m test_case_manager.case_pack_cli list packs/unit_test/module_1/cases.tcpack
+"""
+import argparse
+from typing import List
+from test_case_manager.case_pack import CasePack
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="打包用例库（.tcpack）与JSON用例目录树的相互转换")
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import", help="JSON用例目录树 -> 打包库（每个目录一个 .tcpack）")
+    import_parser.add_argument("tree_dir", help="JSON用例目录（如 test_cases/unit_test）")
+    import_parser.add_argument("pack_dir", help="打包库输出目录")
+    export_parser = sub.add_parser("export", help="打包库 -> JSON用例目录树")
+    export_parser.add_argument("pack_dir", help="打包库目录")
+    export_parser.add_argument("tree_dir", help="JSON用例输出目录")
+    list_parser = sub.add_parser("list", help="列出打包库中的用例")
+    list_parser.add_argument("pack_file", help="打包库文件")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        written = CasePack.import_tree(args.tree_dir, args.pack_dir)
+        for pack_file, count in written.items():
+            print(f"{pack_file}: {count} 个用例")
+        print(f"共打包 {sum(written.values())} 个用例到 {len(written)} 个用例库")
+    elif args.command == "export":
+        print(f"共导出 {CasePack.export_tree(args.pack_dir, args.tree_dir)} 个用例到 {args.tree_dir}")
+    else:
+        for case_id, entry in CasePack.read_index(args.pack_file).items():
+            print(f"{case_id}\t{entry['case_name']}\t{entry['module']}\t步骤数 {entry['step_count']}\t{entry['source']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+用例执行顺序
+按历史耗时将长用例排在前面（longest_first），并行执行时长用例不会集中落在最后，缩短整体执行时间；
+耗时相同（如首次执行、没有历史记录）的用例按种子打乱，同一种子得到同一顺序，便于复现。
+random 策略按种子完全随机打乱，用于排查依赖执行顺序的问题；path 策略按用例路径排序。
+
+分片（python main.py --shard i/n）：将选取的用例均衡地分到 n 台执行机上，
+每个单元测试用例是一个分配单元，全流程用例（batch2）共用一次全流程运行，整体作为一个分配单元、只分到一个分片；
+按最长处理时间优先（LPT）依次分给当前估算耗时最少的分片。分配只取决于各执行机共享的输入，不读取本机的耗时历史：
+    - 指定 --shard-plan 时直接使用预先生成的分片方案文件（所有执行机使用同一份），方案与本机选取的用例不一致时报错退出；
+    - 指定 --durations 时按共享的耗时文件（用例标识 -> 秒，可由 --export-durations 从耗时历史导出后提交或分发）均衡；
+    - 都未指定时每个用例按1秒计，只按用例相对路径和个数均衡。
+"""
+import hashlib
+import json
+import os
+import random
+import statistics
+from typing import Dict, List, Any, Optional, Tuple
+
+ORDER_STRATEGIES = ("longest_first", "random", "path")
+SHARD_ENV = "TE_AGENT_SHARD"  # 当前分片（如 "2/4"），由 main.py 写入，pytest 会话据此为结果文件加分片后缀
+SHARD_PLAN_VERSION = 1
+
+
+class CaseScheduler:
+    """根据历史耗时决定用例执行顺序"""
+
+    @staticmethod
+    def estimates(cases: List[Dict[str, Any]], durations: Dict[str, float]) -> Dict[str, float]:
+        """
+        估算每个用例的耗时
+        :param cases: 用例元数据列表（至少包含 path、case_id）
+        :param durations: 用例标识 -> 历史平均耗时（秒）
+        :return: 用例路径 -> 估算耗时；没有历史记录的用例按已知用例耗时的中位数估算（都没有记录时每个用例按1秒计，即按个数均衡）
+        """
+        known = [durations[case["case_id"]] for case in cases if case["case_id"] in durations]
+        default = statistics.median(known) if known else 1.0
+        return {case["path"]: durations.get(case["case_id"], default) for case in cases}
+
+    @staticmethod
+    def order(cases: List[Dict[str, Any]], strategy: str, seed: Optional[int], durations: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        按策略排列用例
+        :param strategy: longest_first / random / path
+        :param seed: 随机种子，决定 random 的顺序和 longest_first 中耗时相同的用例的顺序
+        """
+        if strategy not in ORDER_STRATEGIES:
+            raise ValueError(f"不支持的用例排序策略: {strategy}，可选: {'/'.join(ORDER_STRATEGIES)}")
+        ordered = sorted(cases, key=lambda case: case["path"])
+        if strategy == "path":
+            return ordered
+        random.Random(seed).shuffle(ordered)
+        if strategy == "random":
+            return ordered
+        estimates = CaseScheduler.estimates(cases, durations)
+        ordered.sort(key=lambda case: estimates[case["path"]], reverse=True)  # 稳定排序，耗时相同的保持打乱后的顺序
+        return ordered
+
+    @staticmethod
+    def parse_shard(text: str) -> Tuple[int, int]:
+        """解析分片参数 "i/n"（i 从1开始），返回 (i, n)"""
+        try:
+            index, count = (int(part) for part in text.split("/"))
+        except ValueError:
+            raise ValueError(f"分片参数格式错误: {text}，应为 i/n，如 1/3")
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"分片参数错误: {text}，应满足 1 <= i <= n")
+        return index, count
+
+    @staticmethod
+    def shard_file(path: str, shard: Optional[str]) -> str:
+        """为结果文件加分片后缀（reports/junit.xml -> reports/junit.shard2of4.xml），未分片时原样返回"""
+        if not shard:
+            return path
+        index, count = CaseScheduler.parse_shard(shard)
+        root, ext = os.path.splitext(path)
+        return f"{root}.shard{index}of{count}{ext}"
+
+    @staticmethod
+    def plan_shards(batch1_cases: List[Dict[str, Any]], batch2_cases: List[Dict[str, Any]], shard_count: int,
+        durations: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        按估算耗时将用例分配到 shard_count 个分片（LPT）
+        :param durations: 各执行机共享的用例耗时（用例标识 -> 秒），为空时按用例个数均衡
+        :return: 每个分片的 {"batch1": 用例列表, "batch2": 用例列表, "estimate": 估算耗时}
+        """
+        estimates = CaseScheduler.estimates(batch1_cases + batch2_cases, durations)
+        units = [(estimates[case["path"]], CaseScheduler._case_key(case), [case], []) for case in batch1_cases]
+        if batch2_cases:
+            # 全流程用例依赖同一次全流程运行，必须在同一分片内执行
+            units.append((sum(estimates[case["path"]] for case in batch2_cases),
+                          min(CaseScheduler._case_key(case) for case in batch2_cases), [], list(batch2_cases)))
+        # 耗时相同的单元按相对路径排序，保证各执行机（工作目录可能不同）上的分配结果一致
+        units.sort(key=lambda unit: (-unit[0], unit[1]))
+
+        shards = [{"batch1": [], "batch2": [], "estimate": 0.0} for _ in range(shard_count)]
+        for estimate, _, batch1, batch2 in units:
+            target = min(range(shard_count), key=lambda i: (shards[i]["estimate"], i))
+            shards[target]["batch1"].extend(batch1)
+            shards[target]["batch2"].extend(batch2)
+            shards[target]["estimate"] += estimate
+        return shards
+
+    @staticmethod
+    def plan_checksum(shards: List[Dict[str, Any]]) -> str:
+        """分片方案校验码：各执行机打印的校验码相同，说明分片方案一致（没有遗漏或重复的用例）"""
+        digest = hashlib.sha1()
+        for index, shard in enumerate(shards):
+            for key in sorted(CaseScheduler._case_key(case) for case in shard["batch1"] + shard["batch2"]):
+                digest.update(f"{index}:{key}\n".encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+    @staticmethod
+    def load_durations(durations_file: str) -> Dict[str, float]:
+        """读取共享的用例耗时文件（JSON对象：用例标识 -> 耗时秒数）"""
+        with open(durations_file, "r", encoding="utf-8") as f:
+            durations = json.load(f)
+        if not isinstance(durations, dict) or not all(
+                isinstance(value, (int, float)) and value >= 0 for value in durations.values()):
+            raise ValueError(f"耗时文件格式错误: {durations_file}，应为 用例标识 -> 耗时秒数 的JSON对象")
+        return {str(case_id): float(value) for case_id, value in durations.items()}
+
+    @staticmethod
+    def write_plan(plan_file: str, shards: List[Dict[str, Any]]) -> str:
+        """写入分片方案文件（每个分片的用例相对路径），返回方案校验码"""
+        checksum = CaseScheduler.plan_checksum(shards)
+        plan = {
+            "version": SHARD_PLAN_VERSION,
+            "shard_count": len(shards),
+            "checksum": checksum,
+            "shards": [{
+                "batch1": [CaseScheduler._case_key(case) for case in shard["batch1"]],
+                "batch2": [CaseScheduler._case_key(case) for case in shard["batch2"]],
+                "estimate": shard["estimate"],
+            } for shard in shards],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(plan_file)), exist_ok=True)
+        tmp_file = f"{plan_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, plan_file)
+        return checksum
+
+    @staticmethod
+    def load_plan(plan_file: str, batch1_cases: List[Dict[str, Any]], batch2_cases: List[Dict[str, Any]],
+        shard_count: int) -> List[Dict[str, Any]]:
+        """
+        读取分片方案文件，并映射回本机选取的用例
+        方案的分片数、用例集合（不多不少、不重复）和校验码必须与本机一致，否则抛出 ValueError，
+        避免各执行机按不同方案执行导致用例遗漏或重复执行
+        :return: 与 plan_shards 相同格式的分片列表
+        """
+        with open(plan_file, "r", encoding="utf-8") as f:
+            plan = json.load(f)
+        if not isinstance(plan, dict) or plan.get("version") != SHARD_PLAN_VERSION:
+            raise ValueError(f"不支持的分片方案文件: {plan_file}")
+        if plan.get("shard_count") != shard_count or len(plan.get("shards", [])) != shard_count:
+            raise ValueError(f"分片方案 {plan_file} 的分片数为 {plan.get('shard_count')}，与 --shard 指定的 {shard_count} 不一致")
+
+        selected = {1: {CaseScheduler._case_key(case): case for case in batch1_cases},
+                    2: {CaseScheduler._case_key(case): case for case in batch2_cases}}
+        shards, assigned = [], {1: set(), 2: set()}
+        for index, entry in enumerate(plan["shards"], 1):
+            shard = {"batch1": [], "batch2": [], "estimate": float(entry.get("estimate", 0.0))}
+            for batch in (1, 2):
+                for key in entry.get(f"batch{batch}", []):
+                    if key in assigned[batch]:
+                        raise ValueError(f"分片方案 {plan_file} 中用例 {key} 被分到多个分片")
+                    if key not in selected[batch]:
+                        raise ValueError(f"分片方案 {plan_file} 分片 {index} 中的用例 {key} 不在本机选取的用例中")
+                    assigned[batch].add(key)
+                    shard[f"batch{batch}"].append(selected[batch][key])
+            shards.append(shard)
+        for batch in (1, 2):
+            missing = sorted(set(selected[batch]) - assigned[batch])
+            if missing:
+                raise ValueError(f"本机选取的 {len(missing)} 个用例不在分片方案 {plan_file} 中（如 {missing[0]}），"
+                                 f"请用相同的用例选取参数重新生成分片方案")
+        if CaseScheduler.plan_checksum(shards) != plan.get("checksum"):
+            raise ValueError(f"分片方案 {plan_file} 的校验码不一致，文件可能被修改")
+        return shards
+
+    @staticmethod
+    def _case_key(case: Dict[str, Any]) -> str:
+        """用例相对于项目目录的路径，不同执行机上的工作目录不同时保持一致"""
+        return os.path.relpath(case["path"]).replace(os.sep, "/")
@@ -2,15 +2,73 @@
 测试用例管理器
 负责读取和管理测试用例文件
 """
+import copy
 import json
+import os
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Tuple
 from docx import Document
-from pathlib import Path
-import random
+from utils.expectation import compile_expectations
+from config.config_manager import ConfigManager
+from test_case_manager.case_index import CaseIndex
+from test_case_manager.case_pack import CasePack, PACK_SUFFIX
+
+# 用例文件结构：字段名 -> (是否必填, 允许的类型)；加载前编译为校验函数列表，每个用例文件只按列表依次检查
+CASE_SCHEMA = {
+    "case_id": (True, (str,)),
+    "case_name": (True, (str,)),
+    "module": (False, (str,)),
+    "pre_commands": (False, (list,)),
+    "post_commands": (False, (list,)),
+    "execution_steps": (True, (list,)),
+}
+STEP_SCHEMA = {
+    "exec_path": (True, (str,)),
+    "command": (True, (str,)),
+    "expected_output": (True, (list,)),
+    "blocked_process": (True, (int,)),
+    "sleep_time": (True, (int, float)),
+    "timeout": (False, (int, float)),
+    "expected_type": (False, (str,)),
+    "expected_log": (False, (str,)),
+}
+EXPECTED_TYPES = ("terminal", "logfile")
+
+
+def _compile_schema(schema: Dict[str, Tuple[bool, Tuple[type, ...]]]) -> List[Callable[[Dict], Optional[str]]]:
+    """将字段描述编译为校验函数列表，每个函数返回错误描述（无错误时返回None）"""
+    checks = []
+    for name, (required, types) in schema.items():
+        type_names = "/".join(t.__name__ for t in types)
+
+        def check(obj: Dict, name=name, required=required, types=types, type_names=type_names) -> Optional[str]:
+            if name not in obj:
+                return f"缺少必要字段: {name}" if required else None
+            value = obj[name]
+            # bool 是 int 的子类，不能当作数值字段
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                return f"字段 '{name}' 类型应为 {type_names}，实际为 {type(value).__name__}"
+            return None
+        checks.append(check)
+    return checks
+
+
+_CASE_CHECKS = _compile_schema(CASE_SCHEMA)
+_STEP_CHECKS = _compile_schema(STEP_SCHEMA)
+
 
 class TestCaseManager:
-    """测试用例管理器，负责测试用例文件的加载、解析和验证"""
+    """测试用例管理器，负责测试用例文件的加载、解析和验证
+
+    解析并校验通过的用例按 (绝对路径, mtime, 大小) 缓存在类上，同一用例文件在进程内只解析、校验一次
+    （如 snapshot_full_process_logfile 和 test_run_case 先后加载同一用例）；调用方拿到的是缓存的深拷贝，
+    可以随意修改。按用例标识、名称、特性模块查找时使用按目录 mtime 缓存的查找表，不再逐个加载整个目录的用例。
+    """
+
+    _cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+    _lookup_cache: Dict[str, Tuple[Dict[str, int], Dict[str, Dict[str, List[str]]]]] = {}
+    _cache_lock = threading.Lock()
     
     def __init__(self, test_cases_dir: str = "test_cases/unit_test"):
         """初始化测试用例管理器
@@ -32,78 +90,163 @@ class TestCaseManager:
         """获取所有测试用例文件路径"""
         #return [str(path) for path in self.test_cases_dir.glob("*.json")]
         """
-        递归查找所有子目录中的JSON用例文件
-        :return: 所有JSON用例文件的绝对路径列表
+        递归查找所有子目录中的JSON用例文件和打包用例库（.tcpack）中的用例
+        :return: 所有用例的绝对路径列表（打包库中的用例为 "用例库路径#用例标识"）
         """
         if not self.test_cases_dir.exists():
             raise FileNotFoundError(f"测试用例根目录不存在: {self.test_cases_dir.absolute()}")
         
-        # 递归查找所有.json文件, rglob模式会匹配所有子目录
-        json_files = list(self.test_cases_dir.rglob("*.json"))
-        random.shuffle(json_files) # 打乱列表顺序（原地修改）
+        config_manager = ConfigManager()
+        if config_manager.get_case_index_enabled():
+            # 从用例索引中选取（按目录 mtime 增量更新），不再每次递归遍历整个用例目录
+            json_files = [Path(path) for path in CaseIndex.get(config_manager.get_case_index_file()).paths(str(self.test_cases_dir))]
+        else:
+            # 递归查找所有.json文件, rglob模式会匹配所有子目录
+            json_files = list(self.test_cases_dir.rglob("*.json"))
+            for pack_file in self.test_cases_dir.rglob(f"*{PACK_SUFFIX}"):
+                json_files.extend(Path(path) for path in CasePack.case_paths(str(pack_file)))
+        json_files.sort() # 固定按路径排序，执行顺序由 main.py 按排序策略（CaseScheduler）决定
         
         if not json_files:
-            print(f"警告: 在 {self.test_cases_dir.absolute()} 及其子目录中未找到任何JSON用例文件")
+            print(f"警告: 在 {self.test_cases_dir.absolute()} 及其子目录中未找到任何JSON用例文件或打包用例库")
         
         # 转换为字符串路径并返回
         return [str(file.absolute()) for file in json_files]
 
     def load_test_case(self, case_path: str) -> Dict[str, Any]:
         """
-        加载单个测试用例文件
-        :param case_path: 测试用例文件路径
+        加载单个测试用例文件（文件未修改时直接使用缓存）
+        :param case_path: 测试用例文件路径，或打包用例库中的用例（"用例库路径#用例标识"，只读取该用例）
         :return: 测试用例字典
         """
+        return copy.deepcopy(self._load_cached(case_path))
+
+    def _load_cached(self, case_path: Path) -> Dict[str, Any]:
+        """加载并校验用例文件，返回缓存中的用例字典（只读使用）"""
         if not isinstance(case_path, Path):
             raise TypeError(f"case_path必须是Path对象，而非{type(case_path).__name__}")
 
-        if not Path(case_path).exists():
-            raise FileNotFoundError(f"测试用例文件不存在: {case_path.absolute()}")
-        
-        if case_path.suffix.lower() != ".json":
-            raise ValueError(f"不支持的文件格式: {case_path.suffix}，仅支持JSON文件")
-         
-        with open(case_path, "r", encoding="utf-8") as f:
-            try:
-                test_case = json.load(f)
-                self._validate_test_case(test_case, case_path)
-                return test_case
-            except json.JSONDecodeError as e:
-                raise ValueError(f"测试用例文件格式错误 {case_path.name}: 不是有效的JSON - {str(e)}")
-            except Exception as e:
-                raise RuntimeError(f"加载测试用例 {case_path.name} 失败: {str(e)}")
+        source_file, pack_case_id = CasePack.split_path(case_path)
+        if pack_case_id is None and case_path.suffix.lower() != ".json":
+            raise ValueError(f"不支持的文件格式: {case_path.suffix}，仅支持JSON文件和打包用例库（{PACK_SUFFIX}#用例标识）")
+
+        try:
+            st = os.stat(source_file)
+        except OSError:
+            raise FileNotFoundError(f"测试用例文件不存在: {Path(source_file).absolute()}")
+        key, version = os.path.abspath(case_path), (st.st_mtime_ns, st.st_size)
+
+        with TestCaseManager._cache_lock:
+            cached = TestCaseManager._cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        if pack_case_id is None:
+            with open(case_path, "rb") as f:
+                content = f.read()
+        else:
+            content = CasePack.read_case(source_file, pack_case_id)  # 只读取该用例的字节
+        try:
+            test_case = json.loads(content.decode("utf-8"))
+            self._validate_test_case(test_case, case_path)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"测试用例文件格式错误 {case_path.name}: 不是有效的JSON - {str(e)}")
+        except Exception as e:
+            raise RuntimeError(f"加载测试用例 {case_path.name} 失败: {str(e)}")
+        with TestCaseManager._cache_lock:
+            TestCaseManager._cache[key] = (version, test_case)
+        return test_case
 
     def load_all_test_cases(self) -> List[Dict]:
         """加载所有测试用例文件"""
         case_paths = self.get_all_test_case_paths()
-        return [self.load_test_case(path) for path in case_paths]
+        return [self.load_test_case(Path(path)) for path in case_paths]
 
     def _validate_test_case(self, test_case: Dict, case_path: str) -> None:
-        """验证测试用例是否包含必要字段"""
-        # 验证测试用例必填字段
-        required_fields = ["case_id", "case_name", "execution_steps"]
-        for field in required_fields:
-            if field not in test_case:
-                raise ValueError(f"测试用例 {case_path} 缺少必要字段: {field}")
-        
-        # 验证步骤配置
-        if not isinstance(test_case["execution_steps"], list):
-            raise ValueError(f"测试用例 {case_path} 中 'execution_steps' 必须为列表")
-            
+        """按编译后的用例结构校验必要字段、字段类型和步骤配置"""
+        if not isinstance(test_case, dict):
+            raise ValueError(f"测试用例 {case_path} 的顶层必须为JSON对象")
+        for check in _CASE_CHECKS:
+            error = check(test_case)
+            if error:
+                raise ValueError(f"测试用例 {case_path} {error}")
+
         for idx, step in enumerate(test_case["execution_steps"]):
-            step_required = ["exec_path", "command", "expected_output", "blocked_process", "sleep_time"]
-            for field in step_required:
-                if field not in step:
-                    raise ValueError(
-                        f"测试用例 {case_path} 中步骤 {idx+1} 缺少必要字段: {field}"
-                    )
+            if not isinstance(step, dict):
+                raise ValueError(f"测试用例 {case_path} 中步骤 {idx+1} 必须为JSON对象")
+            for check in _STEP_CHECKS:
+                error = check(step)
+                if error:
+                    raise ValueError(f"测试用例 {case_path} 中步骤 {idx+1} {error}")
+            if step.get("expected_type", "terminal") not in EXPECTED_TYPES:
+                raise ValueError(
+                    f"测试用例 {case_path} 中步骤 {idx+1} 的 'expected_type' 只能为 {'/'.join(EXPECTED_TYPES)}"
+                )
+
+            # 编译预期结果表达式（结果按内容缓存，执行和回填阶段直接复用），表达式无效时在加载阶段即报错
+            try:
+                compile_expectations(step["expected_output"])
+            except ValueError as e:
+                raise ValueError(f"测试用例 {case_path} 中步骤 {idx+1} 的预期结果无效: {str(e)}")
+
+    def _lookup(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        按用例标识、名称、特性模块建立的查找表；用例目录及其各子目录的 mtime 都未变化时直接复用，
+        每次查找只 stat 各目录，不再列出并 stat 每个用例文件（增删、改名用例文件或原子替换打包用例库都会改变所在目录的 mtime）。
+        原地修改用例文件的名称、模块等字段不会改变目录 mtime，与用例索引相同，这类修改需等目录变化后才反映到查找表中；
+        返回的用例内容仍由 _load_cached 按文件 mtime 重新加载
+        :return: {"case_id": {...}, "case_name": {...}, "module": {...}}，值为用例路径列表
+        """
+        key = str(self.test_cases_dir.absolute())
+        with TestCaseManager._cache_lock:
+            cached = TestCaseManager._lookup_cache.get(key)
+        if cached is not None and self._dirs_unchanged(cached[0]):
+            return cached[1]
+
+        dir_versions = self._dir_versions(key)
+        lookup: Dict[str, Dict[str, List[str]]] = {"case_id": {}, "case_name": {}, "module": {}}
+        for path in sorted(self.get_all_test_case_paths()):
+            test_case = self._load_cached(Path(path))
+            for field, default in (("case_id", None), ("case_name", None), ("module", "未知特性模块")):
+                lookup[field].setdefault(test_case.get(field, default), []).append(path)
+        with TestCaseManager._cache_lock:
+            TestCaseManager._lookup_cache[key] = (dir_versions, lookup)
+        return lookup
+
+    @staticmethod
+    def _dir_versions(root: str) -> Dict[str, int]:
+        """用例目录及其全部子目录的 mtime（建立查找表前记录，建立期间目录发生变化时下次查找会重建）"""
+        versions = {}
+        for dir_path, _, _ in os.walk(root):
+            try:
+                versions[dir_path] = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                pass
+        return versions
+
+    @staticmethod
+    def _dirs_unchanged(dir_versions: Dict[str, int]) -> bool:
+        for dir_path, mtime_ns in dir_versions.items():
+            try:
+                if os.stat(dir_path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
 
     def get_test_case_by_name(self, case_name: str) -> Optional[Dict]:
         """通过用例名称查找测试用例"""
-        for test_case in self.load_all_test_cases():
-            if test_case.get("case_name") == case_name:
-                return test_case
-        return None
+        matched = self._lookup()["case_name"].get(case_name)
+        return self.load_test_case(Path(matched[0])) if matched else None
+
+    def get_test_case_by_id(self, case_id: str) -> Optional[Dict]:
+        """通过用例标识查找测试用例"""
+        matched = self._lookup()["case_id"].get(case_id)
+        return self.load_test_case(Path(matched[0])) if matched else None
+
+    def get_test_cases_by_module(self, module: str) -> List[Dict]:
+        """查找属于指定特性模块（用例的 module 字段）的全部测试用例"""
+        return [self.load_test_case(Path(path)) for path in self._lookup()["module"].get(module, [])]
 
     def get_test_case_report(self, original_word_file: str, new_word_file: str):
         # 打开原始文档
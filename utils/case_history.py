@@ -0,0 +1,68 @@
+"""
+用例执行耗时历史
+每个用例执行结束后记录本次耗时和结果（history/case_history.db，不随每次会话清理），
+选取用例时按最近几次的平均耗时估算每个用例的执行时间，供用例排序（长用例优先）和分片均衡使用。
+"""
+import os
+import sqlite3
+import statistics
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Iterable
+
+
+class CaseHistory:
+    """用例耗时历史，进程内按数据库文件共享一个实例"""
+
+    WINDOW = 5  # 估算耗时时取每个用例最近几次的记录
+
+    _instances: Dict[str, "CaseHistory"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS case_runs (case_id TEXT, run_id TEXT, duration REAL, result TEXT, finished_at TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_case_runs_case ON case_runs (case_id, finished_at)")
+        self._conn.commit()
+
+    @classmethod
+    def get(cls, db_file: str) -> "CaseHistory":
+        """获取进程内共享的历史实例"""
+        with cls._instances_lock:
+            if db_file not in cls._instances:
+                cls._instances[db_file] = cls(db_file)
+            return cls._instances[db_file]
+
+    def record(self, case_id: str, run_id: str, duration: float, result: str):
+        """记录一个用例的一次执行耗时（秒）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO case_runs (case_id, run_id, duration, result, finished_at) VALUES (?, ?, ?, ?, ?)",
+                (case_id, run_id, duration, result, datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"))
+            )
+            self._conn.commit()
+
+    def durations(self, case_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        按最近 WINDOW 次记录的平均值估算用例耗时
+        :param case_ids: 只查询这些用例，为 None 时查询全部有记录的用例
+        :return: 用例标识 -> 估算耗时（秒）；没有历史记录的用例不在结果中
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT case_id, duration FROM ("
+                "SELECT case_id, duration, ROW_NUMBER() OVER (PARTITION BY case_id ORDER BY finished_at DESC) AS n "
+                "FROM case_runs) WHERE n <= ?", (self.WINDOW,)
+            ).fetchall()
+        wanted = set(case_ids) if case_ids is not None else None
+        samples: Dict[str, List[float]] = {}
+        for case_id, duration in rows:
+            if wanted is None or case_id in wanted:
+                samples.setdefault(case_id, []).append(duration)
+        return {case_id: statistics.mean(values) for case_id, values in samples.items()}
@@ -1,8 +1,12 @@
 import subprocess
 import time
 import os
+import base64
+import shlex
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime
+from utils.expectation import compile_expectations
+from utils.log_rotation import LogRotation
 
 class CommandExecutor:
     """处理测试用例中的命令执行、进程管理及结果捕获"""
@@ -51,55 +55,182 @@ class CommandExecutor:
                 err = f"命令执行异常: {str(e)}"
                 return (False, "", err, -2)  # 其他错误返回码设为-2
     
+    # 远程命令输出的起止标记，用于从ssh登录提示等交互输出中切出命令本身的输出
+    REMOTE_OUTPUT_BEGIN = "__TE_AGENT_OUTPUT_BEGIN__"
+    REMOTE_OUTPUT_END = "__TE_AGENT_OUTPUT_END__"
+
+    # 非交互式ssh执行单条命令的expect脚本，参数全部通过环境变量传入，避免命令中的特殊字符破坏脚本结构。
+    # 只在认证阶段（命令输出的起始标记出现前）匹配主机确认、口令提示和认证失败，起始标记排在第一位，与命令输出同批到达时优先命中；
+    # 之后只读取命令输出直到结束，输出中的 "Permission denied" 等文本不会被当作认证失败。
+    # 只对首次连接的主机回答 yes，主机密钥变化时仍由ssh拒绝连接
+    SSH_EXPECT_SCRIPT = r'''
+set timeout $env(TE_REMOTE_TIMEOUT)
+set passwd_sent 0
+spawn -noecho ssh $env(TE_REMOTE_USER)@$env(TE_REMOTE_IP) $env(TE_REMOTE_CMD)
+expect {
+    -ex "$env(TE_REMOTE_BEGIN)" {}
+    -ex "(yes/no" { send "yes\r"; exp_continue }
+    -re {[Pp]assword:?\s*|口令:?\s*} {
+        if {!$passwd_sent} { send "$env(TE_REMOTE_PASSWD)\r"; set passwd_sent 1 }
+        exp_continue
+    }
+    "Permission denied" { exit 1 }
+    timeout { exit 2 }
+    eof { catch wait result; exit [lindex $result 3] }
+}
+expect {
+    timeout { exit 2 }
+    eof
+}
+catch wait result
+exit [lindex $result 3]
+'''
+
     @staticmethod
-    def clear_expected_logfile(expected_log: str, remote_os: str, remote_ip: str, remote_user:str, remote_passwd:str, remote_hdc_port:str,
-        output_file: str) -> Tuple[bool, str, str, int]:
-        #print(f"进入函数：clear_expected_logfile, 备份日志:{expected_log}")
-        core_cmd = f"mv -f {expected_log} {expected_log}.bak 2>/dev/null"
+    def run_remote_command(core_cmd: str, remote_os: str, remote_ip: str, remote_user: str, remote_passwd: str,
+        remote_hdc_port: str, timeout: int = 60) -> Tuple[bool, str, str, int]:
+        """
+        在执行机上非交互地执行一条shell命令并取回其输出（不拉起xterm终端）
+        本地直接执行；远程非鸿蒙设备通过expect+ssh执行；远程鸿蒙设备通过hdc shell执行
+        :return: (是否成功, 命令输出, 错误信息, 命令返回码)
+        """
+        wrapped_cmd = f"echo {CommandExecutor.REMOTE_OUTPUT_BEGIN}; {core_cmd}; echo {CommandExecutor.REMOTE_OUTPUT_END}$?"
+        env = None
         if remote_ip == "127.0.0.1":
-            terminal_commands = (
-                'export TERM=xterm-256color; '
-                'stty cooked; '
-                f'echo "当前指令执行目录：$(pwd)；执行日志备份指令: mv {expected_log} {expected_log}.bak" 2>&1 | tee -a {output_file}; '
-                f'({core_cmd};exit;) 2>&1 | tee -a {output_file}; '
-            )
+            command = ["bash", "-c", wrapped_cmd]
+        elif remote_os != "HarmonyOS":
+            command = ["expect", "-c", CommandExecutor.SSH_EXPECT_SCRIPT]
+            env = dict(os.environ,
+                TE_REMOTE_TIMEOUT=str(timeout), TE_REMOTE_USER=remote_user, TE_REMOTE_IP=remote_ip,
+                TE_REMOTE_PASSWD=remote_passwd, TE_REMOTE_CMD=wrapped_cmd, TE_REMOTE_BEGIN=CommandExecutor.REMOTE_OUTPUT_BEGIN)
         else:
-            if remote_os != "HarmonyOS":
-                terminal_commands = ( 
-                    'export TERM=xterm-256color; '
-                    'stty cooked; '
-                    f'expect -c "set timeout 3; '
-                    f'spawn ssh {remote_user}@{remote_ip}; '
-                    'expect { \n'
-                    '   \\"Are you sure you want to continue connecting (yes/no)?\\" { send \\"yes\\r\\"; exp_continue; } \n'
-                    '   -re {[Pp]assword:?\\s*|口令:?\\s*} { send \\"' + remote_passwd + '\\r\\"; exp_continue; } \n'
-                    '   \\"Permission denied\\" { exit 1; } \n'
-                    '   -re {[#$]\\s*} { send \\" ' + core_cmd + ' 2>&1 | tee -a -;\\r\\"; expect eof; } \n'
-                    '   eof { exit 0 } \n'
-                    '   timeout { exit 2 } \n'  # 明确处理超时情况
-                    '}; '
-                    '" 2>&1 | tee -a ' + output_file + '; '
-                    'bash --rcfile ~/.bashrc_no_title --noprofile'
-                )
-            else:
-                print("CommandExecutor.clear_expected_logfile: 待验证远程鸿蒙系统下，预处理备份清理日志的逻辑")
-                terminal_commands = (
-                    'export TERM=xterm-256color; '
-                    'stty cooked; '
-                    f'echo "=== 鸿蒙设备远程执行 ===" | tee -a {output_file}; '
-                    f'echo "设备IP: {remote_ip} | 执行命令备份清理被测系统日志文件{expected_log}为{expected_log}.bak" | tee -a {output_file}; '
-                    f'if ! hdc list targets | grep -q "{remote_ip}"; then '
-                    f'  echo "错误：未找到鸿蒙设备 {remote_ip}，请检查hdc连接" | tee -a {output_file}; '
-                    '  bash --rcfile ~/.bashrc_no_title --noprofile; '
-                    'else '
-                    f'  hdc -t {remote_ip}:{remote_hdc_port} shell "(mv -f {expected_log} {expected_log}.bak  2>/dev/null;exit;) 2>&1 | tee -a -" 2>&1 | tee -a {output_file}; '# 执行命令：子shell包裹
-                    'fi'
-                )
-            
-        # 构建命令列表
-        #command = ["xterm", "-T", "pre_clear_logfile", "-geometry", "120x40", "-e", "bash", "-c", terminal_commands]
-        command = f"xterm -T pre_clear_logfile -geometry 120x40 -e bash {terminal_commands}"
-        return CommandExecutor.run_command(command)
+            command = ["hdc", "-t", f"{remote_ip}:{remote_hdc_port}", "shell", wrapped_cmd]
+
+        try:
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, errors="ignore", timeout=timeout, env=env)
+        except subprocess.TimeoutExpired:
+            return (False, "", f"远程命令超时（{timeout}秒）: {core_cmd}", -1)
+        except Exception as e:
+            return (False, "", f"远程命令执行异常: {str(e)}", -2)
+
+        # 经过伪终端的输出换行为\r\n，统一还原后按起止标记切出命令输出
+        output = result.stdout.replace("\r\n", "\n")
+        begin = output.find(CommandExecutor.REMOTE_OUTPUT_BEGIN + "\n")
+        end = output.rfind(CommandExecutor.REMOTE_OUTPUT_END)
+        if begin == -1 or end == -1 or end < begin:
+            return (False, "", f"未获取到远程命令的完整输出（返回码: {result.returncode}）: {result.stderr.strip()}", result.returncode)
+        cmd_output = output[begin + len(CommandExecutor.REMOTE_OUTPUT_BEGIN) + 1:end]
+        exit_code = output[end + len(CommandExecutor.REMOTE_OUTPUT_END):].split("\n", 1)[0].strip()
+        returncode = int(exit_code) if exit_code.isdigit() else result.returncode
+        return (True, cmd_output, result.stderr, returncode)
+
+    @staticmethod
+    def build_read_logfile_command(expected_log: str, baseline_entry: Optional[Dict[str, Any]] = None) -> str:
+        """
+        构造读取被测系统日志的命令：有基线且日志inode未变、未被截断时，只输出基线偏移之后新写入的内容；否则输出整份日志
+        :param baseline_entry: utils.log_baseline.LogBaseline 记录的 {"size", "inode"}
+        """
+        quoted_log = shlex.quote(expected_log)
+        if not baseline_entry:
+            return f"cat {quoted_log}"
+        size, inode = int(baseline_entry["size"]), int(baseline_entry["inode"])
+        return (
+            f"if [ \"$(stat -c %i {quoted_log} 2>/dev/null)\" = \"{inode}\" ] && [ \"$(stat -c %s {quoted_log})\" -ge {size} ]; "
+            f"then tail -c +{size + 1} {quoted_log}; else cat {quoted_log}; fi"
+        )
+
+    @staticmethod
+    def build_logfile_grep_command(read_cmd: str, keywords: List[str], remote_os: str, context_lines: int = 3) -> str:
+        """
+        构造在执行机上过滤被测系统日志的命令：关键词集合以base64形式下发为模式文件，
+        由一次 grep -F 多模式匹配带上下文行输出，只有命中的日志块会被传回
+        :param read_cmd: 输出待过滤日志内容的命令，见 build_read_logfile_command
+        """
+        tmp_dir = "/data/local/tmp" if remote_os == "HarmonyOS" else "/tmp"
+        pattern_file = f"{tmp_dir}/te_agent_patterns_$$.txt"
+        encoded = base64.b64encode("\n".join(keywords).encode("utf-8")).decode("ascii")
+        return (
+            f"echo {encoded} | base64 -d > {pattern_file}; "
+            f"{{ {read_cmd}; }} | grep -a -F -C {context_lines} -f {pattern_file}; "
+            f"te_rc=$?; rm -f {pattern_file}; (exit $te_rc)"  # 保留grep的返回码
+        )
+
+    @staticmethod
+    def fetch_expected_logfile(expected_log: str, expected_output: List[Any], remote_os: str, remote_ip: str,
+        remote_user: str, remote_passwd: str, remote_hdc_port: str, output_file: str,
+        baseline_record: Optional[Dict[str, Any]] = None, context_lines: int = 3, timeout: int = 60) -> Tuple[bool, str]:
+        """
+        取回执行机上被测系统日志中与预期结果相关的内容，写入本地 output_file
+        预期结果全部由纯文本构成时在执行机侧用 grep -F 过滤，传输量与命中量成正比；
+        含正则时需整份取回，经 RemoteFileFetcher 分块压缩、断点续传、md5校验取回，不经过终端
+        有日志基线时只检查基线之后新写入的内容，期间日志发生轮转时按轮转集合依次检查（.gz 在执行机侧流式解压）
+        :param baseline_record: utils.log_baseline.LogBaseline.record() 返回的基线记录
+        :return: (是否成功, 错误信息)
+        """
+        success, stat_output, _, returncode = CommandExecutor.run_remote_command(
+            LogRotation.build_stat_command(expected_log), remote_os, remote_ip, remote_user, remote_passwd,
+            remote_hdc_port, timeout=timeout)
+        members = None
+        if success and returncode == 0:
+            members = LogRotation.plan(expected_log, LogRotation.parse_stat_output(expected_log, stat_output), baseline_record)
+
+        keywords = compile_expectations(expected_output).fixed_strings()
+        if keywords is None:
+            return CommandExecutor._fetch_whole_logfile(expected_log, members, baseline_record, remote_os, remote_ip,
+                remote_user, remote_passwd, remote_hdc_port, output_file)
+
+        if members is not None:
+            read_cmd = LogRotation.build_read_command(members)
+        else:  # 未能列出轮转集合时只检查当前日志
+            baseline_entry = baseline_record if baseline_record and baseline_record.get("exists") else None
+            read_cmd = CommandExecutor.build_read_logfile_command(expected_log, baseline_entry)
+        if not keywords:
+            core_cmd = ":"  # 仅有空字符串预期，无需读取日志
+        else:
+            core_cmd = CommandExecutor.build_logfile_grep_command(read_cmd, keywords, remote_os, context_lines)
+
+        success, cmd_output, stderr, returncode = CommandExecutor.run_remote_command(
+            core_cmd, remote_os, remote_ip, remote_user, remote_passwd, remote_hdc_port, timeout=timeout)
+        # grep 未命中任何行时返回码为1，属于正常结果
+        if not success or returncode not in (0, 1):
+            return (False, f"获取被测系统日志 {expected_log} 失败（返回码: {returncode}）: {stderr}")
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(cmd_output)
+        return (True, "")
+
+    @staticmethod
+    def _fetch_whole_logfile(expected_log: str, members: Optional[List[Dict[str, Any]]],
+        baseline_record: Optional[Dict[str, Any]], remote_os: str, remote_ip: str, remote_user: str,
+        remote_passwd: str, remote_hdc_port: str, output_file: str) -> Tuple[bool, str]:
+        """整份取回基线之后的日志内容；涉及多个轮转文件时逐个取回后按顺序流式拼接（.gz 在本地流式解压）"""
+        from utils.remote_fetch import RemoteFileFetcher  # remote_fetch 依赖本模块，延迟导入避免循环引用
+        target = (remote_os, remote_ip, remote_user, remote_passwd, remote_hdc_port)
+        if members is None:
+            baseline_entry = baseline_record if baseline_record and baseline_record.get("exists") else None
+            return RemoteFileFetcher.fetch(expected_log, output_file, *target, baseline_entry=baseline_entry)
+        if len(members) == 1 and not members[0]["compressed"]:
+            return RemoteFileFetcher.fetch(members[0]["path"], output_file, *target, start_offset=members[0]["skip"])
+
+        local_members = []
+        try:
+            for idx, member in enumerate(members):
+                local_path = f"{output_file}.rot{idx}"
+                # 普通文件只取回基线偏移之后的内容；gzip 无法随机定位，整份取回后在本地流式跳过
+                success, err = RemoteFileFetcher.fetch(member["path"], local_path, *target,
+                    start_offset=0 if member["compressed"] else member["skip"])
+                if not success:
+                    return (False, err)
+                local_members.append({"path": local_path, "compressed": member["compressed"],
+                    "skip": member["skip"] if member["compressed"] else 0})
+            with open(output_file, "w", encoding="utf-8") as f:
+                for line in LogRotation.iter_lines(local_members):
+                    f.write(line + "\n")
+            return (True, "")
+        finally:
+            for member in local_members:
+                if os.path.exists(member["path"]):
+                    os.remove(member["path"])
 
     @staticmethod
     def run_script(shell_script: str, remote_os: str, remote_ip: str, remote_user:str, remote_passwd:str, remote_hdc_port:str,
@@ -176,34 +307,13 @@ class CommandExecutor:
             return False
 
     @staticmethod
-    def check_keywords(actual_output: str, expected_keywords: List[str]) -> Dict[str, Any]:
+    def check_keywords(actual_output: str, expected_keywords: List[Any]) -> Dict[str, Any]:
         """
-        校验实际输出是否包含所有预期关键词（适配 merged_document.docx 中“期望结果”）
+        校验实际输出是否满足所有预期结果（适配 merged_document.docx 中“期望结果”）
         :param actual_output: 命令执行的实际输出（stdout+stderr）
-        :param expected_keywords: 预期需要匹配的关键词列表
+        :param expected_keywords: 预期结果列表，元素为普通字符串或 utils.expectation 中定义的表达式
         :return: 包含匹配结果的字典
         """
-        matched = []
-        missing = []
         #print(f"check_keywords:\nactual_output:{actual_output}")
-
-        # 1. 按行分割实际输出（兼容 \n 换行）
-        output_lines = actual_output.splitlines()
-        # 2. 过滤掉含cat关键词的行（排除命令行本身）。用于避免远程执行时重定向cat的被测系统日志到本地后，把cat命令中的目标词也命中
-        excluded_str1  = " cat "
-        excluded_str2  = "| grep -F --"
-        valid_lines = [line for line in output_lines if excluded_str1 not in line and excluded_str2 not in line]
-        # 3. 将有效行重新拼接为字符串（保留原始换行结构）
-        valid_output = "\n".join(valid_lines)
-
-        for keyword in expected_keywords:
-            # 4. 仅在有效行中检查关键词是否存在
-            if keyword in valid_output:
-                matched.append(keyword)
-            else:
-                missing.append(keyword)
-        return {
-            "all_matched": len(missing) == 0,
-            "matched": matched,
-            "missing": missing
-        }
\ No newline at end of file
+        # 表达式在加载用例时已编译并缓存，这里直接取用；逐行匹配时会过滤掉含cat、grep命令的行（排除命令行本身）
+        return compile_expectations(expected_keywords).evaluate(actual_output or "")
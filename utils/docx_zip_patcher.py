@@ -0,0 +1,220 @@
+"""
+Word结果文档的zip级增量保存
+python-docx 的 doc.save 会重新序列化并压缩包内的每一个部件；模板较大（大量表格、图片）时每次保存都要数秒。
+回填结果只会修改正文 word/document.xml、它的关系文件，以及新增截图图片，因此保存时以上一次保存的文件为基础：
+  - 正文按块流式序列化、边序列化边压缩写入新 zip，不在内存中生成完整的 XML 字节串；
+  - 正文关系文件、[Content_Types].xml 重新生成；
+  - 其余条目（已有图片、样式、页眉页脚等）直接按压缩后的原始字节复制，不解压、不重新压缩；
+  - 新增的截图图片作为新条目追加到末尾。
+保存一次的开销约等于对原文件做一次顺序复制。
+"""
+import os
+import struct
+import time
+import zipfile
+import zlib
+from typing import Dict, List, Tuple
+from lxml import etree
+from docx import Document
+
+CONTENT_TYPES_NAME = "[Content_Types].xml"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+COPY_BLOCK = 1024 * 1024
+ZIP32_LIMIT = 0xFFFFFFFF
+
+
+class _ZipEntry:
+    """写入新 zip 的一个条目，关闭时用于生成中央目录"""
+
+    def __init__(self, name: str, method: int, date_time: Tuple, flag_bits: int = 0, external_attr: int = 0):
+        self.name = name
+        self.name_bytes = name.encode("utf-8")
+        self.method = method
+        self.dos_time = ((date_time[3] << 11) | (date_time[4] << 5) | (date_time[5] // 2)) & 0xFFFF
+        self.dos_date = (((date_time[0] - 1980) << 9) | (date_time[1] << 5) | date_time[2]) & 0xFFFF
+        # 去掉“数据描述符”标志：CRC和大小都直接写在本地文件头中
+        self.flag_bits = (flag_bits & ~0x08) | (0x800 if not name.isascii() else 0)
+        self.external_attr = external_attr
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+        self.header_offset = 0
+
+    def local_header(self) -> bytes:
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 20, self.flag_bits, self.method, self.dos_time, self.dos_date,
+            self.crc, self.compress_size, self.file_size, len(self.name_bytes), 0
+        ) + self.name_bytes
+
+    def central_header(self) -> bytes:
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, 20, 20, self.flag_bits, self.method, self.dos_time, self.dos_date,
+            self.crc, self.compress_size, self.file_size, len(self.name_bytes), 0, 0, 0, 0,
+            self.external_attr, self.header_offset
+        ) + self.name_bytes
+
+
+class _DeflateWriter:
+    """file-like 对象：写入的数据边压缩边写入 zip，并累计 CRC 和大小（供 lxml 流式序列化使用）"""
+
+    def __init__(self, out, entry: _ZipEntry):
+        self.out = out
+        self.entry = entry
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+
+    def write(self, data: bytes) -> int:
+        self.entry.crc = zlib.crc32(data, self.entry.crc)
+        self.entry.file_size += len(data)
+        compressed = self._compressor.compress(data)
+        self.out.write(compressed)
+        self.entry.compress_size += len(compressed)
+        return len(data)
+
+    def finish(self):
+        compressed = self._compressor.flush()
+        self.out.write(compressed)
+        self.entry.compress_size += len(compressed)
+
+
+class DocxZipPatcher:
+    """以上一次保存的 docx 为基础，只重写正文及其关系文件、追加新图片，其余 zip 条目按原始字节复制"""
+
+    @staticmethod
+    def save(doc: Document, base_file: str, output_file: str):
+        """
+        将内存中的文档保存为 output_file
+        :param doc: 由 base_file 加载（之后只修改过正文、只新增过图片）的文档对象
+        :param base_file: 上一次保存的文档，未修改的条目从这里原样复制；可以与 output_file 相同
+        :param output_file: 输出文件；先写入临时文件再原子替换
+        """
+        document_part = doc.part
+        document_name = document_part.partname.lstrip("/")
+        rels_name = document_part.partname.rels_uri.lstrip("/")
+        tmp_file = f"{output_file}.tmp"
+        now = time.localtime()[:6]
+
+        with zipfile.ZipFile(base_file) as base_zip, open(base_file, "rb") as base_fp, open(tmp_file, "wb") as out:
+            infos = base_zip.infolist()
+            if any(info.file_size >= ZIP32_LIMIT or info.compress_size >= ZIP32_LIMIT or info.header_offset >= ZIP32_LIMIT
+                   for info in infos):
+                raise ValueError(f"{base_file} 使用了 ZIP64 格式，不支持zip级增量保存")
+            base_names = {info.filename for info in infos}
+            new_parts = [part for part in document_part.package.iter_parts()
+                         if part.partname.lstrip("/") not in base_names]
+
+            entries: List[_ZipEntry] = []
+            for info in infos:
+                rewritten = info.filename in (document_name, rels_name, CONTENT_TYPES_NAME)
+                entry = _ZipEntry(info.filename, info.compress_type, now if rewritten else info.date_time,
+                    info.flag_bits, info.external_attr)
+                if info.filename == document_name:
+                    DocxZipPatcher._write_document(out, entry, document_part)
+                elif info.filename == rels_name:
+                    DocxZipPatcher._write_bytes(out, entry, document_part.rels.xml)
+                elif info.filename == CONTENT_TYPES_NAME:
+                    DocxZipPatcher._write_bytes(out, entry,
+                        DocxZipPatcher._content_types(base_zip.read(info), new_parts))
+                else:
+                    DocxZipPatcher._copy_raw(base_fp, out, info, entry)
+                entries.append(entry)
+            if rels_name not in base_names and len(document_part.rels):
+                entry = _ZipEntry(rels_name, zipfile.ZIP_DEFLATED, now)
+                DocxZipPatcher._write_bytes(out, entry, document_part.rels.xml)
+                entries.append(entry)
+            # 新增的截图等部件追加到末尾（图片本身已压缩，按存储方式写入）
+            for part in new_parts:
+                entry = _ZipEntry(part.partname.lstrip("/"), zipfile.ZIP_STORED, now)
+                DocxZipPatcher._write_bytes(out, entry, part.blob)
+                entries.append(entry)
+
+            DocxZipPatcher._write_central_directory(out, entries)
+        os.replace(tmp_file, output_file)
+
+    @staticmethod
+    def _begin_entry(out, entry: _ZipEntry):
+        entry.header_offset = out.tell()
+        if entry.header_offset >= ZIP32_LIMIT:
+            raise ValueError("输出文档超过 4GB，不支持zip级增量保存")
+        out.write(entry.local_header())
+
+    @staticmethod
+    def _end_entry(out, entry: _ZipEntry):
+        """数据写完后回填本地文件头中的 CRC 和大小"""
+        end = out.tell()
+        out.seek(entry.header_offset + 14)
+        out.write(struct.pack("<III", entry.crc & 0xFFFFFFFF, entry.compress_size, entry.file_size))
+        out.seek(end)
+
+    @staticmethod
+    def _write_document(out, entry: _ZipEntry, document_part):
+        """流式序列化正文 XML，边序列化边压缩写入"""
+        entry.method = zipfile.ZIP_DEFLATED
+        DocxZipPatcher._begin_entry(out, entry)
+        writer = _DeflateWriter(out, entry)
+        with etree.xmlfile(writer, encoding="UTF-8", buffered=True) as xf:
+            xf.write_declaration(standalone=True)
+            xf.write(document_part.element)
+        writer.finish()
+        DocxZipPatcher._end_entry(out, entry)
+
+    @staticmethod
+    def _write_bytes(out, entry: _ZipEntry, data: bytes):
+        if entry.method != zipfile.ZIP_STORED:
+            entry.method = zipfile.ZIP_DEFLATED
+        DocxZipPatcher._begin_entry(out, entry)
+        if entry.method == zipfile.ZIP_STORED:
+            entry.crc = zlib.crc32(data)
+            entry.file_size = entry.compress_size = len(data)
+            out.write(data)
+        else:
+            writer = _DeflateWriter(out, entry)
+            writer.write(data)
+            writer.finish()
+        DocxZipPatcher._end_entry(out, entry)
+
+    @staticmethod
+    def _copy_raw(base_fp, out, info: zipfile.ZipInfo, entry: _ZipEntry):
+        """按压缩后的原始字节复制条目，不解压"""
+        base_fp.seek(info.header_offset)
+        header = base_fp.read(30)
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        base_fp.seek(info.header_offset + 30 + name_len + extra_len)
+        entry.crc, entry.compress_size, entry.file_size = info.CRC, info.compress_size, info.file_size
+        DocxZipPatcher._begin_entry(out, entry)
+        remaining = info.compress_size
+        while remaining > 0:
+            block = base_fp.read(min(remaining, COPY_BLOCK))
+            if not block:
+                raise ValueError(f"复制 {info.filename} 失败：原文件被截断")
+            out.write(block)
+            remaining -= len(block)
+
+    @staticmethod
+    def _content_types(base_xml: bytes, new_parts) -> bytes:
+        """在原 [Content_Types].xml 基础上，为扩展名默认类型不匹配的新部件补充 Override"""
+        root = etree.fromstring(base_xml)
+        defaults: Dict[str, str] = {
+            e.get("Extension", "").lower(): e.get("ContentType") for e in root.iter(f"{{{CONTENT_TYPES_NS}}}Default")
+        }
+        overrides = {e.get("PartName") for e in root.iter(f"{{{CONTENT_TYPES_NS}}}Override")}
+        for part in new_parts:
+            ext = part.partname.ext.lower()
+            if defaults.get(ext) == part.content_type or part.partname in overrides:
+                continue
+            if ext not in defaults:
+                etree.SubElement(root, f"{{{CONTENT_TYPES_NS}}}Default", Extension=ext, ContentType=part.content_type)
+                defaults[ext] = part.content_type
+            else:
+                etree.SubElement(root, f"{{{CONTENT_TYPES_NS}}}Override", PartName=str(part.partname),
+                    ContentType=part.content_type)
+        return etree.tostring(root, encoding="UTF-8", standalone=True)
+
+    @staticmethod
+    def _write_central_directory(out, entries: List[_ZipEntry]):
+        start = out.tell()
+        for entry in entries:
+            out.write(entry.central_header())
+        size = out.tell() - start
+        if len(entries) >= 0xFFFF or start >= ZIP32_LIMIT:
+            raise ValueError("输出文档条目过多或超过 4GB，不支持zip级增量保存")
+        out.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, len(entries), len(entries), size, start, 0))
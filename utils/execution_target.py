@@ -0,0 +1,73 @@
+"""
+执行机描述
+执行机的地址、账号、系统类型在一次会话内不会变化：会话内只从配置解析一次，生成不可变的 ExecutionTarget，
+存入 TestState 随工作流传递；各节点、SubprocessManager、截图函数直接使用该对象，不再各自重复读取5项配置并逐层透传。
+"""
+import dataclasses
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+LOCAL_IP = "127.0.0.1"
+
+
+@dataclass(frozen=True, slots=True)
+class ExecutionTarget:
+    """不可变的执行机描述；backend 为 local（本地执行）/ ssh（远程非鸿蒙，经 expect + ssh）/ hdc（远程鸿蒙）"""
+
+    remote_os: str
+    remote_ip: str
+    remote_user: str
+    remote_passwd: str = field(repr=False)
+    remote_hdc_port: str
+    backend: str
+    connection_key: str  # 连接标识（local / ssh:user@ip / hdc:ip:port），会话级缓存按它区分执行机
+
+    @property
+    def is_local(self) -> bool:
+        return self.backend == "local"
+
+    @staticmethod
+    def resolve(remote_os: str, remote_ip: str, remote_user: str, remote_passwd: str, remote_hdc_port: str) -> "ExecutionTarget":
+        """由配置项构造执行机描述，backend 的判断与原先各处的 remote_ip / remote_os 判断一致"""
+        if remote_ip == LOCAL_IP:
+            backend, connection_key = "local", "local"
+        elif remote_os == "HarmonyOS":
+            backend, connection_key = "hdc", f"hdc:{remote_ip}:{remote_hdc_port}"
+        else:
+            backend, connection_key = "ssh", f"ssh:{remote_user}@{remote_ip}"
+        return ExecutionTarget(remote_os, remote_ip, remote_user, remote_passwd, str(remote_hdc_port), backend, connection_key)
+
+    @staticmethod
+    def from_config(config_manager) -> "ExecutionTarget":
+        """从配置解析执行机描述；配置不变时会话内始终返回同一个对象"""
+        values = (
+            config_manager.get_remote_os(),
+            config_manager.get_remote_ip(),
+            config_manager.get_remote_user(),
+            config_manager.get_remote_passwd(),
+            config_manager.get_hdc_port(),
+        )
+        with _resolved_lock:
+            target = _resolved.get(values)
+            if target is None:
+                target = _resolved[values] = ExecutionTarget.resolve(*values)
+        return target
+
+    def as_local(self) -> "ExecutionTarget":
+        """同一账号下改为在本地执行（如对已取回本地的远程日志副本截图）"""
+        return dataclasses.replace(self, remote_ip=LOCAL_IP, backend="local", connection_key="local")
+
+    def remote_kwargs(self) -> Dict[str, str]:
+        """CommandExecutor、RemoteLogCache 等接口使用的关键字参数"""
+        return {
+            "remote_os": self.remote_os,
+            "remote_ip": self.remote_ip,
+            "remote_user": self.remote_user,
+            "remote_passwd": self.remote_passwd,
+            "remote_hdc_port": self.remote_hdc_port,
+        }
+
+
+_resolved: Dict[Tuple, ExecutionTarget] = {}
+_resolved_lock = threading.Lock()
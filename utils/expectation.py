@@ -0,0 +1,224 @@
+"""
+预期结果表达式
+expected_output 中的每一项既可以是普通字符串（子串匹配，兼容旧用例），也可以是如下字典：
+    {"contains": "文本", "min_count": 3}        文本至少出现 min_count 次（默认1次）
+    {"regex": "正则", "min_count": 4}           正则至少匹配 min_count 次（默认1次）
+    {"sequence": ["文本1", {"regex": "正则"}]}  各项按顺序依次出现
+    {"absent": "文本"} / {"absent_regex": "正则"}  全程不得出现
+表达式在加载用例时编译一次并按内容缓存，跨用例、跨重跑复用；所有表达式共用一个预筛正则，对日志只扫描一遍
+"""
+import json
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+# 排除回显的 cat / grep 命令行本身，避免命令中的目标词被误判为命中
+EXCLUDED_LINE_MARKERS = (" cat ", "| grep -F --")
+
+
+class Expectation:
+    """单条已编译的预期结果表达式"""
+
+    def __init__(self, kind: str, label: str, patterns: List["re.Pattern"], literals: List[Optional[str]], min_count: int = 1):
+        """
+        :param kind: contains / regex / sequence / absent
+        :param label: 在 matched / missing 列表中展示的名称
+        :param patterns: 已编译的正则（sequence 为每一项各一个）
+        :param literals: 与 patterns 一一对应的纯文本（正则项为 None），可用于 grep -F 等定长匹配
+        :param min_count: 最少命中次数
+        """
+        self.kind = kind
+        self.label = label
+        self.patterns = patterns
+        self.literals = literals
+        self.min_count = min_count
+
+
+ExpectationSpec = Union[str, Dict[str, Any]]
+
+
+class ExpectationSet:
+    """一个测试步骤的全部预期结果表达式（编译后不可变，可在多次匹配间共享）"""
+
+    def __init__(self, expectations: List[Expectation]):
+        self.expectations = expectations
+        # 预筛正则：一行未命中任何表达式时直接跳过，绝大多数日志行只需一次C层面的search
+        alternatives = [p.pattern for e in expectations for p in e.patterns if p.pattern]
+        self.prefilter: Optional["re.Pattern"] = None
+        if alternatives and len(alternatives) == sum(len(e.patterns) for e in expectations):
+            try:
+                self.prefilter = re.compile("|".join(f"(?:{a})" for a in alternatives))
+            except re.error:
+                self.prefilter = None  # 个别正则含全局flag等无法合并时，逐条匹配
+
+    def fixed_strings(self) -> Optional[List[str]]:
+        """若所有表达式都只由纯文本构成，返回全部纯文本（用于远程 grep -F 预过滤），否则返回 None"""
+        strings = []
+        for expectation in self.expectations:
+            if any(literal is None for literal in expectation.literals):
+                return None
+            strings.extend(literal for literal in expectation.literals if literal)
+        return strings
+
+    def matcher(self) -> "ExpectationMatcher":
+        """创建一次匹配过程的状态对象"""
+        return ExpectationMatcher(self)
+
+    def evaluate(self, text: str) -> Dict[str, Any]:
+        """对一段完整文本做一次性匹配"""
+        matcher = self.matcher()
+        for line in text.splitlines():
+            matcher.feed_line(line)
+        return matcher.result()
+
+
+class ExpectationMatcher:
+    """逐行喂入日志，维护每条表达式的命中计数、顺序进度和命中时间"""
+
+    def __init__(self, expectation_set: ExpectationSet):
+        self.expectation_set = expectation_set
+        count = len(expectation_set.expectations)
+        self.counts = [0] * count
+        self.sequence_progress = [0] * count
+        self.evidence: Dict[str, List[str]] = {}
+        self.matched_at: Dict[str, str] = {}
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for expectation in expectation_set.expectations:
+            if expectation.kind == "contains" and expectation.literals == [""]:
+                self.matched_at[expectation.label] = now  # 空字符串恒为命中，与旧版子串判断一致
+
+    def feed_line(self, line: str) -> bool:
+        """匹配一行日志，返回是否有表达式的状态发生变化"""
+        if any(marker in line for marker in EXCLUDED_LINE_MARKERS):
+            return False
+        prefilter = self.expectation_set.prefilter
+        if prefilter is not None and not prefilter.search(line):
+            return False
+
+        changed = False
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for idx, expectation in enumerate(self.expectation_set.expectations):
+            if expectation.kind == "sequence":
+                pos = 0
+                patterns = expectation.patterns
+                while self.sequence_progress[idx] < len(patterns):
+                    hit = patterns[self.sequence_progress[idx]].search(line, pos)
+                    if not hit:
+                        break
+                    self.evidence.setdefault(expectation.label, []).append(hit.group(0))
+                    self.sequence_progress[idx] += 1
+                    pos = hit.end()
+                    changed = True
+                if self.sequence_progress[idx] == len(patterns) and expectation.label not in self.matched_at:
+                    self.matched_at[expectation.label] = now
+            else:
+                hits = [hit.group(0) for hit in expectation.patterns[0].finditer(line) if hit.group(0)]
+                if not hits:
+                    continue
+                if self.counts[idx] == 0:
+                    self.evidence[expectation.label] = [hits[0]]
+                self.counts[idx] += len(hits)
+                changed = True
+                if (expectation.kind != "absent" and self.counts[idx] >= expectation.min_count
+                        and expectation.label not in self.matched_at):
+                    self.matched_at[expectation.label] = now
+        return changed
+
+    def satisfied(self, idx: int) -> bool:
+        expectation = self.expectation_set.expectations[idx]
+        if expectation.kind == "absent":
+            return self.counts[idx] == 0
+        return expectation.label in self.matched_at
+
+    def result(self) -> Dict[str, Any]:
+        """返回匹配结果，字段与 CommandExecutor.check_keywords 兼容；absent 表达式在日志结束前视为暂时满足"""
+        matched, missing = [], []
+        for idx, expectation in enumerate(self.expectation_set.expectations):
+            (matched if self.satisfied(idx) else missing).append(expectation.label)
+        return {
+            "all_matched": len(missing) == 0,
+            "matched": matched,
+            "missing": missing,
+            "matched_at": dict(self.matched_at),
+            "evidence": {label: list(texts) for label, texts in self.evidence.items()}
+        }
+
+
+_COMPILED_CACHE: Dict[str, ExpectationSet] = {}
+_COMPILED_CACHE_LOCK = threading.Lock()
+
+
+def _compile_item(item: Any, where: str) -> Tuple["re.Pattern", Optional[str]]:
+    """编译 sequence 中的一项：字符串为纯文本，{"regex": ...} 为正则"""
+    if isinstance(item, str):
+        return re.compile(re.escape(item)), item
+    if isinstance(item, dict) and isinstance(item.get("regex"), str):
+        return re.compile(item["regex"]), None
+    raise ValueError(f"{where} 中的序列项必须是字符串或 {{\"regex\": ...}}，实际为: {item!r}")
+
+
+def _compile_spec(spec: ExpectationSpec) -> Expectation:
+    if isinstance(spec, str):
+        return Expectation("contains", spec, [re.compile(re.escape(spec))], [spec])
+    if not isinstance(spec, dict):
+        raise ValueError(f"预期结果必须是字符串或字典，实际为: {spec!r}")
+
+    min_count = spec.get("min_count", 1)
+    if not isinstance(min_count, int) or isinstance(min_count, bool) or min_count < 1:
+        raise ValueError(f"预期结果 {spec!r} 中 min_count 必须为正整数")
+    count_suffix = f" ×≥{min_count}" if min_count > 1 else ""
+
+    try:
+        if isinstance(spec.get("contains"), str):
+            text = spec["contains"]
+            return Expectation("contains", f"{text}{count_suffix}", [re.compile(re.escape(text))], [text], min_count)
+        if isinstance(spec.get("regex"), str):
+            return Expectation("regex", f"regex:/{spec['regex']}/{count_suffix}", [re.compile(spec["regex"])], [None], min_count)
+        if isinstance(spec.get("sequence"), list) and spec["sequence"]:
+            compiled = [_compile_item(item, "sequence") for item in spec["sequence"]]
+            names = [literal if literal is not None else f"/{pattern.pattern}/" for pattern, literal in compiled]
+            return Expectation("sequence", "sequence:[" + " → ".join(names) + "]",
+                               [pattern for pattern, _ in compiled], [literal for _, literal in compiled])
+        if isinstance(spec.get("absent"), str):
+            text = spec["absent"]
+            return Expectation("absent", f"absent:{text}", [re.compile(re.escape(text))], [text])
+        if isinstance(spec.get("absent_regex"), str):
+            return Expectation("absent", f"absent:/{spec['absent_regex']}/", [re.compile(spec["absent_regex"])], [None])
+    except re.error as e:
+        raise ValueError(f"预期结果 {spec!r} 中的正则表达式无效: {str(e)}")
+    raise ValueError(f"无法识别的预期结果表达式: {spec!r}，支持 contains / regex / sequence / absent / absent_regex")
+
+
+def compile_expectations(expected_output: List[ExpectationSpec]) -> ExpectationSet:
+    """编译一个步骤的 expected_output，按内容缓存编译结果
+    :raises ValueError: 表达式格式错误或正则无效
+    """
+    key = json.dumps(expected_output or [], ensure_ascii=False, sort_keys=True)
+    with _COMPILED_CACHE_LOCK:
+        cached = _COMPILED_CACHE.get(key)
+    if cached is not None:
+        return cached
+    compiled = ExpectationSet([_compile_spec(spec) for spec in (expected_output or [])])
+    with _COMPILED_CACHE_LOCK:
+        _COMPILED_CACHE[key] = compiled
+    return compiled
+
+
+def screenshot_keywords(expected_output: List[ExpectationSpec], keyword_check: Dict[str, Any]) -> List[str]:
+    """生成截图时用于定位的纯文本关键词：普通字符串原样使用，其他表达式使用实际命中的文本，
+    尚无命中结果时退而使用表达式中的纯文本部分；absent 表达式仅在违例时截取违例文本
+    """
+    evidence = keyword_check.get("evidence", {}) if keyword_check else {}
+    keywords = []
+    expectation_set = compile_expectations(expected_output)
+    for spec, expectation in zip(expected_output or [], expectation_set.expectations):
+        if isinstance(spec, str):
+            keywords.append(spec)
+            continue
+        texts = evidence.get(expectation.label)
+        if not texts and expectation.kind != "absent":  # absent 表达式未出现时无内容可截图
+            texts = [literal for literal in expectation.literals if literal]
+        texts = texts or []
+        keywords.extend(text for text in texts if text not in keywords)
+    return keywords
@@ -0,0 +1,177 @@
+"""
+步骤日志归档
+会话开始清理 logs/ 前，将上一轮的步骤日志、被测系统日志过滤结果和清洗视图打包为压缩归档：
+每个文件按固定大小切块、逐块 zlib 压缩后顺序写入 .lpk 数据文件，块偏移等信息写入同名 .lpk.json 索引。
+读取时按索引只解压目标用例/步骤/字节范围涉及的块，无需解压整个归档。
+
+命令行用法：
+    python -m utils.log_archive list history/log_archive/run_20261019120000.lpk --case XXX_TEST_001 --step 2
+    python -m utils.log_archive cat history/log_archive/run_20261019120000.lpk <成员名> --offset 0 --length 4096
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+INDEX_SUFFIX = ".json"
+ARCHIVE_SUFFIX = ".lpk"
+
+# {ip}_{case_id}_log_step_{N}_{时间戳}.log / _log_pre_{N}_ / _log_post_{N}_，清洗视图额外带 .clean 后缀
+_STEP_LOG_PATTERN = re.compile(r"^(?P<ip>[^_]+)_(?P<case_id>.+?)_log_(?P<kind>step|pre|post)_(?P<num>\d+)_\d+\.log(?P<clean>\.clean)?$")
+# logs/{ip}_{case_id}_step_{N}_cat_expected_logfile.log
+_CAT_LOG_PATTERN = re.compile(r"^(?P<ip>[^_]+)_(?P<case_id>.+?)_step_(?P<num>\d+)_cat_expected_logfile\.log$")
+
+
+class LogArchive:
+    """块压缩、带索引的日志归档，支持按用例、步骤、字节范围随机读取"""
+
+    def __init__(self, archive_file: str, index: Dict[str, Any]):
+        self.archive_file = archive_file
+        self.index = index
+        self.members: Dict[str, Dict[str, Any]] = {m["name"]: m for m in index.get("members", [])}
+
+    @staticmethod
+    def describe_member(file_name: str) -> Dict[str, Any]:
+        """根据日志文件名解析所属用例、步骤序号和日志类型"""
+        hit = _STEP_LOG_PATTERN.match(file_name)
+        if hit:
+            kind = hit.group("kind") + ("_clean" if hit.group("clean") else "")
+            return {"case_id": hit.group("case_id"), "step": int(hit.group("num")), "kind": kind, "remote_ip": hit.group("ip")}
+        hit = _CAT_LOG_PATTERN.match(file_name)
+        if hit:
+            return {"case_id": hit.group("case_id"), "step": int(hit.group("num")), "kind": "cat", "remote_ip": hit.group("ip")}
+        return {"case_id": "", "step": None, "kind": "other", "remote_ip": ""}
+
+    @staticmethod
+    def pack_directory(log_dir: str, archive_dir: str, block_size: int = 256 * 1024) -> Optional[str]:
+        """
+        将日志目录下的步骤日志（step/pre/post）、被测系统日志过滤结果（cat）和清洗视图（.clean）打包为一个归档；
+        只取日志目录顶层按命名规则识别的文件，不归档 remote_cache/ 等子目录中的整份被测系统日志副本和JSON状态文件
+        :param log_dir: 待归档的日志目录
+        :param archive_dir: 归档保存目录
+        :param block_size: 压缩块大小（字节），越小随机读取越快、压缩率越低
+        :return: 归档数据文件路径，目录为空时返回 None
+        """
+        files = sorted(
+            p for p in Path(log_dir).iterdir()
+            if p.is_file() and LogArchive.describe_member(p.name)["kind"] != "other"
+        ) if os.path.isdir(log_dir) else []
+        if not files:
+            return None
+
+        os.makedirs(archive_dir, exist_ok=True)
+        run_name = f"run_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        archive_file = os.path.join(archive_dir, run_name + ARCHIVE_SUFFIX)
+        members = []
+        with open(archive_file + ".tmp", "wb") as out:
+            for path in files:
+                member = {
+                    "name": path.relative_to(log_dir).as_posix(),
+                    **LogArchive.describe_member(path.name),
+                    "mtime": datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+                    "size": 0,
+                    "blocks": []  # [原始偏移, 归档内偏移, 压缩后长度, 原始长度]
+                }
+                with open(path, "rb") as f:
+                    while True:
+                        raw = f.read(block_size)
+                        if not raw:
+                            break
+                        compressed = zlib.compress(raw, 6)
+                        member["blocks"].append([member["size"], out.tell(), len(compressed), len(raw)])
+                        out.write(compressed)
+                        member["size"] += len(raw)
+                members.append(member)
+
+        index = {
+            "run": run_name,
+            "source_dir": os.path.abspath(log_dir),
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "block_size": block_size,
+            "members": members
+        }
+        with open(archive_file + INDEX_SUFFIX + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(archive_file + ".tmp", archive_file)
+        os.replace(archive_file + INDEX_SUFFIX + ".tmp", archive_file + INDEX_SUFFIX)
+        return archive_file
+
+    @classmethod
+    def open(cls, archive_file: str) -> "LogArchive":
+        """加载归档索引（不读取数据文件）"""
+        with open(archive_file + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+            return cls(archive_file, json.load(f))
+
+    @staticmethod
+    def list_archives(archive_dir: str) -> List[str]:
+        """按时间倒序列出归档目录下的所有归档"""
+        if not os.path.isdir(archive_dir):
+            return []
+        return sorted((str(p) for p in Path(archive_dir).glob(f"*{ARCHIVE_SUFFIX}")), reverse=True)
+
+    def find(self, case_id: str = None, step: int = None, kind: str = None) -> List[Dict[str, Any]]:
+        """按用例编号、步骤序号、日志类型（step/pre/post/cat/step_clean...）筛选归档成员"""
+        return [
+            m for m in self.members.values()
+            if (case_id is None or m["case_id"] == case_id)
+            and (step is None or m["step"] == step)
+            and (kind is None or m["kind"] == kind)
+        ]
+
+    def read(self, name: str, offset: int = 0, length: int = None) -> bytes:
+        """
+        读取成员文件的指定字节范围，只解压与该范围相交的块
+        :param name: 成员名（归档时相对日志目录的路径）
+        :param offset: 起始字节偏移
+        :param length: 读取长度，None 表示读到文件末尾
+        """
+        member = self.members.get(name)
+        if member is None:
+            raise KeyError(f"归档 {self.archive_file} 中不存在: {name}")
+        end = member["size"] if length is None else min(member["size"], offset + length)
+        chunks = []
+        with open(self.archive_file, "rb") as f:
+            for raw_offset, archive_offset, compressed_size, raw_size in member["blocks"]:
+                if raw_offset + raw_size <= offset or raw_offset >= end:
+                    continue
+                f.seek(archive_offset)
+                raw = zlib.decompress(f.read(compressed_size))
+                chunks.append(raw[max(offset - raw_offset, 0):end - raw_offset])
+        return b"".join(chunks)
+
+    def read_text(self, name: str, offset: int = 0, length: int = None) -> str:
+        return self.read(name, offset, length).decode("utf-8", errors="ignore")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="查看步骤日志归档")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="列出归档成员")
+    list_parser.add_argument("archive", help="归档数据文件（.lpk）")
+    list_parser.add_argument("--case", default=None, help="用例编号")
+    list_parser.add_argument("--step", type=int, default=None, help="步骤序号")
+    list_parser.add_argument("--kind", default=None, help="日志类型：step/pre/post/cat/step_clean 等")
+
+    cat_parser = subparsers.add_parser("cat", help="输出归档成员内容")
+    cat_parser.add_argument("archive", help="归档数据文件（.lpk）")
+    cat_parser.add_argument("name", help="成员名")
+    cat_parser.add_argument("--offset", type=int, default=0, help="起始字节偏移")
+    cat_parser.add_argument("--length", type=int, default=None, help="读取字节数")
+
+    args = parser.parse_args(argv)
+    archive = LogArchive.open(args.archive)
+    if args.command == "list":
+        for member in archive.find(args.case, args.step, args.kind):
+            print(f"{member['name']}\t{member['case_id']}\t{member['step']}\t{member['kind']}\t{member['size']}\t{member['mtime']}")
+    else:
+        sys.stdout.buffer.write(archive.read(args.name, args.offset, args.length))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+被测系统日志基线
+在会话开始（执行全流程脚本前）用一次批量stat记录各待检查日志的大小和inode，
+校验预期结果时只读取基线之后新写入的内容，不再移动、清理被测系统日志
+"""
+import json
+import os
+import shlex
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+from utils.command_executor import CommandExecutor
+
+
+class LogBaseline:
+    """记录并查询被测系统日志的字节偏移基线"""
+
+    _active: Optional["LogBaseline"] = None
+    _active_lock = threading.Lock()
+
+    def __init__(self, baseline_file: str, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        :param baseline_file: 基线持久化文件路径
+        :param entries: {日志路径: {"size": 字节数, "inode": inode号, "captured_at": 记录时间}}
+        """
+        self.baseline_file = baseline_file
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @staticmethod
+    def build_stat_command(log_paths: List[str]) -> str:
+        """构造一次性获取多个日志大小和inode的命令，每行输出：序号 大小 inode（文件不存在时大小为-1）"""
+        parts = [
+            f"echo \"{idx} $(stat -c '%s %i' {shlex.quote(path)} 2>/dev/null || echo '-1 0')\""
+            for idx, path in enumerate(log_paths)
+        ]
+        return "; ".join(parts)
+
+    @classmethod
+    def capture(cls, log_paths: List[str], baseline_file: str, remote_os: str, remote_ip: str, remote_user: str,
+        remote_passwd: str, remote_hdc_port: str) -> "LogBaseline":
+        """
+        记录各日志当前的大小和inode作为基线，并设为当前会话的活动基线
+        本地日志直接stat；远程日志通过一次远程命令批量stat
+        :raises RuntimeError: 远程批量stat失败
+        """
+        log_paths = list(dict.fromkeys(path for path in log_paths if path))  # 去重并保持顺序
+        captured_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        stats: Dict[str, Tuple[int, int]] = {}
+
+        if remote_ip == "127.0.0.1":
+            for path in log_paths:
+                try:
+                    st = os.stat(path)
+                    stats[path] = (st.st_size, st.st_ino)
+                except OSError:
+                    stats[path] = (-1, 0)
+        elif log_paths:
+            success, output, stderr, returncode = CommandExecutor.run_remote_command(
+                cls.build_stat_command(log_paths), remote_os, remote_ip, remote_user, remote_passwd, remote_hdc_port)
+            if not success or returncode != 0:
+                raise RuntimeError(f"获取被测系统日志基线失败（返回码: {returncode}）: {stderr}")
+            for line in output.splitlines():
+                fields = line.split()
+                if len(fields) == 3 and fields[0].isdigit() and int(fields[0]) < len(log_paths):
+                    stats[log_paths[int(fields[0])]] = (int(fields[1]), int(fields[2]))
+
+        entries = {
+            path: {"size": max(size, 0), "inode": inode, "exists": size >= 0, "captured_at": captured_at}
+            for path, (size, inode) in stats.items()
+        }
+        baseline = cls(baseline_file, entries)
+        baseline.save()
+        with cls._active_lock:
+            cls._active = baseline
+        return baseline
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.baseline_file) or ".", exist_ok=True)
+        with open(self.baseline_file, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def active(cls, baseline_file: str) -> "LogBaseline":
+        """获取当前会话的活动基线；本进程未记录过时从基线文件加载，文件不存在时返回空基线（即从头检查）"""
+        with cls._active_lock:
+            if cls._active is not None and cls._active.baseline_file == baseline_file:
+                return cls._active
+        entries = {}
+        if os.path.exists(baseline_file):
+            try:
+                with open(baseline_file, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取被测系统日志基线失败，将从头检查日志: {str(e)}")
+        return cls(baseline_file, entries)
+
+    def entry(self, log_path: str) -> Optional[Dict[str, Any]]:
+        """返回日志的基线记录，未记录时返回 None"""
+        entry = self.entries.get(log_path)
+        return entry if entry and entry.get("exists") else None
+
+    def record(self, log_path: str) -> Optional[Dict[str, Any]]:
+        """返回日志的完整基线记录（含记录时日志不存在的情况），未记录时返回 None"""
+        return self.entries.get(log_path)
+
+    def local_offset(self, log_path: str) -> int:
+        """本地日志的起始读取偏移：inode未变且未被截断时为基线大小，否则（被轮转或重建）从头读取"""
+        entry = self.entry(log_path)
+        if entry is None:
+            return 0
+        try:
+            st = os.stat(log_path)
+        except OSError:
+            return 0
+        return self._offset(entry, st.st_size, st.st_ino)
+
+    def remote_offset(self, log_path: str, remote_os: str, remote_ip: str, remote_user: str,
+        remote_passwd: str, remote_hdc_port: str) -> int:
+        """
+        执行机上日志的起始读取偏移：在执行机上stat当前日志，与 local_offset 和 CommandExecutor.build_read_logfile_command
+        使用相同的判断，inode未变且未被截断时为基线大小，否则（被轮转或重建，或stat失败）从头读取
+        """
+        entry = self.entry(log_path)
+        if entry is None:
+            return 0
+        success, output, _, returncode = CommandExecutor.run_remote_command(
+            self.build_stat_command([log_path]), remote_os, remote_ip, remote_user, remote_passwd, remote_hdc_port)
+        fields = output.split() if success and returncode == 0 else []
+        if len(fields) != 3 or fields[0] != "0" or int(fields[1]) < 0:
+            return 0
+        return self._offset(entry, int(fields[1]), int(fields[2]))
+
+    @staticmethod
+    def _offset(entry: Dict[str, Any], size: int, inode: int) -> int:
+        if inode != entry["inode"] or size < entry["size"]:
+            return 0
+        return entry["size"]
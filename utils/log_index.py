@@ -0,0 +1,145 @@
+"""
+运行日志全文索引
+步骤日志在写入过程中即逐行写入 SQLite 全文索引（FTS5，trigram 分词以支持中文和任意子串），
+按 运行编号/用例编号/步骤/行号 定位；Web端和命令行（python main.py --search 关键词）直接查询索引，
+不再逐个 grep logs/*.log。当前 SQLite 不支持 FTS5 时退化为普通表 + LIKE 查询。
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+RUN_ID_ENV = "TE_AGENT_RUN_ID"
+
+
+class LogIndex:
+    """步骤日志全文索引，进程内按索引文件共享一个实例"""
+
+    _instances: Dict[str, "LogIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._line_numbers: Dict[Tuple[str, str, int, str], int] = {}  # 每个被索引文件已写入的行数
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self.mode = self._create_schema()
+
+    def _create_schema(self) -> str:
+        """建表，返回索引模式：trigram / fts5 / like"""
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, started_at TEXT)"
+        )
+        existing = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'log_lines'"
+        ).fetchone()
+        if existing:
+            sql = existing[0].lower()
+            return "trigram" if "trigram" in sql else ("fts5" if "fts5" in sql else "like")
+
+        columns = "content, run_id UNINDEXED, case_id UNINDEXED, step UNINDEXED, line_no UNINDEXED, log_file UNINDEXED"
+        for mode, tokenize in (("trigram", ", tokenize='trigram'"), ("fts5", "")):
+            try:
+                self._conn.execute(f"CREATE VIRTUAL TABLE log_lines USING fts5({columns}{tokenize})")
+                self._conn.commit()
+                return mode
+            except sqlite3.OperationalError:
+                continue
+        self._conn.execute(
+            "CREATE TABLE log_lines (content TEXT, run_id TEXT, case_id TEXT, step INTEGER, line_no INTEGER, log_file TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_log_lines_case ON log_lines (run_id, case_id, step)")
+        self._conn.commit()
+        return "like"
+
+    @classmethod
+    def get(cls, db_file: str) -> "LogIndex":
+        """获取进程内共享的索引实例"""
+        with cls._instances_lock:
+            if db_file not in cls._instances:
+                cls._instances[db_file] = cls(db_file)
+            return cls._instances[db_file]
+
+    @staticmethod
+    def current_run_id() -> str:
+        """当前运行编号：优先取环境变量 TE_AGENT_RUN_ID，未设置时以首次调用时间生成并写回环境变量"""
+        return os.environ.setdefault(RUN_ID_ENV, datetime.now().strftime("%Y%m%d%H%M%S"))
+
+    def add_lines(self, run_id: str, case_id: str, step: int, log_file: str, lines: List[str]):
+        """追加一批日志行，行号在同一文件内连续累加"""
+        lines = [line.rstrip("\r\n") for line in lines]
+        if not lines:
+            return
+        key = (run_id, case_id, step, log_file)
+        with self._lock:
+            start = self._line_numbers.get(key, 0)
+            self._line_numbers[key] = start + len(lines)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at) VALUES (?, ?)",
+                (run_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            self._conn.executemany(
+                "INSERT INTO log_lines (content, run_id, case_id, step, line_no, log_file) VALUES (?, ?, ?, ?, ?, ?)",
+                [(line, run_id, case_id, step, start + idx + 1, log_file) for idx, line in enumerate(lines) if line.strip()]
+            )
+            self._conn.commit()
+
+    def index_file(self, run_id: str, case_id: str, step: int, log_file: str):
+        """将整个日志文件写入索引（用于未被流式跟随的日志）；已索引过的文件跳过"""
+        if (run_id, case_id, step, log_file) in self._line_numbers or not os.path.exists(log_file):
+            return
+        with open(log_file, "r", encoding="utf-8", errors="ignore") as f:
+            batch = []
+            for line in f:
+                batch.append(line)
+                if len(batch) >= 5000:
+                    self.add_lines(run_id, case_id, step, log_file, batch)
+                    batch = []
+            self.add_lines(run_id, case_id, step, log_file, batch)
+
+    def search(self, text: str, case_id: str = None, run_id: str = None, step: int = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        查询包含指定文本的日志行，按运行编号倒序、用例、步骤、行号排列
+        :param text: 待查找的文本（子串匹配）
+        """
+        if not text:
+            return []
+        conditions, params = [], []
+        if self.mode == "fts5":
+            conditions.append("log_lines MATCH ?")
+            params.append('"' + text.replace('"', '""') + '"')
+        else:
+            # trigram 分词的 FTS5 表对不带 ESCAPE 的 LIKE 查询走全文索引，只有含通配符时才转义；
+            # 不足3个字符的关键词无法用trigram检索，直接逐行比对
+            if self.mode == "trigram" and len(text) < 3:
+                conditions.append("instr(content, ?) > 0")
+                params.append(text)
+            elif any(ch in text for ch in "%_"):
+                conditions.append("content LIKE ? ESCAPE '\\'")
+                params.append("%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            else:
+                conditions.append("content LIKE ?")
+                params.append(f"%{text}%")
+        for column, value in (("case_id", case_id), ("run_id", run_id), ("step", step)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = (
+            "SELECT run_id, case_id, step, line_no, log_file, content FROM log_lines WHERE "
+            + " AND ".join(conditions)
+            + " ORDER BY run_id DESC, case_id, step, line_no LIMIT ?"
+        )
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"run_id": r[0], "case_id": r[1], "step": r[2], "line_no": r[3], "log_file": r[4], "content": r[5]}
+            for r in rows
+        ]
+
+    def list_runs(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute("SELECT run_id, started_at FROM runs ORDER BY run_id DESC").fetchall()
@@ -0,0 +1,173 @@
+"""
+轮转感知的被测系统日志扫描
+全流程长时间运行时，被测系统日志会被轮转为 app.log.1、app.log.2.gz、app.log-20261019.gz 等文件。
+校验预期结果时先发现 expected_log 的整个轮转集合，再结合会话开始时记录的日志基线，确定自基线以来写入的内容分布在哪些文件、
+从哪个偏移开始，按时间顺序逐个文件只扫描一遍；.gz 文件流式解压，不解压落盘、不整份读入内存。
+"""
+import gzip
+import os
+import re
+import shlex
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from utils.expectation import compile_expectations
+
+
+class LogRotation:
+    """发现日志轮转集合并生成扫描计划；扫描计划为按写入顺序排列的 [{"path", "compressed", "skip"}]"""
+
+    READ_BLOCK = 1024 * 1024
+
+    @staticmethod
+    def member_pattern(expected_log: str) -> "re.Pattern":
+        """轮转文件名：原文件名后跟若干 .N / -YYYYMMDD，可再跟 .gz"""
+        return re.compile(rf"^{re.escape(os.path.basename(expected_log))}(?:[.-]\d+)*(?:\.gz)?$")
+
+    @staticmethod
+    def _rotation_number(expected_log: str, path: str) -> int:
+        suffix = os.path.basename(path)[len(os.path.basename(expected_log)):]
+        numbers = re.findall(r"\d+", suffix)
+        return int(numbers[0]) if numbers else 0
+
+    @staticmethod
+    def discover_local(expected_log: str) -> List[Dict[str, Any]]:
+        """列出本地日志的轮转集合（含当前日志）及各文件的大小、inode、修改时间"""
+        log_dir = os.path.dirname(os.path.abspath(expected_log))
+        pattern = LogRotation.member_pattern(expected_log)
+        files = []
+        if not os.path.isdir(log_dir):
+            return files
+        for name in os.listdir(log_dir):
+            if not pattern.match(name):
+                continue
+            path = os.path.join(os.path.dirname(expected_log), name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append({"path": path, "size": st.st_size, "inode": st.st_ino, "mtime": int(st.st_mtime)})
+        return files
+
+    @staticmethod
+    def build_stat_command(expected_log: str) -> str:
+        """构造在执行机上列出轮转集合的命令，每行输出：大小 inode 修改时间 路径"""
+        quoted = shlex.quote(expected_log)
+        return (
+            f"for f in {quoted} {quoted}.* {quoted}-*; do "
+            f"[ -f \"$f\" ] && echo \"$(stat -c '%s %i %Y' \"$f\") $f\"; done; true"
+        )
+
+    @staticmethod
+    def parse_stat_output(expected_log: str, output: str) -> List[Dict[str, Any]]:
+        pattern = LogRotation.member_pattern(expected_log)
+        files = []
+        for line in output.splitlines():
+            fields = line.strip().split(" ", 3)
+            if len(fields) != 4 or not all(field.isdigit() for field in fields[:3]):
+                continue
+            if not pattern.match(os.path.basename(fields[3])):
+                continue
+            files.append({"path": fields[3], "size": int(fields[0]), "inode": int(fields[1]), "mtime": int(fields[2])})
+        return files
+
+    @staticmethod
+    def plan(expected_log: str, files: List[Dict[str, Any]], baseline_record: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        根据轮转集合和日志基线生成扫描计划
+        :param files: discover_local / parse_stat_output 的结果
+        :param baseline_record: LogBaseline.record() 返回的基线记录（含 exists、size、inode、captured_at），无基线时为 None
+        """
+        current = next((f for f in files if os.path.basename(f["path"]) == os.path.basename(expected_log)), None)
+        if not baseline_record:
+            # 没有基线（如单元测试用例），与原行为一致只检查当前日志
+            return [{"path": current["path"], "compressed": False, "skip": 0}] if current else []
+
+        captured_ts = time.mktime(datetime.strptime(baseline_record["captured_at"], "%Y-%m-%d %H:%M:%S").timetuple())
+        rotated = sorted(
+            (f for f in files if f is not current),
+            key=lambda f: (f["mtime"], -LogRotation._rotation_number(expected_log, f["path"]))
+        )
+        # 基线之后未再修改过的轮转文件不可能包含新内容
+        candidates = [f for f in rotated if f["mtime"] >= captured_ts - 1] + ([current] if current else [])
+        members = [{"path": f["path"], "compressed": f["path"].endswith(".gz"), "skip": 0} for f in candidates]
+        if not baseline_record.get("exists"):
+            return members
+
+        size, inode = int(baseline_record["size"]), int(baseline_record["inode"])
+        for idx, f in enumerate(candidates):
+            if not members[idx]["compressed"] and f["inode"] == inode and f["size"] >= size:
+                if f is current and any(c["mtime"] > captured_ts for c in candidates[:idx]):
+                    continue  # 基线之后已有文件被轮转出去，当前日志是新建的，inode 只是被复用
+                # 基线时的日志文件（可能已被重命名为 .1）仍在：从基线偏移处开始，之前的文件都是基线之前的内容
+                members[idx]["skip"] = size
+                return members[idx:]
+        if members and candidates[0] is not current:
+            # 基线时的日志已被轮转并压缩（或copytruncate复制），其开头的 size 字节是基线之前的内容
+            members[0]["skip"] = size
+        return members
+
+    @staticmethod
+    def plan_local(expected_log: str, baseline_record: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return LogRotation.plan(expected_log, LogRotation.discover_local(expected_log), baseline_record)
+
+    @staticmethod
+    def is_rotated(expected_log: str, members: List[Dict[str, Any]]) -> bool:
+        """扫描计划是否涉及当前日志以外的轮转文件"""
+        return any(os.path.basename(m["path"]) != os.path.basename(expected_log) for m in members)
+
+    @staticmethod
+    def open_member(member: Dict[str, Any]):
+        """以二进制方式打开扫描计划中的一个文件，并定位到 skip 字节处"""
+        f = gzip.open(member["path"], "rb") if member["compressed"] else open(member["path"], "rb")
+        skip = member["skip"]
+        if not member["compressed"]:
+            f.seek(skip)
+        else:
+            while skip > 0:  # gzip 无法随机定位，流式读过并丢弃基线之前的内容
+                block = f.read(min(skip, LogRotation.READ_BLOCK))
+                if not block:
+                    break
+                skip -= len(block)
+        return f
+
+    @staticmethod
+    def iter_raw_lines(members: List[Dict[str, Any]]) -> Iterator[bytes]:
+        """按扫描计划依次流式读取各文件，逐行产出原始字节（每个文件只读一遍）"""
+        for member in members:
+            try:
+                with LogRotation.open_member(member) as f:
+                    yield from f
+            except (OSError, EOFError) as e:
+                print(f"读取轮转日志 {member['path']} 失败: {str(e)}")
+
+    @staticmethod
+    def iter_lines(members: List[Dict[str, Any]]) -> Iterator[str]:
+        """按扫描计划依次流式读取各文件，逐行产出解码后的文本"""
+        for raw_line in LogRotation.iter_raw_lines(members):
+            yield raw_line.decode("utf-8", errors="ignore").rstrip("\n")
+
+    @staticmethod
+    def scan_local(members: List[Dict[str, Any]], expected_output: List[Any]) -> Dict[str, Any]:
+        """按扫描计划匹配预期结果，返回字段与 CommandExecutor.check_keywords 兼容的结果"""
+        matcher = compile_expectations(expected_output).matcher()
+        bytes_seen = 0
+        for raw_line in LogRotation.iter_raw_lines(members):
+            bytes_seen += len(raw_line)  # 按原始字节计数，与流式判定的 bytes_seen 一致
+            matcher.feed_line(raw_line.decode("utf-8", errors="ignore").rstrip("\n"))
+        result = matcher.result()
+        result.update({"bytes_seen": bytes_seen, "scanned_files": [m["path"] for m in members]})
+        return result
+
+    @staticmethod
+    def build_read_command(members: List[Dict[str, Any]]) -> str:
+        """构造在执行机上按扫描计划依次输出各文件内容的命令（每个文件后补一个换行，避免跨文件拼行）"""
+        parts = []
+        for member in members:
+            quoted = shlex.quote(member["path"])
+            if member["compressed"]:
+                read_cmd = f"gzip -dc {quoted}"
+                parts.append(f"{read_cmd} | tail -c +{member['skip'] + 1}" if member["skip"] else read_cmd)
+            else:
+                parts.append(f"tail -c +{member['skip'] + 1} {quoted}" if member["skip"] else f"cat {quoted}")
+        return "; echo; ".join(parts) if parts else ":"
@@ -0,0 +1,105 @@
+"""
+终端日志清洗
+按块流式读取终端日志，用一个预编译正则一次性删除 ANSI 转义序列和控制字符（保留 \\n 和 \\t），
+清洗结果写到原日志旁的 .clean 文件，原始日志保持不变；清洗结果和按行读取结果按文件大小、修改时间缓存，
+同一步骤多次定位关键词时不再重复清洗和读取
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+# ANSI 转义序列 | ASCII 控制符（0-8、11-31、127，保留 \n（0x0A）和 \t（0x09），响铃符 ^G 也在其中）
+_CLEAN_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])|[\x00-\x08\x0B-\x1F\x7F]')
+# 块末尾尚未结束的转义序列，留到下一块拼接后再匹配，避免被拆成两半时残留 "[31m" 之类的字符
+_INCOMPLETE_TAIL = re.compile(r'\x1B(?:\[[0-?]*[ -/]*)?\Z')
+
+CLEAN_SUFFIX = ".clean"
+
+
+class LogSanitizer:
+    """流式清洗终端日志，并缓存清洗视图和按行读取结果"""
+
+    CHUNK_SIZE = 1 << 20  # 每次读取1M字符
+    MAX_CACHED_FILES = 16
+
+    _lines_cache: "OrderedDict[str, Tuple[Tuple[int, int], List[str]]]" = OrderedDict()
+    _views: Dict[str, Tuple[Tuple[int, int], str]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _signature(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def sanitize_file(file_path: str, output_path: str) -> List[str]:
+        """
+        流式清洗日志并写入 output_path，返回清洗后的各行（含换行符，与 readlines 一致）
+        读取时使用通用换行模式，\\r\\n 和单独的 \\r 都转为 \\n，与按文本模式整体读取的结果一致
+        """
+        lines: List[str] = []
+        partial = ""
+        carry = ""
+        tmp_path = f"{output_path}.tmp"
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as fin, \
+                open(tmp_path, "w", encoding="utf-8", newline="\n") as fout:
+            while True:
+                chunk = fin.read(LogSanitizer.CHUNK_SIZE)
+                if not chunk:
+                    text = _CLEAN_PATTERN.sub("", carry)
+                    carry = ""
+                else:
+                    text = carry + chunk
+                    tail = _INCOMPLETE_TAIL.search(text)
+                    carry = text[tail.start():] if tail else ""
+                    text = _CLEAN_PATTERN.sub("", text[:tail.start()] if tail else text)
+                fout.write(text)
+                parts = (partial + text).split("\n")
+                partial = parts.pop()
+                lines.extend(part + "\n" for part in parts)
+                if not chunk:
+                    break
+        if partial:
+            lines.append(partial)
+        os.replace(tmp_path, output_path)
+        LogSanitizer._remember_lines(output_path, lines)
+        return lines
+
+    @staticmethod
+    def clean_view(log_file: str) -> str:
+        """返回日志的清洗视图（log_file.clean）路径；日志自上次清洗后未变化时直接复用"""
+        clean_file = log_file + CLEAN_SUFFIX
+        signature = LogSanitizer._signature(log_file)
+        with LogSanitizer._lock:
+            cached = LogSanitizer._views.get(log_file)
+        if cached and cached[0] == signature and os.path.exists(clean_file):
+            return clean_file
+        LogSanitizer.sanitize_file(log_file, clean_file)
+        with LogSanitizer._lock:
+            LogSanitizer._views[log_file] = (signature, clean_file)
+        return clean_file
+
+    @staticmethod
+    def read_lines(path: str) -> List[str]:
+        """按行读取文件，文件大小和修改时间不变时复用上次的读取结果"""
+        signature = LogSanitizer._signature(path)
+        with LogSanitizer._lock:
+            cached = LogSanitizer._lines_cache.get(path)
+            if cached and cached[0] == signature:
+                LogSanitizer._lines_cache.move_to_end(path)
+                return cached[1]
+        with open(path, "r", errors="ignore") as f:
+            lines = f.readlines()
+        LogSanitizer._remember_lines(path, lines, signature)
+        return lines
+
+    @staticmethod
+    def _remember_lines(path: str, lines: List[str], signature: Tuple[int, int] = None):
+        signature = signature or LogSanitizer._signature(path)
+        with LogSanitizer._lock:
+            LogSanitizer._lines_cache[path] = (signature, lines)
+            LogSanitizer._lines_cache.move_to_end(path)
+            while len(LogSanitizer._lines_cache) > LogSanitizer.MAX_CACHED_FILES:
+                LogSanitizer._lines_cache.popitem(last=False)
@@ -0,0 +1,176 @@
+"""
+远程文件分块取回
+需要整份取回执行机上的日志时，不再经由终端 cat / tee：每次在执行机上读取一个分块，gzip 压缩后 base64 编码，
+通过非交互远程命令（ssh / hdc shell）传回本地解码追加到 .part 文件。每个分块完成后记录进度，
+中断后再次取回同一文件时从断点续传；全部取回后比对执行机侧与本地的 md5，一致才落盘为目标文件。
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import shlex
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+from utils.command_executor import CommandExecutor
+
+
+class RemoteFileFetcher:
+    """分块、压缩、可续传、带校验地取回执行机上的文件（或文件的一段字节范围）"""
+
+    CHUNK_SIZE = 4 * 1024 * 1024  # 每个分块的原始字节数
+    CHUNK_RETRIES = 3  # 单个分块失败后的重试次数
+
+    @staticmethod
+    def _state_file(local_path: str) -> str:
+        return local_path + ".part.json"
+
+    @staticmethod
+    def _run(core_cmd: str, target: Dict[str, str], timeout: int) -> Tuple[bool, str, str]:
+        success, output, stderr, returncode = CommandExecutor.run_remote_command(
+            core_cmd, target["remote_os"], target["remote_ip"], target["remote_user"],
+            target["remote_passwd"], target["remote_hdc_port"], timeout=timeout)
+        if not success or returncode != 0:
+            return (False, output, stderr or f"返回码: {returncode}")
+        return (True, output, "")
+
+    @staticmethod
+    def remote_stat(remote_path: str, target: Dict[str, str], timeout: int = 30) -> Tuple[bool, int, int, bool, str]:
+        """
+        获取执行机上文件的大小、inode，并探测是否可用 gzip 压缩传输
+        :return: (是否成功, 大小, inode, 是否支持gzip, 错误信息)
+        """
+        quoted = shlex.quote(remote_path)
+        success, output, err = RemoteFileFetcher._run(
+            f"stat -c '%s %i' {quoted} && (command -v gzip >/dev/null 2>&1 && echo gzip || echo plain)", target, timeout)
+        fields = output.split()
+        if not success or len(fields) != 3 or not fields[0].isdigit():
+            return (False, 0, 0, False, f"获取远程文件 {remote_path} 信息失败: {err or output}")
+        return (True, int(fields[0]), int(fields[1]), fields[2] == "gzip", "")
+
+    @staticmethod
+    def _range_command(remote_path: str, offset: int, length: int) -> str:
+        """输出文件 [offset, offset+length) 字节范围的命令（tail -c 对普通文件直接定位，不逐字节读取前面的内容）"""
+        return f"tail -c +{offset + 1} {shlex.quote(remote_path)} | head -c {length}"
+
+    @staticmethod
+    def fetch(remote_path: str, local_path: str, remote_os: str, remote_ip: str, remote_user: str,
+        remote_passwd: str, remote_hdc_port: str, start_offset: int = 0, baseline_entry: Optional[Dict[str, Any]] = None,
+        chunk_size: int = None, timeout: int = 120, end_offset: Optional[int] = None) -> Tuple[bool, str]:
+        """
+        取回执行机上文件从 start_offset 到当前末尾（或 end_offset）的内容，写入本地 local_path
+        :param start_offset: 起始字节偏移
+        :param baseline_entry: utils.log_baseline.LogBaseline 记录的 {"size", "inode"}；inode未变且未被截断时从基线偏移处开始取回，覆盖 start_offset
+        :param chunk_size: 分块大小（字节），默认 CHUNK_SIZE
+        :param timeout: 单个分块的超时时间（秒）
+        :param end_offset: 结束字节偏移（不含），None 表示取到文件当前末尾
+        :return: (是否成功, 错误信息)
+        """
+        chunk_size = chunk_size or RemoteFileFetcher.CHUNK_SIZE
+        target = {"remote_os": remote_os, "remote_ip": remote_ip, "remote_user": remote_user,
+                  "remote_passwd": remote_passwd, "remote_hdc_port": remote_hdc_port}
+
+        if remote_ip == "127.0.0.1":
+            return RemoteFileFetcher._copy_local(remote_path, local_path, start_offset, baseline_entry, end_offset)
+
+        success, size, inode, use_gzip, err = RemoteFileFetcher.remote_stat(remote_path, target)
+        if not success:
+            return (False, err)
+        if end_offset is not None:
+            size = min(size, end_offset)
+        if baseline_entry:
+            start_offset = int(baseline_entry["size"]) if int(baseline_entry["inode"]) == inode and size >= int(baseline_entry["size"]) else 0
+        start_offset = min(start_offset, size)
+
+        # 同一远程文件、同一inode、同一起点的未完成取回，从断点续传
+        part_file = local_path + ".part"
+        state_file = RemoteFileFetcher._state_file(local_path)
+        state = {"remote_ip": remote_ip, "remote_path": remote_path, "inode": inode, "start_offset": start_offset,
+                 "end_offset": size, "done": 0}
+        if os.path.exists(state_file) and os.path.exists(part_file):
+            try:
+                with open(state_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                if all(saved.get(k) == state[k] for k in ("remote_ip", "remote_path", "inode", "start_offset")) \
+                        and saved.get("done", 0) <= size - start_offset:
+                    state["done"] = saved["done"]
+                    print(f"从断点续传远程文件 {remote_path}，已取回 {state['done']} 字节")
+            except (OSError, ValueError):
+                pass
+
+        os.makedirs(os.path.dirname(os.path.abspath(local_path)), exist_ok=True)
+        with open(part_file, "ab") as part:
+            part.truncate(state["done"])
+        total = size - start_offset
+        encode_cmd = "gzip -c | base64" if use_gzip else "base64"
+        while state["done"] < total:
+            length = min(chunk_size, total - state["done"])
+            core_cmd = f"{RemoteFileFetcher._range_command(remote_path, start_offset + state['done'], length)} | {encode_cmd}"
+            data, err = None, ""
+            for _ in range(RemoteFileFetcher.CHUNK_RETRIES):
+                success, output, err = RemoteFileFetcher._run(core_cmd, target, timeout)
+                if not success:
+                    continue
+                try:
+                    data = base64.b64decode("".join(output.split()))
+                    data = gzip.decompress(data) if use_gzip else data
+                except (ValueError, OSError) as e:
+                    err, data = f"分块解码失败: {str(e)}", None
+                    continue
+                if len(data) == length:
+                    break
+                err, data = f"分块长度不符（期望{length}字节，实际{len(data)}字节）", None
+            if data is None:
+                return (False, f"取回远程文件 {remote_path} 的第 {start_offset + state['done']} 字节起的分块失败，可重新执行续传: {err}")
+            with open(part_file, "ab") as part:
+                part.write(data)
+            state["done"] += len(data)
+            state["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with open(state_file, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+
+        # 校验执行机侧与本地内容的md5
+        success, output, err = RemoteFileFetcher._run(
+            f"{RemoteFileFetcher._range_command(remote_path, start_offset, total)} | md5sum", target, timeout)
+        remote_md5 = output.split()[0] if success and output.split() else ""
+        local_md5 = RemoteFileFetcher._file_md5(part_file)
+        if remote_md5 != local_md5:
+            os.remove(part_file)
+            if os.path.exists(state_file):
+                os.remove(state_file)
+            return (False, f"远程文件 {remote_path} 取回后校验失败（远程md5: {remote_md5 or err}，本地md5: {local_md5}）")
+        os.replace(part_file, local_path)
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        return (True, "")
+
+    @staticmethod
+    def _file_md5(path: str) -> str:
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(block)
+        return md5.hexdigest()
+
+    @staticmethod
+    def _copy_local(path: str, local_path: str, start_offset: int, baseline_entry: Optional[Dict[str, Any]],
+        end_offset: Optional[int] = None) -> Tuple[bool, str]:
+        """本地执行时直接按字节范围复制"""
+        try:
+            st = os.stat(path)
+            if baseline_entry:
+                start_offset = int(baseline_entry["size"]) if int(baseline_entry["inode"]) == st.st_ino and st.st_size >= int(baseline_entry["size"]) else 0
+            end = st.st_size if end_offset is None else min(st.st_size, end_offset)
+            start_offset = min(start_offset, end)
+            with open(path, "rb") as src, open(local_path, "wb") as dst:
+                src.seek(start_offset)
+                remaining = end - start_offset
+                while remaining > 0:
+                    block = src.read(min(remaining, 1024 * 1024))
+                    if not block:
+                        break
+                    dst.write(block)
+                    remaining -= len(block)
+            return (True, "")
+        except OSError as e:
+            return (False, f"读取日志文件 {path} 失败: {str(e)}")
@@ -0,0 +1,135 @@
+"""
+会话级远程日志缓存
+全流程用例（batch2）检查的都是同一次 full_process_start.sh 运行产生的日志，各步骤不再分别到执行机上读取同一个 expected_log：
+每个 (执行机, 日志路径) 在会话内只整份取回一次（基线之后的内容，含轮转文件）存到本地，
+之后的关键词检查和截图取证都使用本地副本；日志在执行机上只是继续追加时只取回新增部分，发生轮转或被重建时重新取回。
+"""
+import os
+import re
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from utils.command_executor import CommandExecutor
+from utils.log_rotation import LogRotation
+from utils.remote_fetch import RemoteFileFetcher
+
+
+class RemoteLogCache:
+    """按 (执行机, 日志路径) 缓存远程被测系统日志的本地副本，以轮转集合中各文件的 大小/修改时间/inode 判断是否失效"""
+
+    _entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _local_path(cache_dir: str, remote_ip: str, expected_log: str) -> str:
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", expected_log.strip("/"))
+        return os.path.join(cache_dir, f"{remote_ip}_{safe_name}")
+
+    @staticmethod
+    def _signature(members: List[Dict[str, Any]], files: List[Dict[str, Any]]) -> List[Tuple]:
+        stats = {f["path"]: f for f in files}
+        return [(m["path"], m["skip"], stats[m["path"]]["size"], stats[m["path"]]["mtime"], stats[m["path"]]["inode"])
+                for m in members if m["path"] in stats]
+
+    @classmethod
+    def local_copy(cls, expected_log: str, remote_os: str, remote_ip: str, remote_user: str, remote_passwd: str,
+        remote_hdc_port: str, baseline_record: Optional[Dict[str, Any]], cache_dir: str = "logs/remote_cache",
+        timeout: int = 60) -> Tuple[bool, str, str]:
+        """
+        返回远程日志（基线之后的内容）的本地副本路径，缓存有效时直接复用
+        每次调用只在执行机上做一次轮转集合的stat，日志未变化时不传输任何日志内容
+        :return: (是否成功, 本地副本路径, 错误信息)
+        """
+        success, stat_output, stderr, returncode = CommandExecutor.run_remote_command(
+            LogRotation.build_stat_command(expected_log), remote_os, remote_ip, remote_user, remote_passwd,
+            remote_hdc_port, timeout=timeout)
+        if not success or returncode != 0:
+            return (False, "", f"获取远程日志 {expected_log} 的轮转集合失败（返回码: {returncode}）: {stderr}")
+        files = LogRotation.parse_stat_output(expected_log, stat_output)
+        members = LogRotation.plan(expected_log, files, baseline_record)
+        signature = cls._signature(members, files)
+        local_path = cls._local_path(cache_dir, remote_ip, expected_log)
+        key = (remote_ip, expected_log)
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+        if entry and entry["signature"] == signature and os.path.exists(local_path):
+            print(f"远程日志 {expected_log} 未变化，使用本地缓存: {local_path}")
+            return (True, local_path, "")
+
+        os.makedirs(cache_dir, exist_ok=True)
+        target = (remote_os, remote_ip, remote_user, remote_passwd, remote_hdc_port)
+        if entry and os.path.exists(local_path) and cls._only_appended(entry["signature"], signature):
+            # 只有当前日志在原文件上继续追加：只取回新增部分并追加到本地副本
+            last_path, _, last_size, _, _ = entry["signature"][-1]
+            success, err = cls._append_member(local_path, {"path": last_path, "compressed": False, "skip": last_size},
+                signature[-1][2], target)
+            if success:
+                print(f"远程日志 {expected_log} 有新增内容，已追加到本地缓存: {local_path}")
+            else:
+                print(f"增量取回远程日志 {expected_log} 失败，重新整份取回: {err}")
+        else:
+            success = False
+
+        if not success:
+            # 按扫描计划逐个文件取回（只取到本次stat时的大小，之后的新增内容下次作为增量取回）
+            open(local_path, "wb").close()
+            stats = {f["path"]: f for f in files}
+            for idx, member in enumerate(members):
+                if idx > 0:
+                    cls._ensure_line_break(local_path)  # 避免上一个文件的最后一行与下一个文件的第一行拼接
+                success, err = cls._append_member(local_path, member, stats[member["path"]]["size"], target)
+                if not success:
+                    os.remove(local_path)
+                    return (False, "", err)
+            print(f"已取回远程日志 {expected_log} 到本地缓存: {local_path}")
+
+        with cls._lock:
+            cls._entries[key] = {"signature": signature, "local_path": local_path}
+        return (True, local_path, "")
+
+    @staticmethod
+    def _append_member(local_path: str, member: Dict[str, Any], end_offset: int, target: Tuple) -> Tuple[bool, str]:
+        """取回扫描计划中的一个文件追加到本地副本：普通文件取 [skip, end_offset)，.gz 整份取回后流式解压并跳过 skip 字节"""
+        part_path = local_path + ".member"
+        if member["compressed"]:
+            success, err = RemoteFileFetcher.fetch(member["path"], part_path, *target)
+        else:
+            success, err = RemoteFileFetcher.fetch(member["path"], part_path, *target,
+                start_offset=member["skip"], end_offset=end_offset)
+        if not success:
+            return (False, err)
+        local_member = {"path": part_path, "compressed": member["compressed"], "skip": member["skip"] if member["compressed"] else 0}
+        try:
+            with LogRotation.open_member(local_member) as src, open(local_path, "ab") as dst:
+                for block in iter(lambda: src.read(1024 * 1024), b""):
+                    dst.write(block)
+        except (OSError, EOFError) as e:
+            return (False, f"解压远程日志 {member['path']} 失败: {str(e)}")
+        finally:
+            os.remove(part_path)
+        return (True, "")
+
+    @staticmethod
+    def _ensure_line_break(local_path: str):
+        size = os.path.getsize(local_path)
+        if size == 0:
+            return
+        with open(local_path, "rb+") as f:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    @staticmethod
+    def _only_appended(old: List[Tuple], new: List[Tuple]) -> bool:
+        """新旧签名只有最后一个文件（当前日志）在同一inode上变大"""
+        if not old or len(old) != len(new) or old[:-1] != new[:-1]:
+            return False
+        old_path, old_skip, old_size, _, old_inode = old[-1]
+        new_path, new_skip, new_size, _, new_inode = new[-1]
+        return (old_path == new_path and old_skip == new_skip and old_inode == new_inode and new_size > old_size
+                and not old_path.endswith(".gz"))
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
@@ -0,0 +1,72 @@
+"""
+后台Word报告回填
+run_fill_result 节点不再等待Word文档的回填和保存：用例结果放入有界队列后立即返回，
+由单个后台线程按提交顺序依次回填（WordReportFiller.fill_case_results）。队列满时提交方阻塞等待，避免结果无限堆积；
+会话结束时先等待队列中的结果全部回填完成，回填失败的用例在 pytest 结果摘要中列出。
+"""
+import copy
+import queue
+import threading
+import traceback
+from typing import Dict, List, Any, Optional, Tuple
+from utils.word_report_filler import WordReportFiller
+
+
+class ReportWriter:
+    """单线程、有界队列的Word报告回填器"""
+
+    _active: Optional["ReportWriter"] = None
+    _active_lock = threading.Lock()
+    errors: List[Tuple[str, str]] = []  # 本次会话中回填失败的 (用例标识, 错误信息)，供 pytest 结果摘要输出
+
+    def __init__(self, queue_size: int = 16):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def start(cls, queue_size: int = 16) -> "ReportWriter":
+        """启动后台回填线程并设为当前会话的回填器"""
+        writer = cls(queue_size)
+        with cls._active_lock:
+            cls._active = writer
+            cls.errors = []
+        return writer
+
+    @classmethod
+    def active(cls) -> Optional["ReportWriter"]:
+        with cls._active_lock:
+            return cls._active
+
+    def submit(self, word_file: str, step_num: int, case_result: Dict[str, Any]):
+        """提交一个用例的回填任务；结果做深拷贝，之后对 state 的修改不影响回填内容"""
+        self._queue.put((word_file, step_num, copy.deepcopy(case_result)))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                word_file, step_num, case_result = task
+                try:
+                    WordReportFiller.fill_case_results(word_file=word_file, step_num=step_num, case_result=case_result)
+                except Exception as e:
+                    print(f"后台回填用例 {case_result['case_id']} 的结果失败: {str(e)}\n{traceback.format_exc()}")
+                    ReportWriter.errors.append((case_result["case_id"], str(e)))
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """等待已提交的回填任务全部完成"""
+        self._queue.join()
+
+    @classmethod
+    def close_active(cls) -> List[Tuple[str, str]]:
+        """会话结束：回填完队列中剩余的结果并停止后台线程，返回回填失败的用例"""
+        with cls._active_lock:
+            writer, cls._active = cls._active, None
+        if writer is not None:
+            writer._queue.put(None)
+            writer._thread.join()
+        return list(cls.errors)
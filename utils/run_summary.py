@@ -0,0 +1,196 @@
+"""
+运行结果摘要（JUnit XML + 静态HTML）
+用例执行过程中按检查点更新 reports/junit.xml 和 reports/summary.html（每记录 checkpoint_cases 个用例或距上次写入超过
+checkpoint_seconds 秒时重写一次，会话结束时总会重写），用例很多时不会每个用例都重写一遍全部结果：包含各用例及各步骤的判定结果、耗时，
+以及步骤日志、截图在磁盘上的相对路径链接（不内嵌日志和图片）。会话结束时报告即已就绪，
+Jenkins 可直接用 junit 步骤展示，无需等待 allure 命令行或 pytest-html 生成自包含报告。
+"""
+import html
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+
+class RunSummary:
+    """会话内累计用例结果，按检查点重写 JUnit XML 和 HTML 摘要"""
+
+    _active: Optional["RunSummary"] = None
+    _active_lock = threading.Lock()
+
+    def __init__(self, junit_file: str, html_file: str, checkpoint_cases: int = 20, checkpoint_seconds: float = 30):
+        self.junit_file = junit_file
+        self.html_file = html_file
+        self.checkpoint_cases = max(1, checkpoint_cases)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.started_at = datetime.now()
+        self.cases: List[Dict[str, Any]] = []
+        self.pending_cases = 0
+        self.last_written_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, junit_file: str, html_file: str, checkpoint_cases: int = 20, checkpoint_seconds: float = 30) -> "RunSummary":
+        summary = cls(junit_file, html_file, checkpoint_cases, checkpoint_seconds)
+        with cls._active_lock:
+            cls._active = summary
+        summary._write()
+        return summary
+
+    @classmethod
+    def active(cls) -> Optional["RunSummary"]:
+        with cls._active_lock:
+            return cls._active
+
+    def record_case(self, test_case: Dict[str, Any], case_result: Dict[str, Any], errors: List[str], duration: float):
+        """
+        记录一个用例的执行结果，到达检查点时更新报告
+        :param test_case: 用例配置（含 case_id、case_name、module、_source_path、_batch）
+        :param case_result: 工作流最终状态中的 case_result（含 steps、overall_result）
+        """
+        steps = []
+        for step in case_result.get("steps", []):
+            screenshots = step.get("screenshot_path") or []
+            steps.append({
+                "step_idx": step.get("step_idx"),
+                "command": step.get("command", ""),
+                "step_result": step.get("step_result") or "未判定",
+                "duration": step.get("duration"),
+                "log_file": step.get("log_file", ""),
+                "screenshots": screenshots if isinstance(screenshots, list) else [screenshots],
+            })
+        case = {
+            "case_id": test_case.get("case_id", ""),
+            "case_name": test_case.get("case_name", ""),
+            "module": test_case.get("module", "未知特性模块"),
+            "case_type": "全流程测试" if test_case.get("_batch") == 2 else "单元测试",
+            "source_path": test_case.get("_source_path", ""),
+            "overall_result": case_result.get("overall_result", "未知"),
+            "errors": list(errors),
+            "duration": duration,
+            "steps": steps,
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            self.cases.append(case)
+            self.pending_cases += 1
+            if (self.pending_cases >= self.checkpoint_cases
+                    or time.monotonic() - self.last_written_at >= self.checkpoint_seconds):
+                self._write()
+
+    def checkpoint(self):
+        """立即写入尚未落盘的用例结果"""
+        with self._lock:
+            if self.pending_cases:
+                self._write()
+
+    def _write(self):
+        self.pending_cases = 0
+        self.last_written_at = time.monotonic()
+        for path, content in ((self.junit_file, self._junit_xml()), (self.html_file, self._html())):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_file = f"{path}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(content)
+            os.replace(tmp_file, path)
+
+    @staticmethod
+    def _passed(case: Dict[str, Any]) -> bool:
+        return case["overall_result"] == "通过"
+
+    def _junit_xml(self) -> bytes:
+        root = ET.Element("testsuites", name="TE-Agent")
+        suites: Dict[str, ET.Element] = {}
+        suite_stats: Dict[str, Dict[str, Any]] = {}
+        totals = {"tests": 0, "failures": 0, "time": 0.0}
+        for case in self.cases:
+            suite_name = f"{case['case_type']}.{case['module']}"
+            if suite_name not in suites:
+                suites[suite_name] = ET.SubElement(root, "testsuite", name=suite_name,
+                    timestamp=self.started_at.strftime("%Y-%m-%dT%H:%M:%S"))
+                suite_stats[suite_name] = {"tests": 0, "failures": 0, "time": 0.0}
+            suite = suites[suite_name]
+            testcase = ET.SubElement(suite, "testcase", classname=suite_name,
+                name=f"{case['case_id']} {case['case_name']}", time=f"{case['duration']:.3f}", file=case["source_path"])
+            if not self._passed(case):
+                failure = ET.SubElement(testcase, "failure", message=case["overall_result"])
+                failure.text = "\n".join(case["errors"])
+            lines = []
+            for step in case["steps"]:
+                duration = f"{step['duration']:.3f}s" if step["duration"] is not None else "-"
+                lines.append(f"步骤{step['step_idx']} [{step['step_result']}] ({duration}) {step['command']}")
+                lines.append(f"  日志: {step['log_file']}")
+                lines.extend(f"  截图: {path}" for path in step["screenshots"])
+            ET.SubElement(testcase, "system-out").text = "\n".join(lines)
+            for stats in (suite_stats[suite_name], totals):
+                stats["tests"] += 1
+                stats["failures"] += 0 if self._passed(case) else 1
+                stats["time"] += case["duration"]
+        for suite_name, suite in suites.items():
+            stats = suite_stats[suite_name]
+            suite.set("tests", str(stats["tests"]))
+            suite.set("failures", str(stats["failures"]))
+            suite.set("errors", "0")
+            suite.set("time", f"{stats['time']:.3f}")
+        root.set("tests", str(totals["tests"]))
+        root.set("failures", str(totals["failures"]))
+        root.set("errors", "0")
+        root.set("time", f"{totals['time']:.3f}")
+        return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+    def _link(self, path: str, text: str) -> str:
+        """生成相对于HTML摘要所在目录的链接，路径不存在时只显示文本"""
+        if not path:
+            return "-"
+        target = os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(self.html_file)))
+        label = html.escape(text)
+        return f'<a href="{html.escape(target)}">{label}</a>' if os.path.exists(path) else f"{label}（不存在）"
+
+    def _html(self) -> bytes:
+        passed = sum(1 for case in self.cases if self._passed(case))
+        total_time = sum(case["duration"] for case in self.cases)
+        rows = []
+        for case in self.cases:
+            status = "pass" if self._passed(case) else "fail"
+            rows.append(
+                f'<tr class="{status}"><td>{html.escape(case["case_id"])}</td><td>{html.escape(case["case_name"])}</td>'
+                f'<td>{html.escape(case["case_type"])} / {html.escape(case["module"])}</td>'
+                f'<td>{html.escape(case["overall_result"])}</td><td>{case["duration"]:.1f}s</td>'
+                f'<td>{html.escape(case["finished_at"])}</td></tr>'
+            )
+            for step in case["steps"]:
+                duration = f"{step['duration']:.1f}s" if step["duration"] is not None else "-"
+                screenshots = " ".join(self._link(path, os.path.basename(path)) for path in step["screenshots"]) or "-"
+                rows.append(
+                    f'<tr class="step"><td></td><td>步骤{step["step_idx"]}: {html.escape(str(step["command"]))}</td>'
+                    f'<td>{self._link(step["log_file"], os.path.basename(step["log_file"]))}</td>'
+                    f'<td>{html.escape(step["step_result"])}</td><td>{duration}</td><td>{screenshots}</td></tr>'
+                )
+            if case["errors"]:
+                rows.append(f'<tr class="step"><td></td><td colspan="5"><pre>{html.escape(chr(10).join(case["errors"]))}</pre></td></tr>')
+        page = f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>TE-Agent 执行摘要</title>
+<style>
+body{{font-family:sans-serif;margin:20px}} table{{border-collapse:collapse;width:100%}}
+td,th{{border:1px solid #ccc;padding:4px 8px;font-size:13px;text-align:left;vertical-align:top}}
+tr.pass td{{background:#e8f5e9}} tr.fail td{{background:#ffebee}} tr.step td{{background:#fafafa;color:#555}}
+pre{{margin:0;white-space:pre-wrap}}
+</style></head><body>
+<h2>TE-Agent 执行摘要</h2>
+<p>开始时间: {self.started_at.strftime("%Y-%m-%d %H:%M:%S")}　更新时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
+<p>用例总数: {len(self.cases)}　通过: {passed}　不通过: {len(self.cases) - passed}　累计耗时: {total_time:.1f}s</p>
+<table><tr><th>用例标识</th><th>用例名称 / 步骤</th><th>类型 / 模块 / 日志</th><th>结果</th><th>耗时</th><th>完成时间 / 截图</th></tr>
+{chr(10).join(rows)}
+</table></body></html>
+"""
+        return page.encode("utf-8")
+
+    @classmethod
+    def close_active(cls):
+        with cls._active_lock:
+            summary, cls._active = cls._active, None
+        if summary is not None:
+            summary.checkpoint()  # 写入最后一个检查点之后的用例结果
+            print(f"执行摘要已生成: {summary.junit_file}、{summary.html_file}")
@@ -6,6 +6,8 @@ from pathlib import Path
 from typing import Tuple, List
 import math
 from utils.command_executor import CommandExecutor
+from utils.log_sanitizer import LogSanitizer
+from utils.execution_target import ExecutionTarget
 import re
 import pdb
 
@@ -340,8 +342,7 @@ class ScreenshotHandler:
     def find_target_line_in_output(log_file, target_text):
         """在日志中查找目标文本，返回【倒数行号】、正序行号、目标行内容（行号均从1开始）"""
         try:
-            with open(log_file, 'r', errors='ignore') as f:
-                lines = f.readlines()  # 读取所有行，按顺序存储
+            lines = LogSanitizer.read_lines(log_file)  # 同一文件多次查找时复用已读取的行
             
             total_lines = len(lines)  # 计算文件总行数
             if total_lines == 0:
@@ -428,26 +429,8 @@ class ScreenshotHandler:
             
     @staticmethod
     def delete_control_and_ansi(file_path, output_path):
-        # 读取文件（保留原始换行符，用 'r' 模式，避免自动转换）
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        # 1. 匹配并删除 ANSI 转义序列
-        ansi_pattern = r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])'
-        content = re.sub(ansi_pattern, '', content)
-        
-        # 2. 删除 ASCII 控制符（保留 \n（0x0A）和 \t（0x09））。匹配范围：ASCII 0-8（\x00-\x08）、10-31（\x0A 是 \n，排除后从 \x0B 开始）、127（DEL 符）
-        control_pattern = r'[\x00-\x08\x0B-\x1F\x7F]'
-        content = re.sub(control_pattern, '', content)
-
-        content = re.sub(r'\x07', '', content)  # 明确删除响铃符 ^G（0x07）
-        
-        # 写入新文件（用 'w' 模式，保留 \n 作为换行符）
-        with open(output_path, "w", encoding="utf-8", newline="\n") as f:
-            f.write(content)
-        
-        #print(f"处理完成！输出文件：{output_path}")
-        #print("✅ 已保留换行符 \\n 和制表符 \\t，特殊字符已删除")
+        """删除日志中的 ANSI 转义序列和控制字符（保留 \\n 和 \\t），结果写入 output_path"""
+        LogSanitizer.sanitize_file(file_path, output_path)
 
     @staticmethod
     def capture_step_screenshot_terminal(screenshot_name: str, 
@@ -487,13 +470,12 @@ class ScreenshotHandler:
             else:
                 print("expected_keywords为空时截图失败")
         else:
-            # 截图前，备份终端日志，后清理日志文件中的ANSI转义序列和控制字符。非阻塞式进程在截图期间还在输出日志的话会截到最底部的一些光标移动的特殊字符，即乱码
-            os.system(f"cp {log_file} {log_file}.origin")
-            ScreenshotHandler.delete_control_and_ansi(log_file+".origin",log_file)  
-            
+            # 截图前，将终端日志中的ANSI转义序列和控制字符清洗到 .clean 文件，原始日志保持不变。非阻塞式进程在截图期间还在输出日志的话会截到最底部的一些光标移动的特殊字符，即乱码
+            clean_log_file = LogSanitizer.clean_view(log_file)
+
             # 8. 定位目标文本所在行
             for keyword in expected_keywords:
-                target_reverse_line, target_line, target_content = ScreenshotHandler.find_target_line_in_output(log_file, keyword)
+                target_reverse_line, target_line, target_content = ScreenshotHandler.find_target_line_in_output(clean_log_file, keyword)
                 if not target_line:
                     #print(f"未在终端输出中找到目标文本：'{keyword}'")
                     continue
@@ -542,15 +524,18 @@ class ScreenshotHandler:
         return screenshot_paths
 
     @staticmethod
-    def capture_step_screenshot_logfile(screenshot_name: str, terminal_name:str, 
-        remote_os: str,remote_ip: str, remote_user:str, remote_passwd:str,remote_hdc_port: str,
-        log_file:str, cat_output_file:str, expected_keywords:List[str], screenshot_dir: str = "reports/screenshots") -> Tuple[bool, List[str]]:
+    def capture_step_screenshot_logfile(screenshot_name: str, terminal_name:str, target: ExecutionTarget,
+        log_file:str, expected_keywords:List[str], screenshot_dir: str = "reports/screenshots", start_offset: int = 0) -> Tuple[bool, List[str]]:
         """
         捕获当前步骤的截图（适配WSL环境）
         :param screenshot_name: 测试结果截图名字的前缀（如XXX_TEST_001_screenshot_step_1）
+        :param target: 被测系统日志所在的执行机（utils.execution_target.ExecutionTarget）
         :param screenshot_dir: 截图保存目录
+        :param start_offset: 被测系统日志的基线偏移，大于0时只对基线之后写入的内容grep
         :return: 截图文件的绝对路径
         """
+        remote_os, remote_ip, remote_user = target.remote_os, target.remote_ip, target.remote_user
+        remote_passwd, remote_hdc_port = target.remote_passwd, target.remote_hdc_port
         print("="*10+f"准备截图"+"="*10)
         # 1. 创建输出目录
         Path(screenshot_dir).mkdir(parents=True, exist_ok=True)
@@ -577,8 +562,11 @@ class ScreenshotHandler:
         else:
             terminal_name_logfile = f"view_logfile"
             for keyword in expected_keywords:
-                # 4. 拉起xterm终端，用于cat该步骤待检查的日志文件后grep预期输出结果，然后截图
-                core_cmd = f"cat {log_file} | grep -C 3 -F -- '{keyword}'"
+                # 4. 拉起xterm终端，用于在该步骤待检查的日志文件中grep预期输出结果，然后截图；判定用的日志内容已由 CommandExecutor.fetch_expected_logfile 单独取回
+                if start_offset > 0:
+                    core_cmd = f"tail -c +{start_offset + 1} {log_file} | grep -C 3 -F -- '{keyword}'"
+                else:
+                    core_cmd = f"grep -C 3 -F -- '{keyword}' {log_file}"
                 if remote_ip == "127.0.0.1":
                     terminal_commands = (# ./main nok，没起来； ./unit_test ok, 所有命令都重定向到日志文件
                         'export TERM=xterm-256color; '  # 关键：强制终端类型为xterm，解析功能键
@@ -604,11 +592,11 @@ class ScreenshotHandler:
                             '   \\"Permission denied\\" { exit 1; } \n'
                             '   -re {[#$]\\s*} { send \\" ' + escaped_exec_cmd + ' 2>&1 | tee -a -;\\r\\"; interact; } \n'
                             '}; '
-                            'interact" 2>&1 | tee -a ' + cat_output_file + '; '
+                            'interact"; '
                             'bash --rcfile ~/.bashrc_no_title --noprofile'
                         )
                     else:
-                        print("ScreenshotHandler.capture_step_screenshot_logfile: 待验证远程鸿蒙系统下，对被测系统日志截图的逻辑,cat结果需重定向到cat_output_file")
+                        print("ScreenshotHandler.capture_step_screenshot_logfile: 待验证远程鸿蒙系统下，对被测系统日志截图的逻辑")
                         terminal_commands = (
                             'export TERM=xterm-256color; '
                             'stty cooked; '
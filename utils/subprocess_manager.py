@@ -6,6 +6,7 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
 import tempfile
 import pdb
+from utils.execution_target import ExecutionTarget
 
 class SubprocessManager:
     def __init__(self):
@@ -43,13 +44,11 @@ class SubprocessManager:
         terminal_line_num: int, 
         blocked_process:int,
         cwd: str,
-        remote_os: str,
-        remote_ip: str,
-        remote_user: str,
-        remote_passwd: str,
-        remote_hdc_port:str
+        target: ExecutionTarget
         ) -> List[str]:
         """根据操作系统生成启动终端的命令（含输出重定向）"""
+        remote_os, remote_ip, remote_user = target.remote_os, target.remote_ip, target.remote_user
+        remote_passwd, remote_hdc_port = target.remote_passwd, target.remote_hdc_port
         # 构造可执行程序的命令（输出重定向到文件，同时终端显示）;不同终端的命令格式差异较大，需要针对性处理
         if sys.platform.startswith("win32"):
             # Windows：使用 cmd 终端，/k 表示执行后不关闭终端,输出同时写入文件和终端
@@ -163,8 +162,7 @@ class SubprocessManager:
         else:
             raise NotImplementedError(f"不支持的操作系统：{sys.platform}")
 
-    def start_subprocess_pre_post(self, exec_cmd: str, terminal_name: str, remote_os: str,
-        remote_ip: str, remote_user: str, remote_passwd: str, remote_hdc_port:str,
+    def start_subprocess_pre_post(self, exec_cmd: str, terminal_name: str, target: ExecutionTarget,
         blocked_process:int = 0, # 在xterm终端中执行的程序是否是持续运行不退出，即阻塞式进程
         log_path: str = "logs",  # 测试步骤日志的输出目录
         log_file: str = "output_step.log",  # 测试步骤日志的文件名
@@ -173,8 +171,11 @@ class SubprocessManager:
         sleep_time: int = 1 # 运行后立马退出的程序，留出时间给它执行
         ) -> Tuple[bool, str, str, int]:
         """启动一个子流程，在独立终端运行可执行程序，并捕获输出
+        :param target: 执行机描述（utils.execution_target.ExecutionTarget）
         :return: 子进程的Popen实例
         """
+        remote_os, remote_ip, remote_user = target.remote_os, target.remote_ip, target.remote_user
+        remote_passwd, remote_hdc_port = target.remote_passwd, target.remote_hdc_port
 
         try:
             output_file = self.create_log_file(log_path, log_file)
@@ -462,11 +463,7 @@ class SubprocessManager:
     def start_subprocess(self, 
         exec_cmd: str,  #执行命令（如 ./main 或 main.exe）
         terminal_name: str,  # 拉起的xterm终端的名字
-        remote_os: str,
-        remote_ip: str,
-        remote_user: str,
-        remote_passwd: str,
-        remote_hdc_port:str,
+        target: ExecutionTarget,  # 执行机描述
         blocked_process:int = 0, # 在xterm终端中执行的程序是否是持续运行不退出，即阻塞式进程
         cwd: Optional[str] = "",  # 子进程工作目录
         log_path: str = "logs",  # 测试步骤日志的输出目录
@@ -482,7 +479,7 @@ class SubprocessManager:
         try:
             # 步骤1：验证待执行指令的目录是否存在; 远程执行用例的场景，不用验证，因为如下语句是在本地验证该目录是否存在；本地场景，要排除cwd为""的全流程用例的情况
             #print(f"测试步骤中，指令执行的路径：{cwd}")
-            if len(cwd)>0 and not os.path.isdir(cwd) and remote_ip == "127.0.0.1":
+            if len(cwd)>0 and not os.path.isdir(cwd) and target.is_local:
                 raise FileNotFoundError(f"用例本地执行的场景下，要切换后用于执行指令的目录不存在：{cwd}")
 
             output_abs_path = self.create_log_file(log_path, log_file)
@@ -495,14 +492,10 @@ class SubprocessManager:
                 terminal_line_num, 
                 blocked_process,
                 cwd,
-                remote_os,
-                remote_ip,
-                remote_user,
-                remote_passwd,
-                remote_hdc_port
+                target
                 )
 
-            if remote_ip == "127.0.0.1" and len(cwd)>0:
+            if target.is_local and len(cwd)>0:
                 proc = subprocess.Popen(# 非阻塞启动xterm终端，执行用例指令；如果全流程用例的cwd为空，需要单独处理
                     terminal_cmd,
                     cwd=cwd,
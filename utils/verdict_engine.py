@@ -0,0 +1,191 @@
+"""
+流式判定引擎
+在测试步骤执行期间增量读取步骤日志，实时记录每个预期关键词的命中情况和命中时间，
+run_fill_result 直接取用判定结果，不再重新读取整份日志
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+from utils.expectation import compile_expectations
+
+
+class StreamingVerdict:
+    """单个测试步骤的增量匹配器：跟随日志写入逐行匹配预期结果表达式"""
+
+    def __init__(self,
+        step_idx: int,
+        log_file: str,
+        expected_keywords: List[Any],
+        start_offset: int = 0,
+        poll_interval: float = 0.2,
+        on_change: Optional[Callable[["StreamingVerdict"], None]] = None,
+        on_lines: Optional[Callable[["StreamingVerdict", List[str]], None]] = None):
+        """
+        :param step_idx: 步骤序号（从1开始）
+        :param log_file: 待跟随的日志文件（步骤终端日志或本地被测系统日志）
+        :param expected_keywords: 预期结果列表（普通字符串或预期结果表达式）
+        :param start_offset: 从日志的该字节偏移处开始匹配
+        :param poll_interval: 轮询日志增量的间隔（秒）
+        :param on_change: 命中状态变化时的回调，用于实时发布判定结果
+        :param on_lines: 每读到一批完整日志行时的回调，用于写入全文索引
+        """
+        self.step_idx = step_idx
+        self.log_file = log_file
+        self.expected_keywords = list(expected_keywords or [])
+        self._matcher = compile_expectations(self.expected_keywords).matcher()
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self.on_lines = on_lines
+        self.bytes_seen = 0
+        self.finished = False
+
+        self._offset = start_offset
+        self._pending = b""  # 尚未以换行结尾的残留字节，待下次读取补齐
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()  # 保护读取偏移和残留字节：后台线程与 finalize 的最后一次读取互斥
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StreamingVerdict":
+        """启动后台线程跟随日志"""
+        self._thread = threading.Thread(
+            target=self._run, name=f"verdict_step_{self.step_idx}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"步骤{self.step_idx}的流式判定读取日志异常: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    def poll(self) -> bool:
+        """读取日志自上次偏移以来的新增内容并逐行匹配，返回命中状态是否变化"""
+        with self._read_lock:
+            if self.finished:
+                return False
+            return self._read_new_lines()
+
+    def _read_new_lines(self) -> bool:
+        if not os.path.exists(self.log_file):
+            return False
+        size = os.path.getsize(self.log_file)
+        if size < self._offset:
+            # 日志被截断或重建，从头重新跟随
+            self._offset = 0
+            self._pending = b""
+        if size == self._offset:
+            return False
+
+        with open(self.log_file, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        self._offset += len(data)
+        self.bytes_seen += len(data)
+
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        return self._match_lines(lines)
+
+    def _match_lines(self, lines: List[bytes]) -> bool:
+        changed = False
+        decoded = [raw_line.decode("utf-8", errors="ignore") for raw_line in lines]
+        with self._lock:
+            for line in decoded:
+                if self._matcher.feed_line(line):
+                    changed = True
+        if self.on_lines and decoded:
+            try:
+                self.on_lines(self, decoded)
+            except Exception as e:
+                print(f"步骤{self.step_idx}的日志写入索引异常: {str(e)}")
+        if changed and self.on_change:
+            self.on_change(self)
+        return changed
+
+    def stop(self):
+        """停止后台跟随线程"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.poll_interval * 5)
+
+    def finalize(self) -> Dict[str, Any]:
+        """停止跟随，读完剩余内容后返回最终判定结果"""
+        self.stop()
+        with self._read_lock:
+            if self.finished:
+                return self.verdict()
+            # stop() 等待超时后后台线程可能仍在读取，持有读取锁后再读完剩余内容
+            self._read_new_lines()
+            if self._pending:
+                self._match_lines([self._pending])
+                self._pending = b""
+            self.finished = True
+        if self.on_change:
+            self.on_change(self)
+        return self.verdict()
+
+    def verdict(self) -> Dict[str, Any]:
+        """返回当前判定结果，字段与 CommandExecutor.check_keywords 兼容"""
+        with self._lock:
+            result = self._matcher.result()
+        result.update({"bytes_seen": self.bytes_seen, "finished": self.finished})
+        return result
+
+
+class VerdictBoard:
+    """实时判定看板：将各用例各步骤的判定结果写入json文件，供UI和度量实时读取"""
+
+    _instances: Dict[str, "VerdictBoard"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, board_file: str):
+        self.board_file = board_file
+        self._lock = threading.Lock()
+        self._board: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def get(cls, board_file: str) -> "VerdictBoard":
+        """获取进程内共享的看板实例，同一看板文件只维护一份内存状态"""
+        with cls._instances_lock:
+            if board_file not in cls._instances:
+                cls._instances[board_file] = cls(board_file)
+            return cls._instances[board_file]
+
+    def publish(self, case_id: str, verdict: StreamingVerdict):
+        """发布某个步骤的最新判定结果"""
+        result = verdict.verdict()
+        with self._lock:
+            self._board.setdefault(case_id, {})[str(verdict.step_idx)] = {
+                "step_result": "通过" if result["all_matched"] else ("不通过" if result["finished"] else "执行中"),
+                "log_file": verdict.log_file,
+                "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                **result
+            }
+            self._dump()
+
+    def _dump(self):
+        try:
+            os.makedirs(os.path.dirname(self.board_file) or ".", exist_ok=True)
+            tmp_file = f"{self.board_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._board, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.board_file)  # 原子替换，读取方不会读到半个文件
+        except OSError as e:
+            print(f"写入实时判定看板失败: {str(e)}")
+
+    @staticmethod
+    def load(board_file: str) -> Dict[str, Any]:
+        """读取看板文件（UI侧使用）"""
+        if not os.path.exists(board_file):
+            return {}
+        try:
+            with open(board_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
@@ -2,8 +2,10 @@ from docx import Document
 from docx.table import Table
 from docx.shared import Inches
 from docx.text.paragraph import Paragraph
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import os
+import threading
+import time
 from datetime import datetime
 import pdb
 # 兼容不同版本的python-docx库
@@ -170,71 +172,233 @@ class WordReportFiller:
 
     @staticmethod
     def fill_case_results(word_file: str, step_num: int, case_result: Dict[str, Any]) -> bool:
-        """将测试结果填充到Word文档的对应表格中"""
+        """将测试结果填充到Word文档的对应表格中；会话已加载该文档时只在内存中回填，由会话按检查点保存"""
+        session = WordReportSession.active(word_file)
+        if session is not None:
+            return session.fill_case(step_num, case_result)
+
         doc = Document(word_file)
-        
+        WordReportFiller.fill_case_document(doc, step_num, case_result)
+        doc.save(word_file)
+        return True
+
+    @staticmethod
+    def fill_case_document(doc: Document, step_num: int, case_result: Dict[str, Any], index: "WordReportIndex" = None) -> bool:
+        """将测试结果填充到已打开的Word文档对象的对应表格中（不保存）
+        :param index: 文档的用例表格索引，未传入时临时构建
+        """
         try:
-            table = WordReportFiller.find_case_table(doc, case_result["case_id"])
+            index = index or WordReportIndex(doc)
+            entry = index.lookup(case_result["case_id"])
+            table = entry.table
             step_results = case_result["execution_steps"]
             result_len = len(step_results)
-            
-            for row_idx, row in enumerate(table.rows):
-                for col_idx, cell in enumerate(row.cells):
-                    cell_text = "\n".join([para.text for para in cell.paragraphs]).strip()                 
-                    # 处理步骤结果（通过/不通过）
-                    if "□通过" in cell_text and "□不通过" in cell_text and "其它____" in cell_text:
-                        step_idx = int(row.cells[0].text) - 1
-                        if result_len > 0: # run_test_step 中，执行case_result["steps"].append前发生了Exception，结果数比执行步数少，只回填有结果的步骤
-                            if step_num == -1: # 预处理失败
-                                pass
-                            elif step_idx + 1 <= step_num: # 预处理成功，但仅执行了 step_num 个测试步骤，也只回填这些步骤的结果
-                                if step_results[step_idx]["step_result"] == "通过":
-                                    for para in cell.paragraphs:
-                                        para.text = para.text.replace("□通过", "☑通过")
-                                else:
-                                    for para in cell.paragraphs:
-                                        para.text = para.text.replace("□不通过", "☑不通过")
-                                #print(f"步骤{row.cells[0].text}的执行结果，回填入用例表格第{row_idx + 1}行第{col_idx + 1}列")
-
-                                # 回填每个步骤的截图, 在"其它____"后追加
-                                screenshot_paths = step_results[step_idx].get("screenshot_path", [])
-                                if screenshot_paths and isinstance(screenshot_paths, list):
-                                    WordReportFiller.insert_images_after_placeholder(
-                                        cell, 
-                                        screenshot_paths,
-                                        placeholder="其它____",
-                                        max_width=1.0  # 图片最大宽度
-                                    )
-                            else:
-                                pass
-                            result_len -= 1
-                    # 记录总体结果位置
-                    if cell_text == "测试用例执行结果":
-                        overall_row_idx = row_idx
-                        overall_col_idx = col_idx 
-                    # 记录测试时间、测试人员、操作人员位置
-                    elif cell_text == "测试时间":
-                        test_time_row_idx = row_idx
-                        test_time_col_idx = col_idx 
-                    elif cell_text == "测试人员":
-                        test_person_row_idx = row_idx
-                        test_person_col_idx = col_idx 
-                    elif cell_text == "操作人员":
-                        operate_person_row_idx = row_idx
-                        operate_person_col_idx = col_idx
-                    else:
-                        continue
-            
+
+            # 处理步骤结果（通过/不通过）
+            for row_idx, col_idx, step_no in entry.step_cells:
+                cell = table.rows[row_idx].cells[col_idx]
+                step_idx = step_no - 1
+                if result_len > 0: # run_test_step 中，执行case_result["steps"].append前发生了Exception，结果数比执行步数少，只回填有结果的步骤
+                    if step_num == -1: # 预处理失败
+                        pass
+                    elif step_idx + 1 <= step_num: # 预处理成功，但仅执行了 step_num 个测试步骤，也只回填这些步骤的结果
+                        if step_results[step_idx]["step_result"] == "通过":
+                            for para in cell.paragraphs:
+                                para.text = para.text.replace("□通过", "☑通过")
+                        else:
+                            for para in cell.paragraphs:
+                                para.text = para.text.replace("□不通过", "☑不通过")
+
+                        # 回填每个步骤的截图, 在"其它____"后追加
+                        screenshot_paths = step_results[step_idx].get("screenshot_path", [])
+                        if screenshot_paths and isinstance(screenshot_paths, list):
+                            WordReportFiller.insert_images_after_placeholder(
+                                cell, 
+                                screenshot_paths,
+                                placeholder="其它____",
+                                max_width=1.0  # 图片最大宽度
+                            )
+                    result_len -= 1
+
             # 回填总体结果、测试时间、测试人员、操作人员
-            table.rows[overall_row_idx].cells[overall_col_idx + 1].text = case_result["overall_result"]
             test_time = datetime.now()
-            table.rows[test_time_row_idx].cells[test_time_col_idx + 1].text = test_time.strftime("%Y-%m-%d %H:%M:%S")
-            table.rows[test_person_row_idx].cells[test_person_col_idx + 1].text = "auto run"
-            table.rows[operate_person_row_idx].cells[operate_person_col_idx + 1].text = "auto run"
-            
-            doc.save(word_file)
+            for label, value in (
+                ("测试用例执行结果", case_result["overall_result"]),
+                ("测试时间", test_time.strftime("%Y-%m-%d %H:%M:%S")),
+                ("测试人员", "auto run"),
+                ("操作人员", "auto run")
+            ):
+                if label not in entry.value_cells:
+                    raise ValueError(f"用例 {case_result['case_id']} 的表格中未找到“{label}”")
+                row_idx, col_idx = entry.value_cells[label]
+                table.rows[row_idx].cells[col_idx].text = value
             return True
         except Exception as e:
             raise RuntimeError(f"回填Word报告失败: {str(e)}")
             return False
 
+
+class CaseTableEntry:
+    """单个用例表格在文档中的位置，以及需要回填的单元格坐标（row.cells 下标）"""
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.step_cells: List[Tuple[int, int, int]] = []  # (行, 列, 步骤序号)，按行顺序
+        self.value_cells: Dict[str, Tuple[int, int]] = {}  # 标签 -> 其右侧待回填单元格的 (行, 列)
+
+
+class WordReportIndex:
+    """加载文档时一次性建立的 用例标识 -> 用例表格/待回填单元格 索引，回填时直接按坐标定位，不再逐个单元格扫描全文档"""
+
+    VALUE_LABELS = ("测试用例执行结果", "测试时间", "测试人员", "操作人员")
+
+    def __init__(self, doc: Document):
+        self.doc = doc
+        self.entries: Dict[str, CaseTableEntry] = {}
+        self._table_texts: List[Tuple[Table, str]] = []  # 各表格全部单元格文本，用于索引未命中时的子串查找
+        self._entries_by_table: Dict[int, CaseTableEntry] = {}
+        for table in doc.tables:
+            self._index_table(table)
+
+    @staticmethod
+    def _cell_text(cell) -> str:
+        return "\n".join([para.text for para in cell.paragraphs]).strip()
+
+    def _index_table(self, table: Table):
+        entry = CaseTableEntry(table)
+        texts = []
+        for row_idx, row in enumerate(table.rows):
+            cells = row.cells
+            cell_texts = [self._cell_text(cell) for cell in cells]
+            texts.extend(cell_texts)
+            seen = set()
+            for col_idx, cell_text in enumerate(cell_texts):
+                # 合并单元格在 row.cells 中会重复出现，同一单元格只记录一次
+                if ("□通过" in cell_text and "□不通过" in cell_text and "其它____" in cell_text
+                        and cell_texts[0].isdigit() and id(cells[col_idx]._tc) not in seen):
+                    seen.add(id(cells[col_idx]._tc))
+                    entry.step_cells.append((row_idx, col_idx, int(cell_texts[0])))
+                elif cell_text in self.VALUE_LABELS and col_idx + 1 < len(cells):
+                    entry.value_cells[cell_text] = (row_idx, col_idx + 1)  # 与原逻辑一致，取该标签最后一次出现的位置
+                elif cell_text == "标识" and col_idx + 1 < len(cells) and cell_texts[col_idx + 1] not in ("", "标识"):
+                    self.entries.setdefault(cell_texts[col_idx + 1], entry)
+        self._table_texts.append((table, "\n".join(texts)))
+        self._entries_by_table[id(table._tbl)] = entry
+
+    def lookup(self, case_id: str) -> CaseTableEntry:
+        """按用例标识获取表格条目；标识不在“标识”单元格中时，退化为在预先提取的表格文本中查找"""
+        entry = self.entries.get(case_id)
+        if entry is not None:
+            return entry
+        for table, text in self._table_texts:
+            if case_id in text:
+                entry = self._entries_by_table[id(table._tbl)]
+                self.entries[case_id] = entry
+                return entry
+        raise ValueError(f"在文档中未找到用例标识为 {case_id} 的表格")
+
+
+class WordReportSession:
+    """
+    会话级Word报告：会话开始时加载一次结果文档，各用例的结果只回填到内存中的文档对象，
+    每回填 checkpoint_cases 个用例或距上次保存超过 checkpoint_seconds 秒时保存一次，会话结束时再保存一次；
+    异常中断时最多丢失一个检查点间隔内的回填结果
+    mode 为 "fragments" 时，各用例结果写为 fragment_dir 下独立的分片文档（见 utils.word_report_fragments），
+    内存中的文档保持为模板，会话结束时一次性合并全部分片并保存
+    """
+
+    _active: Optional["WordReportSession"] = None
+    _active_lock = threading.Lock()
+
+    def __init__(self, word_file: str, checkpoint_cases: int = 10, checkpoint_seconds: float = 60,
+        mode: str = "memory", fragment_dir: str = "reports/fragments", save_mode: str = "python-docx"):
+        self.word_file = word_file
+        self.mode = mode
+        self.save_mode = save_mode
+        self.fragment_dir = fragment_dir
+        self.checkpoint_cases = max(1, checkpoint_cases)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.doc = Document(word_file)
+        self.index = WordReportIndex(self.doc)  # 加载时一次性建立用例表格索引
+        self.pending_cases = 0
+        self.last_saved_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def start(cls, word_file: str, checkpoint_cases: int = 10, checkpoint_seconds: float = 60,
+        mode: str = "memory", fragment_dir: str = "reports/fragments", save_mode: str = "python-docx") -> "WordReportSession":
+        """加载结果文档并设为当前会话的活动报告"""
+        session = cls(word_file, checkpoint_cases, checkpoint_seconds, mode, fragment_dir, save_mode)
+        if mode == "fragments" and os.path.isdir(fragment_dir):
+            # 清理上一轮会话遗留的分片，避免合并到本轮的结果文档中
+            for name in os.listdir(fragment_dir):
+                os.remove(os.path.join(fragment_dir, name))
+        with cls._active_lock:
+            cls._active = session
+        return session
+
+    @classmethod
+    def active(cls, word_file: str) -> Optional["WordReportSession"]:
+        """返回正在回填该文档的会话，没有时返回 None"""
+        with cls._active_lock:
+            session = cls._active
+        if session is not None and os.path.abspath(session.word_file) == os.path.abspath(word_file):
+            return session
+        return None
+
+    def fill_case(self, step_num: int, case_result: Dict[str, Any]) -> bool:
+        if self.mode == "fragments":
+            from utils.word_report_fragments import WordReportFragments
+            # 模板表格只读，分片各自独立回填和保存，无需持有会话锁
+            WordReportFragments.write_fragment(self.index, self.fragment_dir, step_num, case_result)
+            return True
+        with self._lock:
+            WordReportFiller.fill_case_document(self.doc, step_num, case_result, self.index)
+            self.pending_cases += 1
+            if (self.pending_cases >= self.checkpoint_cases
+                    or time.monotonic() - self.last_saved_at >= self.checkpoint_seconds):
+                self._save()
+        return True
+
+    def checkpoint(self):
+        """立即保存尚未落盘的回填结果"""
+        with self._lock:
+            if self.pending_cases:
+                self._save()
+
+    def _save(self):
+        # 先写临时文件再原子替换，保存过程中异常中断不会损坏上一个检查点
+        saved = False
+        if self.save_mode == "zip_patch":
+            from utils.docx_zip_patcher import DocxZipPatcher
+            try:
+                # 以上一个检查点的文件为基础，只重写正文、追加新截图，其余条目原样复制
+                DocxZipPatcher.save(self.doc, self.word_file, self.word_file)
+                saved = True
+            except Exception as e:
+                print(f"zip级增量保存Word报告失败，改为完整保存: {str(e)}")
+        if not saved:
+            tmp_file = f"{self.word_file}.tmp"
+            self.doc.save(tmp_file)
+            os.replace(tmp_file, self.word_file)
+        print(f"Word报告检查点已保存（本次新增 {self.pending_cases} 个用例）: {self.word_file}")
+        self.pending_cases = 0
+        self.last_saved_at = time.monotonic()
+
+    @classmethod
+    def close_active(cls):
+        """会话结束：保存剩余的回填结果并释放文档"""
+        with cls._active_lock:
+            session, cls._active = cls._active, None
+        if session is None:
+            return
+        if session.mode == "fragments":
+            from utils.word_report_fragments import WordReportFragments
+            with session._lock:
+                merged = WordReportFragments.merge(session.doc, session.index, session.fragment_dir)
+                session.pending_cases = len(merged)
+                if merged:
+                    session._save()
+            return
+        session.checkpoint()
+
@@ -0,0 +1,115 @@
+"""
+Word报告分片
+每个用例的结果不再直接写入同一个 test_report.docx，而是写成一个独立的小文档分片（只含该用例回填后的表格及其截图），
+分片之间互不依赖，可由多个进程/worker并行生成；会话结束时依次把各分片的表格替换回结果文档中对应用例的表格，
+并把分片中的图片重新登记到结果文档，只保存一次。
+
+命令行用法（多进程或多台执行机分片执行生成分片后单独合并，可同时指定多个分片目录）：
+    python -m utils.word_report_fragments reports/test_report.docx reports/fragments
+    python -m utils.word_report_fragments reports/test_report.docx shard1/reports/fragments shard2/reports/fragments
+"""
+import argparse
+import copy
+import io
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Any
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table
+from utils.word_report_filler import WordReportFiller, WordReportIndex
+
+FRAGMENT_SUFFIX = ".docx"
+
+
+class WordReportFragments:
+    """生成和合并用例结果分片"""
+
+    @staticmethod
+    def fragment_file(fragment_dir: str, case_id: str) -> str:
+        return os.path.join(fragment_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", case_id) + FRAGMENT_SUFFIX)
+
+    @staticmethod
+    def write_fragment(template_index: WordReportIndex, fragment_dir: str,
+        step_num: int, case_result: Dict[str, Any]) -> str:
+        """
+        复制模板中该用例的表格到一个空白文档中回填结果（截图随分片文档保存），写入分片文件
+        :param template_index: 模板文档（未回填）的用例表格索引，只读使用
+        :return: 分片文件路径
+        """
+        entry = template_index.lookup(case_result["case_id"])
+        fragment = Document()
+        body = fragment.element.body
+        body.insert(0, copy.deepcopy(entry.table._tbl))  # 插在 sectPr 之前
+        WordReportFiller.fill_case_document(fragment, step_num, case_result, WordReportIndex(fragment))
+
+        os.makedirs(fragment_dir, exist_ok=True)
+        fragment_file = WordReportFragments.fragment_file(fragment_dir, case_result["case_id"])
+        tmp_file = fragment_file + ".tmp"
+        fragment.save(tmp_file)
+        os.replace(tmp_file, fragment_file)  # 同一用例重跑时，以最后一次的结果为准
+        return fragment_file
+
+    @staticmethod
+    def merge(doc: Document, index: WordReportIndex, fragment_dir: str) -> List[str]:
+        """
+        将分片目录下的所有分片依次替换回文档中对应用例的表格（不保存）
+        :return: 已合并的用例标识
+        """
+        merged = []
+        fragment_files = sorted(Path(fragment_dir).glob(f"*{FRAGMENT_SUFFIX}")) if os.path.isdir(fragment_dir) else []
+        next_shape_id = max([int(e.get("id", 0)) for e in doc.element.body.iter(qn("wp:docPr"))] + [0]) + 1
+        for fragment_file in fragment_files:
+            fragment = Document(str(fragment_file))
+            if not fragment.tables:
+                print(f"分片中没有用例表格，跳过: {fragment_file}")
+                continue
+            fragment_index = WordReportIndex(fragment)
+            if not fragment_index.entries:
+                print(f"分片中未找到用例标识，跳过: {fragment_file}")
+                continue
+            case_id = next(iter(fragment_index.entries))
+            target = index.lookup(case_id)
+
+            new_tbl = copy.deepcopy(fragment.tables[0]._tbl)
+            # 图片关系id在分片和结果文档中各自编号，按图片内容重新登记到结果文档
+            for blip in new_tbl.iter(qn("a:blip")):
+                image_part = fragment.part.related_parts[blip.get(qn("r:embed"))]
+                new_rid, _ = doc.part.get_or_add_image(io.BytesIO(image_part.blob))
+                blip.set(qn("r:embed"), new_rid)
+            for doc_pr in new_tbl.iter(qn("wp:docPr")):  # 图形id在整个文档内保持唯一
+                doc_pr.set("id", str(next_shape_id))
+                next_shape_id += 1
+
+            old_tbl = target.table._tbl
+            old_tbl.getparent().replace(old_tbl, new_tbl)
+            target.table = Table(new_tbl, target.table._parent)
+            merged.append(case_id)
+        return merged
+
+    @staticmethod
+    def merge_file(word_file: str, *fragment_dirs: str) -> List[str]:
+        """加载结果文档，合并一个或多个分片目录下的全部分片后保存一次"""
+        doc = Document(word_file)
+        index = WordReportIndex(doc)
+        merged = []
+        for fragment_dir in fragment_dirs:
+            merged.extend(WordReportFragments.merge(doc, index, fragment_dir))
+        tmp_file = f"{word_file}.tmp"
+        doc.save(tmp_file)
+        os.replace(tmp_file, word_file)
+        return merged
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="将用例结果分片合并到Word结果文档")
+    parser.add_argument("word_file", help="结果文档（如 reports/test_report.docx）")
+    parser.add_argument("fragment_dir", nargs="+", help="分片目录（如 reports/fragments），分片执行时可指定各执行机的分片目录")
+    args = parser.parse_args(argv)
+    merged = WordReportFragments.merge_file(args.word_file, *args.fragment_dir)
+    print(f"已合并 {len(merged)} 个用例的结果分片到 {args.word_file}")
+
+
+if __name__ == "__main__":
+    main()